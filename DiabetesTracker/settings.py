@@ -158,4 +158,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
-}
\ No newline at end of file
+}
+# Canal en tiempo real (SSE bajo ASGI): backend de publicación/suscripción
+GLUCOSA_PUBSUB_BACKEND = 'glucose.tiempo_real.BackendEnProceso'
+# Reconocimiento de alimentos en fotos: implementación de nutrition.reconocimiento.Reconocedor
+NUTRICION_RECONOCEDOR = 'nutrition.reconocimiento.ReconocedorSimulado'
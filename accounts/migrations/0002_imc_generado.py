@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:53
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='imc',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.F('peso'), '/', django.db.models.functions.comparison.NullIf(django.db.models.expressions.CombinedExpression(models.F('estatura'), '*', models.F('estatura')), 0)), 2), output_field=models.DecimalField(decimal_places=2, max_digits=7)),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['imc'], name='usuarios_imc_c6eeae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['fecha_nacimiento'], name='usuarios_fecha_n_686213_idx'),
+        ),
+    ]
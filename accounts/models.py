@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import NullIf, Round
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -48,6 +50,12 @@ class User(AbstractUser):
     )
     estado = models.CharField(max_length=50, blank=True)
     activo = models.BooleanField(default=True)
+    # Índice de masa corporal calculado y almacenado por la base de datos (indexable)
+    imc = models.GeneratedField(
+        expression=Round(F('peso') / NullIf(F('estatura') * F('estatura'), 0), 2),
+        output_field=models.DecimalField(max_digits=7, decimal_places=2),
+        db_persist=True,
+    )
     
     # Campos para evitar colisión con auth.User
     groups = models.ManyToManyField(
@@ -69,6 +77,10 @@ class User(AbstractUser):
         db_table = 'usuarios'
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            models.Index(fields=['imc']),
+            models.Index(fields=['fecha_nacimiento']),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name() or self.username}"
@@ -82,12 +94,7 @@ class User(AbstractUser):
                 (today.month, today.day) < (self.fecha_nacimiento.month, self.fecha_nacimiento.day)
             )
         return None
-    
-    @property
-    def imc(self):
-        if self.peso and self.estatura:
-            return round(float(self.peso) / (float(self.estatura) ** 2), 2)
-        return None
+
 
 
 class SurveyInicial(models.Model):
@@ -18,8 +18,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
-    edad = serializers.ReadOnlyField()
-    imc = serializers.ReadOnlyField()
+    edad = serializers.SerializerMethodField()
+    imc = serializers.FloatField(read_only=True)
 
     class Meta:
         model = User
@@ -29,6 +29,12 @@ class UserSerializer(serializers.ModelSerializer):
             'estado', 'activo', 'edad', 'imc'
         ]
 
+    def get_edad(self, obj):
+        # Anotada por UsuarioUtils.con_edad en las consultas de la vista
+        if hasattr(obj, 'edad_actual'):
+            return obj.edad_actual
+        return obj.edad
+
 
 class SurveyInicialSerializer(serializers.ModelSerializer):
     usuario = serializers.PrimaryKeyRelatedField(read_only=True)
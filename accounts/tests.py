@@ -1,3 +1,75 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import User
+from .utils import UsuarioUtils
 
-# Create your tests here.
+
+class UsuarioCohortesTests(TestCase):
+    """Filtros y orden por edad e IMC calculados en la base de datos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.adulto = User.objects.create(username='adulto', fecha_nacimiento=date(1990, 6, 15),
+                                         peso=Decimal('70'), estatura=Decimal('1.75'))
+        cls.bisiesto = User.objects.create(username='bisiesto', fecha_nacimiento=date(2008, 2, 29),
+                                           peso=Decimal('50'), estatura=Decimal('1.60'))
+        cls.mayor = User.objects.create(username='mayor', fecha_nacimiento=date(1950, 1, 1),
+                                        peso=Decimal('90'), estatura=Decimal('1.70'))
+        cls.sin_datos = User.objects.create(username='sin_datos')
+        cls.cuenta = get_user_model().objects.create_user('medico', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.cuenta)
+
+    def _listar(self, hoy=date(2026, 2, 28), **parametros):
+        with mock.patch('accounts.utils.timezone.localdate', return_value=hoy):
+            respuesta = self.client.get('/api/usuarios/', parametros)
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data['results']
+
+    def _nombres(self, **parametros):
+        return [fila['username'] for fila in self._listar(**parametros)]
+
+    def test_edad_e_imc_calculados(self):
+        filas = {fila['username']: fila for fila in self._listar()}
+        self.assertEqual((filas['adulto']['edad'], filas['adulto']['imc']), (35, 22.86))
+        self.assertEqual((filas['bisiesto']['edad'], filas['bisiesto']['imc']), (17, 19.53))
+        self.assertEqual((filas['mayor']['edad'], filas['mayor']['imc']), (76, 31.14))
+        self.assertEqual((filas['sin_datos']['edad'], filas['sin_datos']['imc']), (None, None))
+
+    def test_filtros_de_cohorte(self):
+        self.assertEqual(self._nombres(edad_min=35, edad_max=76), ['adulto', 'mayor'])
+        self.assertEqual(self._nombres(edad_min=36, edad_max=75), [])
+        self.assertEqual(self._nombres(edad_max=35), ['adulto', 'bisiesto'])
+        self.assertEqual(self._nombres(imc_min='19.53', imc_max='22.86'), ['adulto', 'bisiesto'])
+        self.assertEqual(self._nombres(imc_min=25, edad_min=70), ['mayor'])
+
+    def test_cumpleanos_29_de_febrero(self):
+        # En años no bisiestos se cumple años el 1 de marzo
+        self.assertEqual(self._nombres(hoy=date(2026, 2, 28), edad_min=18, edad_max=18), [])
+        self.assertEqual(self._nombres(hoy=date(2026, 3, 1), edad_min=18, edad_max=18), ['bisiesto'])
+        self.assertEqual(self._nombres(hoy=date(2028, 2, 29), edad_min=20, edad_max=20), ['bisiesto'])
+        self.assertEqual(UsuarioUtils.restar_anios(date(2028, 2, 29), 1), date(2027, 2, 28))
+        self.assertEqual(UsuarioUtils.restar_anios(date(2028, 2, 29), 4), date(2024, 2, 29))
+
+    def test_orden_con_nulos_al_final(self):
+        self.assertEqual(self._nombres(ordering='edad'), ['bisiesto', 'adulto', 'mayor', 'sin_datos'])
+        self.assertEqual(self._nombres(ordering='-edad'), ['mayor', 'adulto', 'bisiesto', 'sin_datos'])
+        self.assertEqual(self._nombres(ordering='imc'), ['bisiesto', 'adulto', 'mayor', 'sin_datos'])
+        self.assertEqual(self._nombres(ordering='-imc'), ['mayor', 'adulto', 'bisiesto', 'sin_datos'])
+        self.assertEqual(self._nombres(ordering='-id'), ['sin_datos', 'mayor', 'bisiesto', 'adulto'])
+
+    def test_parametros_invalidos(self):
+        for parametros in (
+            {'edad_max': 5000}, {'edad_min': 151}, {'edad_min': -1},
+            {'edad_max': 'diez'}, {'imc_min': 'NaN'}, {'ordering': 'peso'},
+        ):
+            with self.subTest(parametros=parametros):
+                respuesta = self.client.get('/api/usuarios/', parametros)
+                self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self._nombres(edad_max=UsuarioUtils.EDAD_MAXIMA), ['adulto', 'bisiesto', 'mayor'])
@@ -0,0 +1,77 @@
+import calendar
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+
+
+class UsuarioUtils:
+    '''
+    Edad e IMC en la base de datos para filtrar, ordenar y paginar cohortes
+    sin recorrer la tabla de usuarios en Python. El IMC es una columna
+    generada e indexada; la edad depende del día actual, así que se anota
+    al consultar y sus filtros se traducen a un rango de fecha_nacimiento
+    (también indexada).
+    '''
+
+    # Clave de ordenamiento -> (campo, invertido). Mayor edad = fecha de nacimiento más antigua
+    ORDENAMIENTOS = {
+        'id': ('id', False),
+        'username': ('username', False),
+        'date_joined': ('date_joined', False),
+        'edad': ('fecha_nacimiento', True),
+        'imc': ('imc', False),
+    }
+    EDAD_MAXIMA = 150
+
+    @staticmethod
+    def restar_anios(fecha, anios):
+        '''La misma fecha `anios` años antes (29 de febrero -> 28 si el año no es bisiesto).'''
+        anio = fecha.year - anios
+        if fecha.month == 2 and fecha.day == 29 and not calendar.isleap(anio):
+            return fecha.replace(year=anio, day=28)
+        return fecha.replace(year=anio)
+
+    @staticmethod
+    def expresion_edad(hoy=None):
+        '''Edad en años cumplidos a la fecha dada (hoy por defecto); nula sin fecha de nacimiento.'''
+        hoy = hoy or timezone.localdate()
+        sin_cumplir = Q(fecha_nacimiento__month__gt=hoy.month) | Q(
+            fecha_nacimiento__month=hoy.month, fecha_nacimiento__day__gt=hoy.day
+        )
+        return ExpressionWrapper(
+            Value(hoy.year) - ExtractYear('fecha_nacimiento')
+            - Case(When(sin_cumplir, then=Value(1)), default=Value(0)),
+            output_field=IntegerField()
+        )
+
+    @staticmethod
+    def con_edad(queryset, hoy=None):
+        return queryset.annotate(edad_actual=UsuarioUtils.expresion_edad(hoy))
+
+    @staticmethod
+    def filtrar(queryset, imc_min=None, imc_max=None, edad_min=None, edad_max=None, hoy=None):
+        '''
+        Filtrar por rangos inclusivos de IMC y edad.
+        La edad se convierte en límites de fecha_nacimiento para usar su índice.
+        '''
+        hoy = hoy or timezone.localdate()
+        if imc_min is not None:
+            queryset = queryset.filter(imc__gte=imc_min)
+        if imc_max is not None:
+            queryset = queryset.filter(imc__lte=imc_max)
+        if edad_min is not None:
+            queryset = queryset.filter(fecha_nacimiento__lte=UsuarioUtils.restar_anios(hoy, edad_min))
+        if edad_max is not None:
+            queryset = queryset.filter(fecha_nacimiento__gt=UsuarioUtils.restar_anios(hoy, edad_max + 1))
+        return queryset
+
+    @staticmethod
+    def ordenar(queryset, ordenamiento):
+        '''
+        Ordenar por una clave de ORDENAMIENTOS ('-' para descendente), con los
+        valores nulos al final y el id como desempate.
+        '''
+        campo, invertido = UsuarioUtils.ORDENAMIENTOS[ordenamiento.lstrip('-')]
+        if ordenamiento.startswith('-') != invertido:
+            return queryset.order_by(F(campo).desc(nulls_last=True), F('id').desc())
+        return queryset.order_by(F(campo).asc(nulls_last=True), F('id').asc())
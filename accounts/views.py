@@ -1,5 +1,6 @@
+from decimal import Decimal, InvalidOperation
 from rest_framework import viewsets, permissions
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import User, SurveyInicial
 from .serializers import (
@@ -7,6 +8,7 @@ from .serializers import (
     SurveyInicialSerializer,
     CustomTokenObtainPairSerializer,
 )
+from .utils import UsuarioUtils
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -14,9 +16,58 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 class UserViewSet(viewsets.ModelViewSet):
+    """
+    Usuarios con edad e IMC calculados en la base de datos.
+    Filtros opcionales (inclusivos): imc_min, imc_max, edad_min y edad_max (0-150).
+    Orden: ordering=id|username|date_joined|edad|imc ('-' para descendente).
+    """
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    permission_classes = [permissions.IsAuthenticated]  
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Parámetro -> (tipo, máximo inclusivo o None)
+    FILTROS = {
+        'imc_min': (Decimal, None),
+        'imc_max': (Decimal, None),
+        'edad_min': (int, UsuarioUtils.EDAD_MAXIMA),
+        'edad_max': (int, UsuarioUtils.EDAD_MAXIMA),
+    }
+
+    def get_queryset(self):
+        queryset = UsuarioUtils.con_edad(super().get_queryset())
+        if self.action != 'list':
+            return queryset
+
+        filtros = {}
+        for parametro, (tipo, maximo) in self.FILTROS.items():
+            valor = self.request.query_params.get(parametro)
+            if not valor:
+                continue
+            try:
+                filtros[parametro] = tipo(valor)
+            except (ValueError, InvalidOperation):
+                raise ValidationError({parametro: 'Debe ser un número válido.'})
+            if not (isinstance(filtros[parametro], int) or filtros[parametro].is_finite()) or filtros[parametro] < 0:
+                raise ValidationError({parametro: 'Debe ser un número válido.'})
+            if maximo is not None and filtros[parametro] > maximo:
+                raise ValidationError({parametro: f'Debe estar entre 0 y {maximo}.'})
+
+        ordenamiento = self.request.query_params.get('ordering', 'id')
+        if ordenamiento.lstrip('-') not in UsuarioUtils.ORDENAMIENTOS:
+            raise ValidationError({
+                'ordering': f"Valores permitidos: {', '.join(UsuarioUtils.ORDENAMIENTOS)} (con '-' para descendente)."
+            })
+        return UsuarioUtils.ordenar(UsuarioUtils.filtrar(queryset, **filtros), ordenamiento)
+
+    # El IMC lo calcula la base de datos al guardar: recargarlo junto con la edad
+    def perform_create(self, serializer):
+        usuario = serializer.save()
+        usuario.refresh_from_db(fields=['imc'])
+
+    def perform_update(self, serializer):
+        usuario = serializer.save()
+        usuario.refresh_from_db(fields=['imc'])
+        usuario.edad_actual = usuario.edad
 
 
 class SurveyInicialViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,126 @@
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class FechaHoraCursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (fecha_hora, id) en orden descendente.
+
+    Cada página filtra a partir de la última posición vista en lugar de usar
+    OFFSET, y nunca ejecuta COUNT(*), por lo que el costo de una página no
+    depende del tamaño del historial. El campo de fecha se toma del atributo
+    `campo_cursor` de la vista (por defecto 'fecha_hora').
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    campo_cursor = 'fecha_hora'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.campo = getattr(view, 'campo_cursor', self.campo_cursor)
+        tamano = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverso = False
+            queryset = queryset.order_by(f'-{self.campo}', '-id')
+        else:
+            fecha, pk, reverso = cursor
+            if reverso:
+                queryset = queryset.filter(
+                    Q(**{f'{self.campo}__gt': fecha}) | Q(**{self.campo: fecha, 'id__gt': pk})
+                ).order_by(self.campo, 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.campo}__lt': fecha}) | Q(**{self.campo: fecha, 'id__lt': pk})
+                ).order_by(f'-{self.campo}', '-id')
+
+        resultados = list(queryset[:tamano + 1])
+        hay_mas = len(resultados) > tamano
+        resultados = resultados[:tamano]
+
+        if reverso:
+            resultados.reverse()
+            self.has_next = True
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = cursor is not None
+
+        self.page = resultados
+        return resultados
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def _valor_campo(self, obj):
+        for parte in self.campo.split('__'):
+            obj = getattr(obj, parte)
+        return obj
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            fecha = parse_datetime(datos['f'])
+            pk = int(datos['i'])
+            reverso = bool(datos.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if fecha is None:
+            raise NotFound(self.invalid_cursor_message)
+        return fecha, pk, reverso
+
+    def encode_cursor(self, obj, reverso):
+        datos = {'f': self._valor_campo(obj).isoformat(), 'i': obj.pk}
+        if reverso:
+            datos['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverso=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
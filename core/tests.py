@@ -1,3 +1,155 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from glucose.models import MedicionGlucosa
+from nutrition.models import Comida, DetalleComida, TipoAlimento
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FechaHoraCursorPaginationTests(TestCase):
+    """Las páginas por cursor cubren el historial sin duplicados ni huecos, aun con fechas repetidas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        otro = User.objects.create_user('otro', password='x')
+        base = timezone.now().replace(microsecond=0)
+        # Grupos de lecturas con la misma fecha que cruzan los límites de página
+        fechas = [base - timedelta(minutes=5 * (i // 7)) for i in range(23)]
+        MedicionGlucosa.objects.bulk_create(
+            [MedicionGlucosa(usuario=cls.usuario, fecha_hora=f, valor_glucosa=Decimal('100')) for f in fechas]
+            + [MedicionGlucosa(usuario=otro, fecha_hora=base, valor_glucosa=Decimal('100'))]
+        )
+        cls.esperados = list(
+            MedicionGlucosa.objects.filter(usuario=cls.usuario)
+            .order_by('-fecha_hora', '-id').values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _recorrer(self, url, enlace, **params):
+        paginas = []
+        respuesta = self.client.get(url, params)
+        while True:
+            self.assertEqual(respuesta.status_code, 200)
+            paginas.append([fila['id'] for fila in respuesta.data['results']])
+            if not respuesta.data[enlace]:
+                return paginas, respuesta
+            respuesta = self.client.get(respuesta.data[enlace])
+
+    def test_hacia_adelante(self):
+        paginas, ultima = self._recorrer('/mediciones-glucosa/', 'next', page_size=4)
+        self.assertEqual([i for pagina in paginas for i in pagina], self.esperados)
+        self.assertTrue(all(len(pagina) == 4 for pagina in paginas[:-1]))
+        self.assertIsNotNone(ultima.data['previous'])
+
+    def test_hacia_atras(self):
+        paginas, ultima = self._recorrer('/mediciones-glucosa/', 'next', page_size=4)
+        respuesta = self.client.get(ultima.data['previous'])
+        hacia_atras = [paginas[-1]]
+        while True:
+            pagina = [fila['id'] for fila in respuesta.data['results']]
+            if not pagina:
+                break
+            hacia_atras.append(pagina)
+            if not respuesta.data['previous']:
+                break
+            respuesta = self.client.get(respuesta.data['previous'])
+        self.assertEqual([i for pagina in reversed(hacia_atras) for i in pagina], self.esperados)
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get('/mediciones-glucosa/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class ExportacionTests(TestCase):
+    """Las exportaciones en streaming traen solo las filas del usuario, en orden y bien escapadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        otro = User.objects.create_user('otro', password='x')
+        base = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+        cls.mediciones = [
+            MedicionGlucosa.objects.create(usuario=cls.usuario, fecha_hora=base + timedelta(minutes=5), valor_glucosa=Decimal('110.50')),
+            MedicionGlucosa.objects.create(usuario=cls.usuario, fecha_hora=base, valor_glucosa=Decimal('98'),
+                                           notas='Tras correr, "leve" mareo\ny sed'),
+        ]
+        MedicionGlucosa.objects.create(usuario=otro, fecha_hora=base, valor_glucosa=Decimal('300'))
+
+        arroz = TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato', calorias_por_100g=Decimal('130'))
+        cls.comida = Comida.objects.create(usuario=cls.usuario, tipo_comida='almuerzo', fecha_hora=base, notas='Menú del día')
+        cls.detalle = DetalleComida.objects.create(comida=cls.comida, tipo_alimento=arroz,
+                                                   cantidad=Decimal('150'), unidad_medida='gramos')
+        ajena = Comida.objects.create(usuario=otro, tipo_comida='cena', fecha_hora=base)
+        DetalleComida.objects.create(comida=ajena, tipo_alimento=arroz, cantidad=Decimal('80'), unidad_medida='gramos')
+        cls.comida.refresh_from_db()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _exportar(self, url, formato=None):
+        respuesta = self.client.get(url, {'formato': formato} if formato else {})
+        self.assertEqual(respuesta.status_code, 200)
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        return respuesta, contenido
+
+    def test_mediciones_csv(self):
+        respuesta, contenido = self._exportar('/mediciones-glucosa/exportar/')
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(respuesta['Content-Disposition'],
+                         f'attachment; filename="mediciones_glucosa_{self.usuario.pk}.csv"')
+        primera, segunda = sorted(self.mediciones, key=lambda m: m.fecha_hora)
+        self.assertEqual(list(csv.reader(io.StringIO(contenido))), [
+            ['id', 'fecha_hora', 'valor_glucosa', 'notas'],
+            [str(primera.pk), '2026-10-01T08:00:00+00:00', '98.00', 'Tras correr, "leve" mareo\ny sed'],
+            [str(segunda.pk), '2026-10-01T08:05:00+00:00', '110.50', ''],
+        ])
+
+    def test_mediciones_ndjson(self):
+        respuesta, contenido = self._exportar('/mediciones-glucosa/exportar/', 'ndjson')
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(respuesta['Content-Disposition'].endswith('.ndjson"'))
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual([(f['fecha_hora'], f['valor_glucosa']) for f in filas], [
+            ('2026-10-01T08:00:00Z', '98.00'), ('2026-10-01T08:05:00Z', '110.50'),
+        ])
+        self.assertEqual(filas[0]['notas'], 'Tras correr, "leve" mareo\ny sed')
+
+    def test_comidas_y_detalles(self):
+        _, contenido = self._exportar('/comidas/exportar/')
+        self.assertEqual(list(csv.reader(io.StringIO(contenido))), [
+            ['id', 'fecha_hora', 'tipo_comida', 'calorias_totales', 'notas'],
+            [str(self.comida.pk), '2026-10-01T08:00:00+00:00', 'almuerzo', str(self.comida.calorias_totales), 'Menú del día'],
+        ])
+
+        _, contenido = self._exportar('/detalles-comida/exportar/', 'ndjson')
+        self.assertEqual([json.loads(linea) for linea in contenido.splitlines()], [{
+            'id': self.detalle.pk, 'comida_id': self.comida.pk, 'comida__fecha_hora': '2026-10-01T08:00:00Z',
+            'tipo_alimento_id': self.detalle.tipo_alimento_id, 'tipo_alimento__nombre': 'Arroz',
+            'cantidad': '150.00', 'unidad_medida': 'gramos',
+        }])
+
+    def test_formato_invalido(self):
+        for url in ('/mediciones-glucosa/exportar/', '/comidas/exportar/', '/detalles-comida/exportar/'):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url, {'formato': 'xlsx'})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('formato', respuesta.data)
+
+    def test_sin_filas(self):
+        self.client.force_authenticate(User.objects.create_user('nuevo', password='x'))
+        _, contenido = self._exportar('/comidas/exportar/')
+        self.assertEqual(contenido, 'id,fecha_hora,tipo_comida,calorias_totales,notas\r\n')
+        _, contenido = self._exportar('/mediciones-glucosa/exportar/', 'ndjson')
+        self.assertEqual(contenido, '')
@@ -1,5 +1,11 @@
 
+import csv
+import json
+from datetime import datetime
 from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
 from .models import ConfiguracionSistema
 
 class ConfiguracionUtils:
@@ -88,4 +94,71 @@ class ConfiguracionUtils:
             'mediciones_por_dia': 24 // config.recordatorio_medicion_horas,
             'recordatorios_comida_por_dia': 24 // config.recordatorio_comida_horas,
             'configuracion_actualizada': config.fecha_actualizacion
-        }
\ No newline at end of file
+        }
+
+
+class _Eco:
+    '''Pseudo-buffer para csv.writer: devuelve la línea en lugar de escribirla.'''
+
+    def write(self, valor):
+        return valor
+
+
+class ExportacionUtils:
+    '''
+    Exportación en streaming (CSV o NDJSON) de historiales completos.
+    Lee con values_list e iterador del servidor y emite cada fila en cuanto
+    llega, por lo que la memoria no depende del tamaño del historial.
+    '''
+
+    FORMATOS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+    TAMANO_BLOQUE = 2000
+
+    @staticmethod
+    def formato_solicitado(request):
+        '''Obtener y validar el parámetro ?formato= (csv por defecto).'''
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ExportacionUtils.FORMATOS:
+            raise ValidationError({'formato': f"Valores permitidos: {', '.join(ExportacionUtils.FORMATOS)}."})
+        return formato
+
+    @staticmethod
+    def _filas_csv(campos, filas):
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(campos)
+        for fila in filas:
+            yield escritor.writerow([
+                valor.isoformat() if isinstance(valor, datetime) else valor
+                for valor in fila
+            ])
+
+    @staticmethod
+    def _filas_ndjson(campos, filas):
+        for fila in filas:
+            yield json.dumps(dict(zip(campos, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    @staticmethod
+    def respuesta_streaming(queryset, campos, formato, nombre_archivo):
+        '''
+        Construir la respuesta de exportación.
+
+        Args:
+            queryset: QuerySet ya filtrado y ordenado
+            campos: Nombres de campos (admite lookups como 'comida__fecha_hora')
+            formato: 'csv' o 'ndjson'
+            nombre_archivo: Nombre base del archivo descargado
+
+        Returns:
+            StreamingHttpResponse
+        '''
+        filas = queryset.values_list(*campos).iterator(chunk_size=ExportacionUtils.TAMANO_BLOQUE)
+        generador = (
+            ExportacionUtils._filas_csv(campos, filas) if formato == 'csv'
+            else ExportacionUtils._filas_ndjson(campos, filas)
+        )
+        respuesta = StreamingHttpResponse(generador, content_type=ExportacionUtils.FORMATOS[formato])
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.{formato}"'
+        return respuesta
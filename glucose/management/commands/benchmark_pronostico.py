@@ -0,0 +1,73 @@
+import math
+import random
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from glucose.pronostico import ModeloTendencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia de actualización y predicción del modelo de tendencia '
+        'y la memoria que ocupa su estado por usuario (en proceso, sin base de datos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000)
+        parser.add_argument('--lecturas', type=int, default=288, help='Lecturas por usuario (5 min c/u)')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        usuarios = options['usuarios']
+        lecturas = options['lecturas']
+
+        tracemalloc.start()
+        base = tracemalloc.take_snapshot()
+        modelos = [ModeloTendencia() for _ in range(usuarios)]
+        memoria = sum(
+            stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(base, 'filename')
+        )
+        tracemalloc.stop()
+
+        series = [
+            [120 + 50 * math.sin(i / 24 + fase) + rnd.gauss(0, 5) for i in range(lecturas)]
+            for fase in (rnd.uniform(0, 6.28) for _ in range(usuarios))
+        ]
+
+        inicio = time.perf_counter()
+        for i in range(lecturas):
+            ts = 1_700_000_000 + i * 300
+            for modelo, serie in zip(modelos, series):
+                modelo.actualizar(ts, serie[i])
+        total_actualizacion = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for modelo in modelos:
+            modelo.predecir(30)
+            modelo.predecir(60)
+        total_prediccion = time.perf_counter() - inicio
+
+        # Error absoluto medio a 30 minutos sobre una muestra de usuarios
+        errores = []
+        for serie in series[:100]:
+            modelo = ModeloTendencia()
+            for i, valor in enumerate(serie[:-6]):
+                modelo.actualizar(i * 300, valor)
+                prediccion = modelo.predecir(30)
+                if prediccion is not None:
+                    errores.append(abs(prediccion - serie[i + 6]))
+
+        self.stdout.write(f'Usuarios: {usuarios}, lecturas por usuario: {lecturas}')
+        self.stdout.write(
+            f'Actualización: {total_actualizacion / (usuarios * lecturas) * 1e6:.2f} µs por lectura'
+        )
+        self.stdout.write(
+            f'Predicción (30 y 60 min): {total_prediccion / usuarios * 1e6:.2f} µs por usuario'
+        )
+        self.stdout.write(
+            f'Memoria del estado: {memoria / usuarios:.0f} bytes por usuario en proceso, '
+            f'7 columnas numéricas en estados_pronostico'
+        )
+        if errores:
+            self.stdout.write(f'Error absoluto medio a 30 min: {sum(errores) / len(errores):.1f} mg/dL')
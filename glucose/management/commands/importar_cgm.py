@@ -0,0 +1,191 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from glucose.models import MedicionGlucosa, VALOR_GLUCOSA_MINIMO, VALOR_GLUCOSA_MAXIMO
+from glucose.utils import IngestaUtils, MedicionUtils, PronosticoUtils
+
+MMOL_A_MGDL = Decimal('18.0182')
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa lecturas de glucosa desde un CSV exportado por el software del monitor continuo. '
+        'Procesa el archivo en streaming, convierte mmol/L a mg/dL, descarta lecturas ya '
+        'registradas y guarda un checkpoint por lote para reanudar importaciones interrumpidas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV')
+        parser.add_argument('--usuario', type=int, required=True, help='ID del usuario dueño de las lecturas')
+        parser.add_argument('--columna-fecha', help='Nombre de la columna de fecha/hora (autodetectada si se omite)')
+        parser.add_argument('--columna-valor', help='Nombre de la columna de glucosa (autodetectada si se omite)')
+        parser.add_argument(
+            '--unidad', choices=['auto', 'mgdl', 'mmol'], default='auto',
+            help='Unidad de los valores; auto la deduce del encabezado de la columna'
+        )
+        parser.add_argument('--formato-fecha', help='Formato strptime de la fecha (ISO 8601 si se omite)')
+        parser.add_argument('--zona-horaria', help='Zona horaria de fechas sin offset (por defecto TIME_ZONE)')
+        parser.add_argument('--delimitador', default=',', help='Delimitador del CSV')
+        parser.add_argument('--saltar-lineas', type=int, default=0, help='Líneas previas al encabezado a ignorar')
+        parser.add_argument('--tamano-lote', type=int, default=5000, help='Filas por transacción')
+        parser.add_argument('--checkpoint', help='Ruta del checkpoint (por defecto <archivo>.checkpoint)')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignorar un checkpoint existente')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        if not os.path.isfile(archivo):
+            raise CommandError(f'No existe el archivo {archivo}')
+        try:
+            usuario = get_user_model().objects.get(pk=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        try:
+            self.zona = ZoneInfo(options['zona_horaria']) if options['zona_horaria'] else timezone.get_current_timezone()
+        except ZoneInfoNotFoundError:
+            raise CommandError(f"Zona horaria desconocida: {options['zona_horaria']}")
+        self.formato_fecha = options['formato_fecha']
+
+        ruta_checkpoint = options['checkpoint'] or f'{archivo}.checkpoint'
+        firma = {'archivo': os.path.abspath(archivo), 'tamano': os.path.getsize(archivo), 'usuario': usuario.pk}
+        procesadas = 0 if options['reiniciar'] else self._leer_checkpoint(ruta_checkpoint, firma)
+
+        contadores = {'insertadas': 0, 'duplicadas': 0, 'invalidas': 0}
+        inicio = time.monotonic()
+
+        with open(archivo, newline='', encoding='utf-8-sig') as f:
+            for _ in range(options['saltar_lineas']):
+                next(f, None)
+            lector = csv.reader(f, delimiter=options['delimitador'])
+            encabezado = next(lector, None)
+            if not encabezado:
+                raise CommandError('El archivo no tiene encabezado')
+            indice_fecha, indice_valor, factor = self._resolver_columnas(encabezado, options)
+
+            if procesadas:
+                self.stdout.write(f'Reanudando desde la fila {procesadas}')
+                for _ in islice(lector, procesadas):
+                    pass
+
+            while True:
+                filas = list(islice(lector, options['tamano_lote']))
+                if not filas:
+                    break
+                lecturas = []
+                for fila in filas:
+                    lectura = self._parsear(fila, indice_fecha, indice_valor, factor)
+                    if lectura is None:
+                        contadores['invalidas'] += 1
+                    else:
+                        lecturas.append(lectura)
+
+                with transaction.atomic():
+                    nuevas = IngestaUtils.descartar_existentes(usuario.pk, lecturas)
+                    mediciones = [
+                        MedicionGlucosa(usuario=usuario, fecha_hora=fecha_hora, valor_glucosa=valor)
+                        for fecha_hora, valor in nuevas
+                    ]
+                    MedicionGlucosa.objects.bulk_create(mediciones, batch_size=IngestaUtils.TAMANO_BLOQUE)
+                    MedicionUtils.procesar_creadas(usuario.pk, mediciones, historicas=True)
+
+                procesadas += len(filas)
+                contadores['insertadas'] += len(mediciones)
+                contadores['duplicadas'] += len(lecturas) - len(nuevas)
+                self._guardar_checkpoint(ruta_checkpoint, firma, procesadas)
+
+                transcurrido = time.monotonic() - inicio
+                self.stdout.write(
+                    f"Filas {procesadas}: {contadores['insertadas']} insertadas, "
+                    f"{contadores['duplicadas']} duplicadas, {contadores['invalidas']} inválidas "
+                    f"({procesadas / transcurrido if transcurrido else 0:.0f} filas/s)"
+                )
+
+        # Los lotes pueden venir en cualquier orden (y de varias ejecuciones): el pronóstico se rehace una sola vez
+        PronosticoUtils.reconstruir(usuario.pk)
+        if os.path.exists(ruta_checkpoint):
+            os.remove(ruta_checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completa: {contadores['insertadas']} insertadas, "
+            f"{contadores['duplicadas']} duplicadas, {contadores['invalidas']} inválidas"
+        ))
+
+    def _resolver_columnas(self, encabezado, options):
+        '''Ubicar columnas de fecha y valor y el factor de conversión a mg/dL.'''
+        normalizado = [columna.strip().lower() for columna in encabezado]
+
+        def buscar(nombre, claves):
+            if nombre:
+                try:
+                    return normalizado.index(nombre.strip().lower())
+                except ValueError:
+                    raise CommandError(f'No existe la columna "{nombre}"')
+            for i, columna in enumerate(normalizado):
+                if any(clave in columna for clave in claves):
+                    return i
+            raise CommandError(f'No se pudo detectar la columna ({", ".join(claves)}); use las opciones --columna-*')
+
+        indice_fecha = buscar(options['columna_fecha'], ('timestamp', 'fecha', 'date', 'time'))
+        indice_valor = buscar(options['columna_valor'], ('glucose', 'glucosa'))
+
+        unidad = options['unidad']
+        if unidad == 'auto':
+            unidad = 'mmol' if 'mmol' in normalizado[indice_valor] else 'mgdl'
+        return indice_fecha, indice_valor, MMOL_A_MGDL if unidad == 'mmol' else None
+
+    def _parsear(self, fila, indice_fecha, indice_valor, factor):
+        '''Convertir una fila en (fecha_hora, valor mg/dL) o None si no es válida.'''
+        try:
+            texto_fecha = fila[indice_fecha].strip()
+            valor = Decimal(fila[indice_valor].strip().replace(',', '.'))
+        except (IndexError, InvalidOperation):
+            return None
+        if not valor.is_finite():
+            return None
+
+        try:
+            if self.formato_fecha:
+                fecha_hora = datetime.strptime(texto_fecha, self.formato_fecha)
+            else:
+                fecha_hora = parse_datetime(texto_fecha)
+        except ValueError:
+            return None
+        if fecha_hora is None:
+            return None
+        if timezone.is_naive(fecha_hora):
+            fecha_hora = timezone.make_aware(fecha_hora, self.zona)
+
+        if factor is not None:
+            valor *= factor
+        valor = valor.quantize(Decimal('0.01'))
+        if not VALOR_GLUCOSA_MINIMO <= valor <= VALOR_GLUCOSA_MAXIMO:
+            return None
+        return fecha_hora, valor
+
+    def _leer_checkpoint(self, ruta, firma):
+        '''Filas ya procesadas según el checkpoint, si corresponde al mismo archivo y usuario.'''
+        if not os.path.exists(ruta):
+            return 0
+        try:
+            with open(ruta) as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if any(datos.get(clave) != valor for clave, valor in firma.items()):
+            self.stdout.write(self.style.WARNING('El checkpoint pertenece a otro archivo o usuario; se ignora'))
+            return 0
+        return int(datos.get('procesadas', 0))
+
+    def _guardar_checkpoint(self, ruta, firma, procesadas):
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w') as f:
+            json.dump({**firma, 'procesadas': procesadas}, f)
+        os.replace(temporal, ruta)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from nutrition.models import Comida
+from glucose.utils import PosprandialUtils
+
+
+class Command(BaseCommand):
+    help = 'Calcula o recalcula la respuesta glucémica posprandial de todas las comidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a recalcular (repetible). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuario'] or (
+            Comida.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+        )
+        total = 0
+        for usuario_id in usuarios:
+            comidas = PosprandialUtils.recalcular_comidas(usuario_id)
+            total += comidas
+            self.stdout.write(f'Usuario {usuario_id}: {comidas} comidas')
+        self.stdout.write(self.style.SUCCESS(f'Respuestas posprandiales recalculadas: {total}'))
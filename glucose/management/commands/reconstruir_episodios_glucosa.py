@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from glucose.models import MedicionGlucosa
+from glucose.utils import EpisodioUtils
+
+
+class Command(BaseCommand):
+    help = 'Redetecta los episodios de hipo/hiperglucemia desde las lecturas crudas (ej. tras cambiar umbrales)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a reconstruir (repetible). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuario'] or (
+            MedicionGlucosa.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+        )
+        total = 0
+        for usuario_id in usuarios:
+            episodios = EpisodioUtils.reconstruir(usuario_id)
+            total += episodios
+            self.stdout.write(f'Usuario {usuario_id}: {episodios} episodios')
+        self.stdout.write(self.style.SUCCESS(f'Episodios reconstruidos: {total}'))
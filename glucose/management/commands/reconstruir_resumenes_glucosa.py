@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from glucose.models import MedicionGlucosa
+from glucose.utils import ResumenUtils
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups de glucosa (15 minutos, hora y día) desde las lecturas crudas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a reconstruir (repetible). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuario'] or (
+            MedicionGlucosa.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+        )
+        total = 0
+        for usuario_id in usuarios:
+            intervalos = ResumenUtils.reconstruir(usuario_id)
+            total += intervalos
+            self.stdout.write(f'Usuario {usuario_id}: {intervalos} intervalos')
+        self.stdout.write(self.style.SUCCESS(f'Rollups reconstruidos: {total} intervalos'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:07
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RangoGlucosaReferencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('valor_minimo', models.DecimalField(decimal_places=2, help_text='Límite inferior del rango (mg/dL)', max_digits=5, validators=[django.core.validators.MinValueValidator(0)])),
+                ('valor_maximo', models.DecimalField(decimal_places=2, help_text='Límite superior del rango (mg/dL)', max_digits=5, validators=[django.core.validators.MinValueValidator(0)])),
+                ('descripcion', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Rango de Glucosa de Referencia',
+                'verbose_name_plural': 'Rangos de Glucosa de Referencia',
+                'db_table': 'rangos_glucosa_referencia',
+                'ordering': ['valor_minimo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MedicionGlucosa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor_glucosa', models.DecimalField(decimal_places=2, help_text='Valor de glucosa (mg/dL)', max_digits=5, validators=[django.core.validators.MinValueValidator(20), django.core.validators.MaxValueValidator(600)])),
+                ('fecha_hora', models.DateTimeField()),
+                ('notas', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mediciones_glucosa', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Medición de Glucosa',
+                'verbose_name_plural': 'Mediciones de Glucosa',
+                'db_table': 'mediciones_glucosa',
+                'ordering': ['-fecha_hora'],
+            },
+        ),
+    ]
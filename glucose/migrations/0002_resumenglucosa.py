@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glucose', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenGlucosa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolucion', models.CharField(choices=[('15m', '15 minutos'), ('1h', 'Hora'), ('1d', 'Día')], max_length=3)),
+                ('inicio', models.DateTimeField(help_text='Inicio del intervalo agregado')),
+                ('minimo', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('maximo', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('suma', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('conteo', models.PositiveIntegerField()),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_glucosa', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Glucosa',
+                'verbose_name_plural': 'Resúmenes de Glucosa',
+                'db_table': 'resumenes_glucosa',
+                'ordering': ['-inicio'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'resolucion', 'inicio'), name='resumen_glucosa_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glucose', '0002_resumenglucosa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicionglucosa',
+            index=models.Index(fields=['usuario', '-fecha_hora'], name='mediciones__usuario_4f7c36_idx'),
+        ),
+    ]
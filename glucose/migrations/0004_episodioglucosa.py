@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glucose', '0003_medicionglucosa_mediciones__usuario_4f7c36_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodioGlucosa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('hipoglucemia', 'Hipoglucemia'), ('hiperglucemia', 'Hiperglucemia')], max_length=20)),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('duracion', models.DurationField()),
+                ('valor_extremo', models.DecimalField(decimal_places=2, help_text='Nadir (hipoglucemia) o pico (hiperglucemia) del episodio (mg/dL)', max_digits=5)),
+                ('lecturas', models.PositiveIntegerField()),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='episodios_glucosa', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Episodio de Glucosa',
+                'verbose_name_plural': 'Episodios de Glucosa',
+                'db_table': 'episodios_glucosa',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['usuario', '-inicio'], name='episodios_g_usuario_3f62a5_idx'), models.Index(fields=['usuario', 'tipo', '-inicio'], name='episodios_g_usuario_394f75_idx')],
+            },
+        ),
+    ]
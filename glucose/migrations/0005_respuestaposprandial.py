@@ -0,0 +1,40 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glucose', '0004_episodioglucosa'),
+        ('nutrition', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaPosprandial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_hora', models.DateTimeField(help_text='Fecha y hora de la comida')),
+                ('glucosa_basal', models.DecimalField(blank=True, decimal_places=2, help_text='Última lectura en los 30 minutos previos a la comida (mg/dL)', max_digits=5, null=True)),
+                ('glucosa_pico', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('excursion', models.DecimalField(blank=True, decimal_places=2, help_text='Pico menos basal (mg/dL)', max_digits=6, null=True)),
+                ('minutos_al_pico', models.PositiveIntegerField(blank=True, null=True)),
+                ('auc_incremental', models.DecimalField(blank=True, decimal_places=2, help_text='Área incremental bajo la curva sobre la basal (mg/dL·min)', max_digits=10, null=True)),
+                ('lecturas', models.PositiveIntegerField(default=0)),
+                ('calculado_en', models.DateTimeField(auto_now=True)),
+                ('comida', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='respuesta_posprandial', to='nutrition.comida')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='respuestas_posprandiales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Respuesta Posprandial',
+                'verbose_name_plural': 'Respuestas Posprandiales',
+                'db_table': 'respuestas_posprandiales',
+                'ordering': ['-fecha_hora'],
+                'indexes': [models.Index(fields=['usuario', '-fecha_hora'], name='respuestas__usuario_6b9781_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glucose', '0005_respuestaposprandial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoPronostico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_fecha_hora', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_valor', models.FloatField(blank=True, null=True)),
+                ('s0', models.FloatField(default=0)),
+                ('st', models.FloatField(default=0)),
+                ('sv', models.FloatField(default=0)),
+                ('stt', models.FloatField(default=0)),
+                ('stv', models.FloatField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estado_pronostico', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Estado de Pronóstico',
+                'verbose_name_plural': 'Estados de Pronóstico',
+                'db_table': 'estados_pronostico',
+            },
+        ),
+    ]
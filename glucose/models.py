@@ -1,3 +1,270 @@
 from django.db import models
+from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
+from core.utils import ConfiguracionUtils
 
-# Create your models here.
+# Límites fisiológicos aceptados para una lectura de glucosa (mg/dL)
+VALOR_GLUCOSA_MINIMO = 20
+VALOR_GLUCOSA_MAXIMO = 600
+
+
+class RangoGlucosaReferencia(models.Model):
+    """
+    Rangos de referencia para clasificar lecturas de glucosa.
+    Tabla maestra de bandas clínicas (ej. 'Hipoglucemia', 'Normal').
+    """
+
+    nombre = models.CharField(max_length=50, unique=True)
+    valor_minimo = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        help_text="Límite inferior del rango (mg/dL)"
+    )
+    valor_maximo = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        help_text="Límite superior del rango (mg/dL)"
+    )
+    descripcion = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'rangos_glucosa_referencia'
+        verbose_name = 'Rango de Glucosa de Referencia'
+        verbose_name_plural = 'Rangos de Glucosa de Referencia'
+        ordering = ['valor_minimo']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.valor_minimo}-{self.valor_maximo} mg/dL)"
+
+
+class MedicionGlucosa(models.Model):
+    """
+    Lecturas de glucosa del usuario (manuales o de monitor continuo).
+    Tabla principal para el seguimiento glucémico.
+    """
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mediciones_glucosa'
+    )
+    valor_glucosa = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[
+            MinValueValidator(VALOR_GLUCOSA_MINIMO),
+            MaxValueValidator(VALOR_GLUCOSA_MAXIMO)
+        ],
+        help_text="Valor de glucosa (mg/dL)"
+    )
+    fecha_hora = models.DateTimeField()
+    notas = models.TextField(blank=True)
+
+    # Campos de auditoría
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'mediciones_glucosa'
+        verbose_name = 'Medición de Glucosa'
+        verbose_name_plural = 'Mediciones de Glucosa'
+        ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_hora']),
+        ]
+
+    def __str__(self):
+        return f"{self.valor_glucosa} mg/dL ({self.fecha_hora.strftime('%d/%m/%Y %H:%M')})"
+
+    def get_clasificacion(self):
+        """
+        Clasifica la lectura según los rangos de referencia (índice en memoria).
+        Si ningún rango la contiene, usa los umbrales de configuración.
+        """
+        from .utils import RangoUtils
+        nombre = RangoUtils.get_indice().buscar(self.valor_glucosa)
+        if nombre is not None:
+            return nombre
+        return ConfiguracionUtils.get_status_glucosa(self.valor_glucosa)
+
+    @property
+    def es_alerta(self):
+        """Indica si la lectura está fuera de los umbrales configurados"""
+        return ConfiguracionUtils.get_status_glucosa(self.valor_glucosa) != 'normal'
+
+
+class ResumenGlucosa(models.Model):
+    """
+    Resumen agregado de lecturas por intervalo de tiempo.
+    Tabla de rollup para gráficas de largo plazo (15 minutos, hora y día).
+    """
+
+    class ResolucionChoices(models.TextChoices):
+        QUINCE_MINUTOS = '15m', '15 minutos'
+        HORA = '1h', 'Hora'
+        DIA = '1d', 'Día'
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='resumenes_glucosa'
+    )
+    resolucion = models.CharField(
+        max_length=3,
+        choices=ResolucionChoices.choices
+    )
+    inicio = models.DateTimeField(help_text="Inicio del intervalo agregado")
+    minimo = models.DecimalField(max_digits=5, decimal_places=2)
+    maximo = models.DecimalField(max_digits=5, decimal_places=2)
+    suma = models.DecimalField(max_digits=14, decimal_places=2)
+    conteo = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'resumenes_glucosa'
+        verbose_name = 'Resumen de Glucosa'
+        verbose_name_plural = 'Resúmenes de Glucosa'
+        ordering = ['-inicio']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'resolucion', 'inicio'],
+                name='resumen_glucosa_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_resolucion_display()} {self.inicio.strftime('%d/%m/%Y %H:%M')} ({self.conteo} lecturas)"
+
+    @property
+    def promedio(self):
+        """Promedio de glucosa del intervalo"""
+        return round(self.suma / self.conteo, 2) if self.conteo else None
+
+
+class EpisodioGlucosa(models.Model):
+    """
+    Episodio de hipo o hiperglucemia detectado a partir de lecturas consecutivas.
+    Tabla derivada para tableros de alertas sin recorrer la serie cruda.
+    """
+
+    class TipoChoices(models.TextChoices):
+        HIPOGLUCEMIA = 'hipoglucemia', 'Hipoglucemia'
+        HIPERGLUCEMIA = 'hiperglucemia', 'Hiperglucemia'
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='episodios_glucosa'
+    )
+    tipo = models.CharField(
+        max_length=20,
+        choices=TipoChoices.choices
+    )
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    duracion = models.DurationField()
+    valor_extremo = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        help_text="Nadir (hipoglucemia) o pico (hiperglucemia) del episodio (mg/dL)"
+    )
+    lecturas = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'episodios_glucosa'
+        verbose_name = 'Episodio de Glucosa'
+        verbose_name_plural = 'Episodios de Glucosa'
+        ordering = ['-inicio']
+        indexes = [
+            models.Index(fields=['usuario', '-inicio']),
+            models.Index(fields=['usuario', 'tipo', '-inicio']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.inicio.strftime('%d/%m/%Y %H:%M')} ({self.duracion})"
+
+
+class RespuestaPosprandial(models.Model):
+    """
+    Respuesta glucémica de 2 horas posterior a una comida.
+    Se persiste por comida y se recalcula solo cuando cambian la comida o
+    las lecturas de su ventana.
+    """
+
+    comida = models.OneToOneField(
+        'nutrition.Comida',
+        on_delete=models.CASCADE,
+        related_name='respuesta_posprandial'
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='respuestas_posprandiales'
+    )
+    fecha_hora = models.DateTimeField(help_text="Fecha y hora de la comida")
+    glucosa_basal = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Última lectura en los 30 minutos previos a la comida (mg/dL)"
+    )
+    glucosa_pico = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    excursion = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Pico menos basal (mg/dL)"
+    )
+    minutos_al_pico = models.PositiveIntegerField(null=True, blank=True)
+    auc_incremental = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Área incremental bajo la curva sobre la basal (mg/dL·min)"
+    )
+    lecturas = models.PositiveIntegerField(default=0)
+    calculado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'respuestas_posprandiales'
+        verbose_name = 'Respuesta Posprandial'
+        verbose_name_plural = 'Respuestas Posprandiales'
+        ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_hora']),
+        ]
+
+    def __str__(self):
+        return f"Respuesta posprandial - {self.comida}"
+
+
+class EstadoPronostico(models.Model):
+    """
+    Estado del modelo de tendencia en línea de cada usuario.
+    Se actualiza en O(1) con cada lectura nueva (ver glucose.pronostico).
+    """
+
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='estado_pronostico'
+    )
+    ultima_fecha_hora = models.DateTimeField(null=True, blank=True)
+    ultimo_valor = models.FloatField(null=True, blank=True)
+    s0 = models.FloatField(default=0)
+    st = models.FloatField(default=0)
+    sv = models.FloatField(default=0)
+    stt = models.FloatField(default=0)
+    stv = models.FloatField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'estados_pronostico'
+        verbose_name = 'Estado de Pronóstico'
+        verbose_name_plural = 'Estados de Pronóstico'
+
+    def __str__(self):
+        return f"Pronóstico - usuario {self.usuario_id}"
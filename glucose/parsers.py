@@ -0,0 +1,23 @@
+import json
+from rest_framework.parsers import BaseParser
+from rest_framework.exceptions import ParseError
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser para cargas NDJSON (un objeto JSON por línea).
+    Formato usado por los monitores continuos al sincronizar lecturas.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        items = []
+        for numero, linea in enumerate(stream, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                items.append(json.loads(linea))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON inválido en la línea {numero}: {exc}')
+        return items
@@ -0,0 +1,104 @@
+import math
+
+# Flechas de tendencia estándar de CGM según la pendiente (mg/dL por minuto)
+TENDENCIAS = (
+    (3, 'subiendo_rapido'),
+    (2, 'subiendo'),
+    (1, 'subiendo_lento'),
+    (-1, 'estable'),
+    (-2, 'bajando_lento'),
+    (-3, 'bajando'),
+)
+
+
+def clasificar_tendencia(pendiente):
+    '''Convertir una pendiente (mg/dL/min) en la flecha de tendencia correspondiente.'''
+    for limite, tendencia in TENDENCIAS:
+        if pendiente > limite:
+            return tendencia
+    return 'bajando_rapido'
+
+
+class ModeloTendencia:
+    '''
+    Regresión lineal en línea con olvido exponencial sobre (minutos, glucosa).
+
+    El estado son cinco sumas ponderadas con el origen de tiempo en la última
+    lectura. Cada lectura nueva traslada el origen, aplica el decaimiento
+    exp(-Δt/tau) y suma el punto: O(1) en tiempo y memoria por usuario, sin
+    releer el historial. Un hueco mayor a max_hueco reinicia el modelo.
+    '''
+
+    TAU_MINUTOS = 20.0
+    MAX_HUECO_MINUTOS = 60.0
+    PESO_MINIMO = 2.5
+
+    __slots__ = ('ultima_ts', 'ultimo_valor', 's0', 'st', 'sv', 'stt', 'stv')
+
+    def __init__(self, ultima_ts=None, ultimo_valor=None, s0=0.0, st=0.0, sv=0.0, stt=0.0, stv=0.0):
+        self.ultima_ts = ultima_ts
+        self.ultimo_valor = ultimo_valor
+        self.s0 = s0
+        self.st = st
+        self.sv = sv
+        self.stt = stt
+        self.stv = stv
+
+    def reiniciar(self):
+        self.ultima_ts = self.ultimo_valor = None
+        self.s0 = self.st = self.sv = self.stt = self.stv = 0.0
+
+    def actualizar(self, ts, valor):
+        '''
+        Incorporar una lectura (ts en segundos epoch, valor en mg/dL).
+
+        Returns:
+            bool: False si la lectura es anterior a la última y se ignoró
+        '''
+        if self.ultima_ts is not None:
+            delta = (ts - self.ultima_ts) / 60.0
+            if delta < 0:
+                return False
+            if delta > self.MAX_HUECO_MINUTOS:
+                self.reiniciar()
+            else:
+                # Trasladar el origen a la nueva lectura (t' = t - delta) y decaer
+                self.stt = self.stt - 2 * delta * self.st + delta * delta * self.s0
+                self.stv = self.stv - delta * self.sv
+                self.st = self.st - delta * self.s0
+                decaimiento = math.exp(-delta / self.TAU_MINUTOS)
+                self.s0 *= decaimiento
+                self.st *= decaimiento
+                self.sv *= decaimiento
+                self.stt *= decaimiento
+                self.stv *= decaimiento
+
+        self.s0 += 1.0
+        self.sv += valor
+        self.ultima_ts = ts
+        self.ultimo_valor = valor
+        return True
+
+    def ajuste(self):
+        '''
+        Intercepto (en la última lectura) y pendiente del ajuste actual.
+
+        Returns:
+            tuple | None: (intercepto mg/dL, pendiente mg/dL/min) o None si no hay datos suficientes
+        '''
+        if self.s0 < self.PESO_MINIMO:
+            return None
+        denominador = self.s0 * self.stt - self.st * self.st
+        if denominador <= 1e-9:
+            return None
+        pendiente = (self.s0 * self.stv - self.st * self.sv) / denominador
+        intercepto = (self.sv - pendiente * self.st) / self.s0
+        return intercepto, pendiente
+
+    def predecir(self, minutos):
+        '''Valor esperado `minutos` después de la última lectura, o None.'''
+        ajuste = self.ajuste()
+        if ajuste is None:
+            return None
+        intercepto, pendiente = ajuste
+        return intercepto + pendiente * minutos
@@ -1,5 +1,12 @@
 from rest_framework import serializers
-from .models import RangoGlucosaReferencia, MedicionGlucosa
+from .models import (
+    RangoGlucosaReferencia,
+    MedicionGlucosa,
+    ResumenGlucosa,
+    EpisodioGlucosa,
+    RespuestaPosprandial,
+)
+from .utils import ClasificacionUtils
 
 
 class RangoGlucosaReferenciaSerializer(serializers.ModelSerializer):
@@ -8,13 +15,51 @@ class RangoGlucosaReferenciaSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class MedicionGlucosaListSerializer(serializers.ListSerializer):
+    """Clasifica todas las lecturas del listado en una sola pasada"""
+
+    def to_representation(self, data):
+        mediciones = list(data.all() if hasattr(data, 'all') else data)
+        ClasificacionUtils.anotar(mediciones)
+        return super().to_representation(mediciones)
+
+
 class MedicionGlucosaSerializer(serializers.ModelSerializer):
     clasificacion = serializers.SerializerMethodField()
-    es_alerta = serializers.ReadOnlyField()
+    es_alerta = serializers.SerializerMethodField()
 
     class Meta:
         model = MedicionGlucosa
         fields = '__all__'
+        list_serializer_class = MedicionGlucosaListSerializer
 
     def get_clasificacion(self, obj):
-        return obj.get_clasificacion()
\ No newline at end of file
+        if hasattr(obj, '_clasificacion'):
+            return obj._clasificacion
+        return obj.get_clasificacion()
+
+    def get_es_alerta(self, obj):
+        if hasattr(obj, '_es_alerta'):
+            return obj._es_alerta
+        return obj.es_alerta
+
+class ResumenGlucosaSerializer(serializers.ModelSerializer):
+    promedio = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ResumenGlucosa
+        fields = ['resolucion', 'inicio', 'minimo', 'maximo', 'promedio', 'conteo']
+
+
+class EpisodioGlucosaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EpisodioGlucosa
+        fields = '__all__'
+
+
+class RespuestaPosprandialSerializer(serializers.ModelSerializer):
+    tipo_comida = serializers.CharField(source='comida.tipo_comida', read_only=True)
+
+    class Meta:
+        model = RespuestaPosprandial
+        fields = '__all__'
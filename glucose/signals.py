@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from nutrition.models import Comida
+from .models import RangoGlucosaReferencia
+from .utils import PosprandialUtils, RangoUtils
+
+
+@receiver(post_save, sender=Comida)
+def recalcular_respuesta_posprandial(sender, instance, **kwargs):
+    """Recalcula la respuesta glucémica cuando se crea o modifica una comida"""
+    PosprandialUtils.recalcular_comidas(instance.usuario_id, comida_ids=[instance.pk])
+
+
+@receiver(post_save, sender=RangoGlucosaReferencia)
+@receiver(post_delete, sender=RangoGlucosaReferencia)
+def invalidar_indice_rangos(sender, **kwargs):
+    """Publica una nueva versión del índice de rangos para todos los procesos"""
+    RangoUtils.invalidar()
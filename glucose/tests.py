@@ -1,3 +1,740 @@
-from django.test import TestCase
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import ConfiguracionSistema
+from core.utils import ConfiguracionUtils
+from nutrition.models import Comida
+from .models import EpisodioGlucosa, MedicionGlucosa, RangoGlucosaReferencia, RespuestaPosprandial, ResumenGlucosa
+from .pronostico import ModeloTendencia, clasificar_tendencia
+from .tiempo_real import BackendPubSub
+from .utils import ClasificacionUtils, EpisodioUtils, IndiceRangos, IngestaUtils, PronosticoUtils, RangoUtils, ResumenUtils
+from .views import _autenticar_stream
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FechaHoraParametrosTests(TestCase):
+    """Los parámetros desde/hasta sin desfase o con fechas inexistentes no producen errores 500"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_agp_hasta_sin_desfase(self):
+        respuesta = self.client.get('/mediciones-glucosa/agp/', {'hasta': '2026-10-10T00:00:00'})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_agp_hasta_inexistente(self):
+        respuesta = self.client.get('/mediciones-glucosa/agp/', {'hasta': '2026-02-30T00:00:00'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('hasta', respuesta.data)
+
+    def test_listados_desde_hasta(self):
+        for ruta in ('/mediciones-glucosa/', '/episodios-glucosa/', '/respuestas-posprandiales/'):
+            with self.subTest(ruta=ruta):
+                respuesta = self.client.get(ruta, {'desde': '2026-10-01T00:00:00', 'hasta': '2026-10-10T00:00:00'})
+                self.assertEqual(respuesta.status_code, 200)
+                respuesta = self.client.get(ruta, {'desde': '2026-13-01T00:00:00'})
+                self.assertEqual(respuesta.status_code, 400)
+
+
+class ImportarCgmTests(TestCase):
+    """Una celda no numérica cuenta como fila inválida sin abortar la importación"""
+
+    def test_valores_no_finitos(self):
+        usuario = User.objects.create_user('paciente', password='x')
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'cgm.csv')
+            with open(archivo, 'w') as f:
+                f.write('timestamp,glucose mg/dl\n')
+                f.write('2026-10-01T08:00:00+00:00,110\n')
+                f.write('2026-10-01T08:05:00+00:00,NaN\n')
+                f.write('2026-10-01T08:10:00+00:00,Infinity\n')
+                f.write('2026-10-01T08:15:00+00:00,-inf\n')
+                f.write('2026-10-01T08:20:00+00:00,120\n')
+            salida = StringIO()
+            call_command('importar_cgm', archivo, usuario=usuario.pk, stdout=salida)
+
+        self.assertEqual(MedicionGlucosa.objects.filter(usuario=usuario).count(), 2)
+        self.assertIn('2 insertadas, 0 duplicadas, 3 inválidas', salida.getvalue())
+
+    def test_historico_descendente_sin_notificar(self):
+        usuario = User.objects.create_user('paciente', password='x')
+        base = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+        # 2.5 mg/dL por minuto, del más reciente al más antiguo
+        lecturas = [(base + timedelta(minutes=5 * i), 100 + Decimal('12.5') * i) for i in range(12)]
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'cgm.csv')
+            with open(archivo, 'w') as f:
+                f.write('timestamp,glucose mg/dl\n')
+                for fecha_hora, valor in reversed(lecturas):
+                    f.write(f'{fecha_hora.isoformat()},{valor}\n')
+            with mock.patch('glucose.utils.publicar_evento') as publicar:
+                with self.captureOnCommitCallbacks(execute=True):
+                    call_command('importar_cgm', archivo, usuario=usuario.pk, tamano_lote=2, stdout=StringIO())
+
+        publicar.assert_not_called()
+        self.assertEqual(MedicionGlucosa.objects.filter(usuario=usuario).count(), 12)
+        pronostico = PronosticoUtils.pronosticar(usuario.pk, ahora=lecturas[-1][0] + timedelta(minutes=5))
+        self.assertTrue(pronostico['vigente'])
+        self.assertEqual(pronostico['ultima_lectura']['valor_glucosa'], 237.5)
+        self.assertEqual(pronostico['pendiente'], 2.5)
+        self.assertEqual([p['valor_glucosa'] for p in pronostico['pronosticos']], [312.5, 387.5])
+
+
+class StreamAutenticacionTests(TestCase):
+    """El stream acepta el header Authorization o un ticket de un solo uso, nunca el JWT en la URL"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_header_authorization(self):
+        request = self.factory.get('/tiempo-real/glucosa/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        self.assertEqual(_autenticar_stream(request), self.usuario)
+
+    def test_jwt_en_la_url_rechazado(self):
+        request = self.factory.get('/tiempo-real/glucosa/', {'token': str(AccessToken.for_user(self.usuario))})
+        self.assertIsNone(_autenticar_stream(request))
+
+    def test_ticket_de_un_solo_uso(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        respuesta = client.post('/mediciones-glucosa/ticket-stream/')
+        self.assertEqual(respuesta.status_code, 201)
+        ticket = respuesta.data['ticket']
+
+        self.assertEqual(_autenticar_stream(self.factory.get('/tiempo-real/glucosa/', {'ticket': ticket})), self.usuario)
+        self.assertIsNone(_autenticar_stream(self.factory.get('/tiempo-real/glucosa/', {'ticket': ticket})))
+        self.assertIsNone(_autenticar_stream(self.factory.get('/tiempo-real/glucosa/', {'ticket': 'inventado'})))
+
+    def test_backend_abstracto(self):
+        with self.assertRaises(TypeError):
+            BackendPubSub()
+
+
+class ResumenGlucosaTests(TestCase):
+    """Los rollups incrementales coinciden con una reconstrucción desde las lecturas crudas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.otro = User.objects.create_user('otro', password='x')
+        cls.base = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _ingerir(self, lecturas, usuario=None):
+        client = self.client
+        if usuario is not None:
+            client = APIClient()
+            client.force_authenticate(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = client.post('/mediciones-glucosa/ingesta/', [
+                {'valor_glucosa': str(valor), 'fecha_hora': (self.base + timedelta(minutes=minutos)).isoformat()}
+                for minutos, valor in lecturas
+            ], format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+
+    def _resumenes(self, usuario=None):
+        return sorted(
+            ResumenGlucosa.objects.filter(usuario=usuario or self.usuario)
+            .values_list('resolucion', 'inicio', 'minimo', 'maximo', 'suma', 'conteo')
+        )
+
+    def _reconstruidos(self):
+        ResumenUtils.reconstruir(self.usuario.pk)
+        return self._resumenes()
+
+    def test_acumulacion_incremental(self):
+        self._ingerir([(0, 100), (20, 80)])
+        self._ingerir([(10, 150), (65, 200), (24 * 60 - 60, 120)])
+        incrementales = self._resumenes()
+        self.assertEqual(incrementales, self._reconstruidos())
+
+        resumenes = {(r, inicio): (minimo, maximo, conteo) for r, inicio, minimo, maximo, _, conteo in incrementales}
+        self.assertEqual(resumenes[('15m', self.base)], (Decimal('100'), Decimal('150'), 2))
+        self.assertEqual(resumenes[('1h', self.base)], (Decimal('80'), Decimal('150'), 3))
+        self.assertEqual(resumenes[('1d', self.base.replace(hour=0))], (Decimal('80'), Decimal('200'), 4))
+        self.assertEqual(resumenes[('1d', self.base.replace(day=2, hour=0))], (Decimal('120'), Decimal('120'), 1))
+
+    def test_edicion_y_borrado_recalculan(self):
+        self._ingerir([(0, 100), (10, 150), (65, 200)])
+        medicion = MedicionGlucosa.objects.get(usuario=self.usuario, valor_glucosa=150)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(f'/mediciones-glucosa/{medicion.pk}/', {'valor_glucosa': '60'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        editados = self._resumenes()
+        self.assertEqual(editados, self._reconstruidos())
+
+        tardia = MedicionGlucosa.objects.get(usuario=self.usuario, valor_glucosa=200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/mediciones-glucosa/{tardia.pk}/').status_code, 204)
+        self.assertFalse(ResumenGlucosa.objects.filter(usuario=self.usuario, resolucion='1h',
+                                                       inicio=self.base + timedelta(hours=1)).exists())
+        self.assertEqual(self._resumenes(), self._reconstruidos())
+
+    def test_intervalo_creado_por_otra_ingesta(self):
+        self._ingerir([(0, 100)])
+        combinar = ResumenUtils._combinar
+        llamadas = []
+
+        def combinar_con_competencia(usuario_id, grupos):
+            nuevos = combinar(usuario_id, grupos)
+            if not llamadas:
+                # Otra ingesta confirma el mismo intervalo de 15 minutos antes de la inserción
+                ResumenGlucosa.objects.create(
+                    usuario_id=usuario_id, resolucion='15m', inicio=self.base + timedelta(minutes=30),
+                    minimo=Decimal('90'), maximo=Decimal('90'), suma=Decimal('90'), conteo=1
+                )
+            llamadas.append(grupos)
+            return nuevos
+
+        with mock.patch.object(ResumenUtils, '_combinar', side_effect=combinar_con_competencia):
+            self._ingerir([(5, 110), (35, 130)])
+
+        self.assertEqual(len(llamadas), 2)
+        resumen = ResumenGlucosa.objects.get(usuario=self.usuario, resolucion='15m', inicio=self.base + timedelta(minutes=30))
+        self.assertEqual((resumen.minimo, resumen.maximo, resumen.suma, resumen.conteo),
+                         (Decimal('90'), Decimal('130'), Decimal('220'), 2))
+        self.assertEqual(MedicionGlucosa.objects.filter(usuario=self.usuario).count(), 3)
+        resumen = ResumenGlucosa.objects.get(usuario=self.usuario, resolucion='15m', inicio=self.base)
+        self.assertEqual((resumen.suma, resumen.conteo), (Decimal('210'), 2))
+
+    def test_listado_por_resolucion(self):
+        self._ingerir([(0, 100), (10, 150), (20, 80), (65, 200)])
+        self._ingerir([(0, 300)], usuario=self.otro)
+
+        respuesta = self.client.get('/mediciones-glucosa/', {'resolution': '1h'})
+        self.assertEqual(respuesta.status_code, 200)
+        filas = [(fila['inicio'], fila['conteo'], fila['promedio']) for fila in respuesta.data['results']]
+        self.assertEqual(filas, [
+            ((self.base + timedelta(hours=1)).isoformat().replace('+00:00', 'Z'), 1, '200.00'),
+            (self.base.isoformat().replace('+00:00', 'Z'), 3, '110.00'),
+        ])
+
+        respuesta = self.client.get('/mediciones-glucosa/', {
+            'resolution': '15m', 'desde': (self.base + timedelta(minutes=15)).isoformat(),
+            'hasta': (self.base + timedelta(hours=1)).isoformat(),
+        })
+        self.assertEqual([fila['minimo'] for fila in respuesta.data['results']], ['80.00'])
+
+        self.assertEqual(len(self.client.get('/mediciones-glucosa/').data['results']), 4)
+        self.assertEqual(self.client.get('/mediciones-glucosa/', {'resolution': '1w'}).status_code, 400)
+
+    def test_comando_reconstruir(self):
+        self._ingerir([(0, 100), (10, 150), (65, 200)])
+        self._ingerir([(0, 300)], usuario=self.otro)
+        esperados = self._resumenes(), self._resumenes(self.otro)
+
+        ResumenGlucosa.objects.filter(usuario=self.usuario, resolucion='1h').delete()
+        ResumenGlucosa.objects.filter(usuario=self.otro).update(conteo=99)
+        salida = StringIO()
+        call_command('reconstruir_resumenes_glucosa', stdout=salida)
+
+        self.assertEqual((self._resumenes(), self._resumenes(self.otro)), esperados)
+        self.assertIn(f'Usuario {self.usuario.pk}: 5 intervalos', salida.getvalue())
+        self.assertIn('Rollups reconstruidos: 8 intervalos', salida.getvalue())
+
+
+class IngestaTests(TestCase):
+    """La ingesta masiva acepta JSON o NDJSON, reporta errores por índice y guarda las lecturas válidas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _ingerir(self, datos, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/mediciones-glucosa/ingesta/', datos, **kwargs)
+
+    def test_json_y_ndjson(self):
+        respuesta = self._ingerir([
+            {'valor_glucosa': 110, 'fecha_hora': '2026-10-01T08:00:00Z', 'notas': 'ayuno'},
+            {'valor_glucosa': '6.5e1', 'fecha_hora': '2026-10-01T08:05:00'},
+        ], format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data, {'recibidas': 2, 'creadas': 2, 'errores': []})
+
+        ndjson = (
+            '{"valor_glucosa": 120, "fecha_hora": "2026-10-01T08:10:00Z"}\n'
+            '\n'
+            '{"valor_glucosa": 130.456, "fecha_hora": "2026-10-01T08:15:00+02:00"}\n'
+        )
+        respuesta = self._ingerir(ndjson, content_type='application/x-ndjson')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['creadas'], 2)
+
+        mediciones = list(MedicionGlucosa.objects.filter(usuario=self.usuario).order_by('fecha_hora')
+                          .values_list('fecha_hora', 'valor_glucosa', 'notas'))
+        self.assertEqual(mediciones, [
+            (datetime(2026, 10, 1, 6, 15, tzinfo=dt_timezone.utc), Decimal('130.46'), ''),
+            (datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc), Decimal('110.00'), 'ayuno'),
+            (datetime(2026, 10, 1, 8, 5, tzinfo=dt_timezone.utc), Decimal('65.00'), ''),
+            (datetime(2026, 10, 1, 8, 10, tzinfo=dt_timezone.utc), Decimal('120.00'), ''),
+        ])
+
+        respuesta = self._ingerir('{"valor_glucosa": 1}\n{no es json', content_type='application/x-ndjson')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('línea 2', str(respuesta.data['detail']))
+
+    def test_errores_por_indice_y_exito_parcial(self):
+        respuesta = self._ingerir([
+            {'valor_glucosa': 100, 'fecha_hora': '2026-10-01T08:00:00Z'},
+            {'valor_glucosa': 700, 'fecha_hora': '2026-10-01T08:05:00Z'},
+            {'valor_glucosa': 'alto', 'fecha_hora': '2026-02-30T08:00:00Z'},
+            'lectura',
+            {'valor_glucosa': 'NaN', 'fecha_hora': 1727769600, 'notas': 5},
+            {'valor_glucosa': 90, 'fecha_hora': '2026-10-01T08:10:00Z'},
+        ], format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.data['recibidas'], respuesta.data['creadas']), (6, 2))
+        errores = {error['indice']: set(error['errores']) for error in respuesta.data['errores']}
+        self.assertEqual(errores, {
+            1: {'valor_glucosa'},
+            2: {'valor_glucosa', 'fecha_hora'},
+            3: {'non_field_errors'},
+            4: {'valor_glucosa', 'fecha_hora', 'notas'},
+        })
+        self.assertEqual(MedicionGlucosa.objects.filter(usuario=self.usuario).count(), 2)
+
+        respuesta = self._ingerir([{'valor_glucosa': 5, 'fecha_hora': '2026-10-01T09:00:00Z'}], format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data['creadas'], 0)
+        self.assertEqual(respuesta.data['errores'][0]['indice'], 0)
+
+    def test_limites_del_lote(self):
+        lote = [{'valor_glucosa': 100, 'fecha_hora': f'2026-10-01T08:{i:02d}:00Z'} for i in range(4)]
+        with mock.patch.object(IngestaUtils, 'MAX_MEDICIONES_POR_LOTE', 3):
+            respuesta = self._ingerir(lote, format='json')
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn('Máximo 3', respuesta.data['detail'])
+            self.assertEqual(self._ingerir(lote[:3], format='json').status_code, 201)
+        self.assertEqual(self._ingerir({'valor_glucosa': 100}, format='json').status_code, 400)
+        self.assertEqual(MedicionGlucosa.objects.filter(usuario=self.usuario).count(), 3)
+
+
+class ClasificacionLoteTests(TestCase):
+    """La clasificación por lote coincide con get_clasificacion y es_alerta de cada lectura"""
+
+    VALORES = [
+        '20', '69.99', '70', '70.01', '149.99', '150', '180', '180.01', '199.99', '200', '200.01',
+        '250', '250.01', '299.99', '300', '300.01', '599.99', '600',
+    ]
+
+    def setUp(self):
+        RangoUtils._indice = None
+        ConfiguracionUtils.invalidate_cache()
+
+    def tearDown(self):
+        RangoUtils._indice = None
+        ConfiguracionUtils.invalidate_cache()
+
+    def _comparar(self):
+        valores = [Decimal(valor) for valor in self.VALORES]
+        clasificaciones, alertas = ClasificacionUtils.clasificar_lote(valores)
+        mediciones = [MedicionGlucosa(valor_glucosa=valor) for valor in valores]
+        self.assertEqual(clasificaciones, [medicion.get_clasificacion() for medicion in mediciones])
+        self.assertEqual(alertas, [medicion.es_alerta for medicion in mediciones])
+        return dict(zip(self.VALORES, clasificaciones))
+
+    def test_sin_rangos_usa_umbrales(self):
+        resultado = self._comparar()
+        self.assertEqual((resultado['69.99'], resultado['70'], resultado['200'], resultado['200.01']),
+                         ('hipoglucemia', 'normal', 'normal', 'hiperglucemia'))
+
+    def test_rangos_superpuestos_y_huecos(self):
+        for nombre, minimo, maximo in (
+            ('Baja', '0', '69.99'), ('Normal', '70', '180'), ('Elevada', '150', '250'), ('Muy alta', '300.01', '600'),
+        ):
+            RangoGlucosaReferencia.objects.create(nombre=nombre, valor_minimo=minimo, valor_maximo=maximo)
+        resultado = self._comparar()
+        self.assertEqual(
+            [resultado[valor] for valor in ('69.99', '70', '150', '180.01', '250', '250.01', '300', '300.01')],
+            ['Baja', 'Normal', 'Normal', 'Elevada', 'Elevada', 'hiperglucemia', 'hiperglucemia', 'Muy alta']
+        )
+
+    def test_umbrales_configurados(self):
+        ConfiguracionSistema.objects.update_or_create(
+            pk=1, defaults={'umbral_hipoglucemia': Decimal('80'), 'umbral_hiperglucemia': Decimal('180')}
+        )
+        RangoGlucosaReferencia.objects.create(nombre='Objetivo', valor_minimo='100', valor_maximo='140')
+        resultado = self._comparar()
+        self.assertEqual((resultado['70.01'], resultado['180'], resultado['180.01']),
+                         ('hipoglucemia', 'normal', 'hiperglucemia'))
+
+    def test_listado(self):
+        usuario = User.objects.create_user('paciente', password='x')
+        RangoGlucosaReferencia.objects.create(nombre='Normal', valor_minimo='70', valor_maximo='180')
+        base = datetime(2026, 10, 1, tzinfo=dt_timezone.utc)
+        MedicionGlucosa.objects.bulk_create([
+            MedicionGlucosa(usuario=usuario, valor_glucosa=Decimal(valor), fecha_hora=base + timedelta(minutes=i))
+            for i, valor in enumerate(self.VALORES)
+        ])
+        client = APIClient()
+        client.force_authenticate(usuario)
+        filas = client.get('/mediciones-glucosa/', {'page_size': 100}).data['results']
+        self.assertEqual(len(filas), len(self.VALORES))
+        for fila in filas:
+            medicion = MedicionGlucosa.objects.get(pk=fila['id'])
+            self.assertEqual((fila['clasificacion'], fila['es_alerta']),
+                             (medicion.get_clasificacion(), medicion.es_alerta))
+
+
+class IndiceRangosTests(TestCase):
+    """El índice de intervalos responde igual que una consulta directa y se reconstruye con cada escritura"""
+
+    def setUp(self):
+        RangoUtils._indice = None
+
+    def tearDown(self):
+        RangoUtils._indice = None
+
+    @staticmethod
+    def _consulta(valor):
+        return RangoGlucosaReferencia.objects.filter(
+            valor_minimo__lte=valor, valor_maximo__gte=valor
+        ).order_by('valor_minimo', 'id').values_list('nombre', flat=True).first()
+
+    def _escribir(self, funcion):
+        with self.captureOnCommitCallbacks(execute=True):
+            return funcion()
+
+    def test_coincide_con_la_consulta(self):
+        aleatorio = random.Random(3)
+        for i in range(25):
+            minimo = Decimal(aleatorio.randint(0, 50000)) / 100
+            maximo = minimo + Decimal(aleatorio.randint(0, 15000)) / 100
+            RangoGlucosaReferencia.objects.create(nombre=f'Rango {i}', valor_minimo=minimo, valor_maximo=maximo)
+        # Rangos con los mismos límites: gana el de menor id
+        RangoGlucosaReferencia.objects.create(nombre='Duplicado A', valor_minimo='610', valor_maximo='620')
+        RangoGlucosaReferencia.objects.create(nombre='Duplicado B', valor_minimo='610', valor_maximo='620')
+
+        limites = RangoGlucosaReferencia.objects.values_list('valor_minimo', 'valor_maximo')
+        valores = sorted(
+            {limite + delta for par in limites for limite in par for delta in (Decimal('-0.01'), 0, Decimal('0.01'))}
+            | {Decimal(aleatorio.randint(0, 70000)) / 100 for _ in range(300)}
+        )
+        indice = IndiceRangos.desde_bd()
+        esperados = [self._consulta(valor) for valor in valores]
+        self.assertEqual([indice.buscar(valor) for valor in valores], esperados)
+        self.assertEqual(list(indice.buscar_lote(np.array([float(valor) for valor in valores]))), esperados)
+        self.assertEqual(indice.buscar(Decimal('615')), 'Duplicado A')
+
+    def test_indice_vacio(self):
+        indice = IndiceRangos.desde_bd()
+        self.assertIsNone(indice.buscar(100))
+        self.assertEqual(list(indice.buscar_lote(np.array([20.0, 600.0]))), [None, None])
+
+    def test_se_reconstruye_al_guardar_y_borrar(self):
+        self.assertIsNone(RangoUtils.get_indice().buscar(100))
+        rango = self._escribir(lambda: RangoGlucosaReferencia.objects.create(
+            nombre='Normal', valor_minimo='70', valor_maximo='180'
+        ))
+        self.assertEqual(RangoUtils.get_indice().buscar(100), 'Normal')
+
+        rango.valor_maximo = Decimal('90')
+        self._escribir(rango.save)
+        self.assertIsNone(RangoUtils.get_indice().buscar(100))
+        self.assertEqual(RangoUtils.get_indice().buscar(90), 'Normal')
+
+        self._escribir(rango.delete)
+        self.assertIsNone(RangoUtils.get_indice().buscar(90))
+
+    def test_version_publicada_por_otro_proceso(self):
+        indice = RangoUtils.get_indice()
+        # Otro proceso guardó un rango: este solo ve la nueva versión en el cache compartido
+        RangoGlucosaReferencia.objects.create(nombre='Normal', valor_minimo='70', valor_maximo='180')
+        cache.set(RangoUtils.CLAVE_VERSION, 'otra-version', None)
+        self.assertIs(RangoUtils.get_indice(), indice)
+
+        RangoUtils._verificado = 0.0
+        self.assertIsNot(RangoUtils.get_indice(), indice)
+        self.assertEqual(RangoUtils.get_indice().buscar(100), 'Normal')
+
+
+class EpisodioGlucosaTests(TestCase):
+    """Las lecturas tardías unen o parten episodios igual que una redetección completa"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.base = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        ConfiguracionUtils.invalidate_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _ingerir(self, *lecturas):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/mediciones-glucosa/ingesta/', [
+                {'valor_glucosa': valor, 'fecha_hora': (self.base + timedelta(minutes=minutos)).isoformat()}
+                for minutos, valor in lecturas
+            ], format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+    def _episodios(self):
+        '''Episodios guardados, verificando que coinciden con redetectar todo el historial.'''
+        guardados = list(EpisodioGlucosa.objects.filter(usuario=self.usuario).order_by('inicio').values_list(
+            'tipo', 'inicio', 'fin', 'duracion', 'lecturas', 'valor_extremo'
+        ))
+        EpisodioUtils.reconstruir(self.usuario.pk)
+        self.assertEqual(guardados, list(EpisodioGlucosa.objects.filter(usuario=self.usuario).order_by('inicio').values_list(
+            'tipo', 'inicio', 'fin', 'duracion', 'lecturas', 'valor_extremo'
+        )))
+        return [(tipo, inicio - self.base, fin - self.base, lecturas, valor) for tipo, inicio, fin, _, lecturas, valor in guardados]
+
+    def test_lectura_tardia_une_episodios(self):
+        self._ingerir((0, 250), (5, 240), (45, 260), (50, 230))
+        self.assertEqual(len(self._episodios()), 2)
+
+        self._ingerir((25, 255))
+        self.assertEqual(self._episodios(), [
+            ('hiperglucemia', timedelta(0), timedelta(minutes=50), 5, Decimal('260.00')),
+        ])
+
+    def test_lectura_tardia_parte_un_episodio(self):
+        self._ingerir((0, 60), (10, 55), (20, 50), (30, 65))
+        self._ingerir((15, 120))
+        self.assertEqual(self._episodios(), [
+            ('hipoglucemia', timedelta(0), timedelta(minutes=10), 2, Decimal('55.00')),
+            ('hipoglucemia', timedelta(minutes=20), timedelta(minutes=30), 2, Decimal('50.00')),
+        ])
+
+    def test_lecturas_contiguas(self):
+        self._ingerir((0, 250), (5, 240))
+        # Extiende el episodio por la derecha, luego un cambio de tipo sin hueco abre otro
+        self._ingerir((35, 245))
+        self._ingerir((40, 60))
+        self._ingerir((-30, 210))
+        self.assertEqual(self._episodios(), [
+            ('hiperglucemia', timedelta(minutes=-30), timedelta(minutes=35), 4, Decimal('250.00')),
+            ('hipoglucemia', timedelta(minutes=40), timedelta(minutes=40), 1, Decimal('60.00')),
+        ])
+        # Más de MAX_HUECO antes del inicio: episodio aparte
+        self._ingerir((-61, 220))
+        self.assertEqual(len(self._episodios()), 3)
+
+    def test_edicion_y_borrado(self):
+        self._ingerir((0, 250), (15, 255), (30, 260))
+        medio = MedicionGlucosa.objects.get(usuario=self.usuario, fecha_hora=self.base + timedelta(minutes=15))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/mediciones-glucosa/{medio.pk}/', {'valor_glucosa': '150'}, format='json')
+        self.assertEqual([episodio[:4] for episodio in self._episodios()], [
+            ('hiperglucemia', timedelta(0), timedelta(0), 1),
+            ('hiperglucemia', timedelta(minutes=30), timedelta(minutes=30), 1),
+        ])
+
+        # Sin la lectura normal el hueco es exactamente MAX_HUECO: vuelven a unirse
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/mediciones-glucosa/{medio.pk}/')
+        self.assertEqual([episodio[:4] for episodio in self._episodios()], [
+            ('hiperglucemia', timedelta(0), timedelta(minutes=30), 2),
+        ])
+
+
+class RespuestaPosprandialTests(TestCase):
+    """Basal, pico, excursión, tiempo al pico e iAUC calculados a mano, y su recálculo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.base = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _ingerir(self, *lecturas):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/mediciones-glucosa/ingesta/', [
+                {'valor_glucosa': valor, 'fecha_hora': (self.base + timedelta(minutes=minutos)).isoformat()}
+                for minutos, valor in lecturas
+            ], format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+    def _comida(self, minutos=0):
+        return Comida.objects.create(usuario=self.usuario, tipo_comida='desayuno',
+                                     fecha_hora=self.base + timedelta(minutes=minutos))
+
+    @staticmethod
+    def _valores(comida):
+        respuesta = RespuestaPosprandial.objects.get(comida=comida)
+        return (respuesta.glucosa_basal, respuesta.glucosa_pico, respuesta.excursion,
+                respuesta.minutos_al_pico, respuesta.auc_incremental, respuesta.lecturas)
+
+    def test_valores_calculados(self):
+        # Basal: última lectura de los 30 minutos previos; ventana de 2 horas (inclusive)
+        self._ingerir((-40, 95), (-10, 100), (15, 140), (45, 180), (90, 150), (120, 110), (125, 300))
+        comida = self._comida()
+        # iAUC sobre la basal: 15×40/2 + 30×(40+80)/2 + 45×(80+50)/2 + 30×(50+10)/2
+        self.assertEqual(self._valores(comida), (
+            Decimal('100.00'), Decimal('180.00'), Decimal('80.00'), 45, Decimal('5925.00'), 4
+        ))
+
+        respuesta = self.client.get('/respuestas-posprandiales/')
+        self.assertEqual(respuesta.status_code, 200)
+        fila = respuesta.data['results'][0]
+        self.assertEqual((fila['comida'], fila['tipo_comida'], fila['excursion']), (comida.pk, 'desayuno', '80.00'))
+
+    def test_sin_basal_o_sin_lecturas(self):
+        self._ingerir((-45, 100), (30, 160))
+        sin_basal = self._comida()
+        self.assertEqual(self._valores(sin_basal), (None, Decimal('160.00'), None, 30, None, 1))
+
+        sin_lecturas = self._comida(minutos=24 * 60)
+        self.assertEqual(self._valores(sin_lecturas), (None, None, None, None, None, 0))
+
+    def test_recalculo_por_lecturas_y_por_comida(self):
+        self._ingerir((-5, 100), (30, 160))
+        comida = self._comida()
+        self.assertEqual(self._valores(comida)[1:4], (Decimal('160.00'), Decimal('60.00'), 30))
+
+        # Lectura tardía dentro de la ventana: nuevo pico
+        self._ingerir((60, 210))
+        self.assertEqual(self._valores(comida)[1:4], (Decimal('210.00'), Decimal('110.00'), 60))
+
+        # Editar y borrar lecturas también recalcula
+        pico = MedicionGlucosa.objects.get(usuario=self.usuario, valor_glucosa=210)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/mediciones-glucosa/{pico.pk}/', {'valor_glucosa': '120'}, format='json')
+        self.assertEqual(self._valores(comida)[1:4], (Decimal('160.00'), Decimal('60.00'), 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/mediciones-glucosa/{pico.pk}/')
+        self.assertEqual(self._valores(comida)[5], 1)
+
+        # Mover la comida cambia su ventana
+        comida.fecha_hora = self.base + timedelta(minutes=20)
+        comida.save()
+        self.assertEqual(self._valores(comida), (Decimal('100.00'), Decimal('160.00'), Decimal('60.00'), 10,
+                                                 Decimal('300.00'), 1))
+        self.assertEqual(RespuestaPosprandial.objects.count(), 1)
+
+
+class PronosticoTests(TestCase):
+    """El estado incremental del pronóstico equivale a la regresión ponderada sobre el historial"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _ingerir(self, lecturas):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/mediciones-glucosa/ingesta/', [
+                {'valor_glucosa': valor, 'fecha_hora': fecha_hora.isoformat()} for fecha_hora, valor in lecturas
+            ], format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+    def test_actualizacion_equivale_a_regresion_ponderada(self):
+        aleatorio = random.Random(5)
+        ts, valores, t = [], [], 0.0
+        for _ in range(40):
+            t += aleatorio.uniform(1, 8) * 60
+            ts.append(t)
+            valores.append(120 + 1.7 * t / 60 + aleatorio.uniform(-6, 6))
+
+        modelo = ModeloTendencia()
+        for t, valor in zip(ts, valores):
+            self.assertTrue(modelo.actualizar(t, valor))
+        self.assertFalse(modelo.actualizar(ts[-2], 500))
+
+        minutos = (np.array(ts) - ts[-1]) / 60
+        pesos = np.exp(minutos / ModeloTendencia.TAU_MINUTOS)
+        pendiente, intercepto = np.polyfit(minutos, valores, 1, w=np.sqrt(pesos))
+        self.assertAlmostEqual(modelo.ajuste()[0], intercepto, places=6)
+        self.assertAlmostEqual(modelo.ajuste()[1], pendiente, places=6)
+        self.assertAlmostEqual(modelo.predecir(30), intercepto + 30 * pendiente, places=5)
+        self.assertEqual(modelo.ultimo_valor, valores[-1])
+
+    def test_datos_escasos_y_huecos(self):
+        modelo = ModeloTendencia()
+        self.assertIsNone(modelo.ajuste())
+        # Tres lecturas cada 5 minutos no alcanzan PESO_MINIMO tras el decaimiento
+        for minutos in (0, 5, 10):
+            modelo.actualizar(minutos * 60, 100 + 2 * minutos)
+        self.assertLess(modelo.s0, ModeloTendencia.PESO_MINIMO)
+        self.assertIsNone(modelo.predecir(30))
+        modelo.actualizar(15 * 60, 130)
+        self.assertAlmostEqual(modelo.ajuste()[1], 2.0)
+        self.assertAlmostEqual(modelo.predecir(30), 190.0)
+
+        # Un hueco mayor a MAX_HUECO_MINUTOS reinicia el modelo
+        modelo.actualizar(modelo.ultima_ts + 61 * 60, 200)
+        self.assertEqual(modelo.s0, 1.0)
+        self.assertIsNone(modelo.ajuste())
+
+    def test_tendencias(self):
+        self.assertEqual(
+            [clasificar_tendencia(p) for p in (3.01, 3, 2.01, 1.01, 1, -1, -1.01, -2.01, -3, -3.01)],
+            ['subiendo_rapido', 'subiendo', 'subiendo', 'subiendo_lento', 'estable', 'bajando_lento',
+             'bajando_lento', 'bajando', 'bajando_rapido', 'bajando_rapido']
+        )
+
+    def test_endpoint(self):
+        respuesta = self.client.get('/mediciones-glucosa/pronostico/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data, {'vigente': False, 'ultima_lectura': None, 'tendencia': None,
+                                          'pendiente': None, 'pronosticos': []})
+
+        ultima = timezone.now().replace(microsecond=0) - timedelta(minutes=2)
+        self._ingerir([(ultima - timedelta(minutes=5 * i), 500 - Decimal('12.5') * i) for i in range(1, 4)])
+        self.assertFalse(self.client.get('/mediciones-glucosa/pronostico/').data['vigente'])
+
+        # Una lectura tardía, anterior a la última, no altera el estado
+        self._ingerir([(ultima - timedelta(minutes=20), 100)])
+        self.assertFalse(self.client.get('/mediciones-glucosa/pronostico/').data['vigente'])
+
+        self._ingerir([(ultima, 500)])
+        datos = self.client.get('/mediciones-glucosa/pronostico/').data
+        self.assertTrue(datos['vigente'])
+        self.assertEqual((datos['tendencia'], datos['pendiente']), ('subiendo', 2.5))
+        self.assertEqual(datos['ultima_lectura'], {'fecha_hora': ultima, 'valor_glucosa': 500.0})
+        # A 60 minutos se supera el máximo fisiológico y se acota
+        self.assertEqual([(p['minutos'], p['fecha_hora'], p['valor_glucosa']) for p in datos['pronosticos']], [
+            (30, ultima + timedelta(minutes=30), 575.0), (60, ultima + timedelta(minutes=60), 600.0),
+        ])
+
+        vencido = PronosticoUtils.pronosticar(self.usuario.pk, ahora=ultima + PronosticoUtils.VIGENCIA + timedelta(seconds=1))
+        self.assertFalse(vencido['vigente'])
+        self.assertEqual(vencido['ultima_lectura']['valor_glucosa'], 500.0)
+
+    def test_reconstruccion_tras_borrar(self):
+        ultima = timezone.now().replace(microsecond=0) - timedelta(minutes=1)
+        self._ingerir([(ultima - timedelta(minutes=5 * i), 200 - 10 * i) for i in range(6)])
+        medicion = MedicionGlucosa.objects.get(usuario=self.usuario, fecha_hora=ultima)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/mediciones-glucosa/{medicion.pk}/').status_code, 204)
+
+        datos = self.client.get('/mediciones-glucosa/pronostico/').data
+        self.assertEqual(datos['ultima_lectura']['valor_glucosa'], 190.0)
+        self.assertEqual(datos['pendiente'], 2.0)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class BackendPubSub(ABC):
+    '''
+    Interfaz de publicación/suscripción para el canal en tiempo real.
+    Las implementaciones deben permitir publicar desde código síncrono
+    (vistas, comandos) y suscribirse desde vistas asíncronas bajo ASGI.
+    '''
+
+    @abstractmethod
+    def publicar(self, canal, mensaje):
+        '''Enviar un mensaje a todos los suscriptores del canal sin bloquear.'''
+
+    @abstractmethod
+    def suscribir(self, canal):
+        '''Registrar un suscriptor y devolver un objeto con `async recibir(timeout)` y `cerrar()`.'''
+
+
+class _SuscripcionEnProceso:
+
+    def __init__(self, backend, canal):
+        self.backend = backend
+        self.canal = canal
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=backend.MAX_PENDIENTES)
+
+    def entregar(self, mensaje):
+        '''Invocado en el hilo del loop; descarta mensajes si el cliente no consume.'''
+        if not self.cola.full():
+            self.cola.put_nowait(mensaje)
+
+    async def recibir(self, timeout):
+        '''Siguiente mensaje o None si vence el timeout.'''
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.backend._quitar(self)
+
+
+class BackendEnProceso(BackendPubSub):
+    '''
+    Backend en memoria para un solo nodo y para pruebas.
+    Cada suscriptor tiene su propia cola en el loop de su conexión; la
+    publicación es thread-safe y no bloquea al publicador.
+    '''
+
+    MAX_PENDIENTES = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+
+    def publicar(self, canal, mensaje):
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(canal, ()))
+        for suscripcion in suscriptores:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, mensaje)
+            except RuntimeError:
+                # El loop de la conexión ya se cerró
+                self._quitar(suscripcion)
+
+    def suscribir(self, canal):
+        suscripcion = _SuscripcionEnProceso(self, canal)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def _quitar(self, suscripcion):
+        with self._lock:
+            suscriptores = self._suscriptores.get(suscripcion.canal)
+            if suscriptores is not None:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del self._suscriptores[suscripcion.canal]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    '''Backend configurado en GLUCOSA_PUBSUB_BACKEND (en proceso por defecto).'''
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                ruta = getattr(settings, 'GLUCOSA_PUBSUB_BACKEND', 'glucose.tiempo_real.BackendEnProceso')
+                _backend = import_string(ruta)()
+    return _backend
+
+
+def canal_usuario(usuario_id):
+    return f'glucosa_{usuario_id}'
+
+
+def publicar_evento(usuario_id, evento, datos):
+    '''Publicar un evento en el canal del usuario como texto SSE listo para enviar.'''
+    mensaje = f'event: {evento}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n'
+    get_backend().publicar(canal_usuario(usuario_id), mensaje)
+
+
+SEGUNDOS_VIGENCIA_TICKET = 30
+
+
+def emitir_ticket(usuario_id):
+    '''
+    Ticket de un solo uso para abrir el stream desde EventSource, que no
+    permite headers. Evita que el JWT quede en la URL (y en los logs).
+    '''
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f'ticket_stream_{ticket}', usuario_id, SEGUNDOS_VIGENCIA_TICKET)
+    return ticket
+
+
+def canjear_ticket(ticket):
+    '''ID del usuario del ticket, o None si no existe, venció o ya se usó.'''
+    clave = f'ticket_stream_{ticket}'
+    usuario_id = cache.get(clave)
+    # Solo quien logra borrarlo lo canjea: dos conexiones con el mismo ticket no pasan ambas
+    if usuario_id is None or not cache.delete(clave):
+        return None
+    return usuario_id
@@ -1,11 +1,20 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import RangoGlucosaReferenciaViewSet, MedicionGlucosaViewSet
+from .views import (
+    RangoGlucosaReferenciaViewSet,
+    MedicionGlucosaViewSet,
+    EpisodioGlucosaViewSet,
+    RespuestaPosprandialViewSet,
+    stream_glucosa,
+)
 
 router = DefaultRouter()
 router.register(r'rangos-glucosa', RangoGlucosaReferenciaViewSet, basename='rangos-glucosa')
 router.register(r'mediciones-glucosa', MedicionGlucosaViewSet, basename='mediciones-glucosa')
+router.register(r'episodios-glucosa', EpisodioGlucosaViewSet, basename='episodios-glucosa')
+router.register(r'respuestas-posprandiales', RespuestaPosprandialViewSet, basename='respuestas-posprandiales')
 
 urlpatterns = [
+    path('tiempo-real/glucosa/', stream_glucosa, name='tiempo-real-glucosa'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,985 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+import numpy as np
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Min, Max, Sum, Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.utils import ConfiguracionUtils
+from nutrition.models import Comida
+from .pronostico import ModeloTendencia, clasificar_tendencia
+from .tiempo_real import publicar_evento
+from .models import (
+    EpisodioGlucosa,
+    EstadoPronostico,
+    MedicionGlucosa,
+    RangoGlucosaReferencia,
+    RespuestaPosprandial,
+    ResumenGlucosa,
+    VALOR_GLUCOSA_MINIMO,
+    VALOR_GLUCOSA_MAXIMO,
+)
+
+
+class MedicionUtils:
+    '''
+    Punto único de procesamiento posterior a la escritura de lecturas.
+    Las vistas y la ingesta masiva lo invocan dentro de su transacción
+    para mantener actualizadas las estructuras derivadas.
+    '''
+
+    @staticmethod
+    def procesar_creadas(usuario_id, mediciones, historicas=False):
+        '''
+        Actualizar estructuras derivadas con lecturas recién insertadas.
+
+        Args:
+            historicas: Lecturas importadas en lotes sin orden garantizado. No se
+                publican en tiempo real ni actualizan el pronóstico; quien importa
+                llama a PronosticoUtils.reconstruir al terminar.
+        '''
+        if not mediciones:
+            return
+        ResumenUtils.acumular(usuario_id, mediciones)
+        fechas = [medicion.fecha_hora for medicion in mediciones]
+        EpisodioUtils.recalcular(usuario_id, min(fechas), max(fechas))
+        PosprandialUtils.recalcular_por_lecturas(usuario_id, fechas)
+        AnalisisUtils.invalidar_cache(usuario_id)
+        if historicas:
+            return
+        PronosticoUtils.actualizar(usuario_id, mediciones)
+        NotificacionUtils.publicar_mediciones(usuario_id, mediciones)
+
+    @staticmethod
+    def procesar_modificadas(usuario_id, fechas_hora):
+        '''Recalcular estructuras derivadas tras editar o eliminar lecturas.'''
+        if not fechas_hora:
+            return
+        ResumenUtils.recalcular(usuario_id, fechas_hora)
+        for fecha_hora in set(fechas_hora):
+            EpisodioUtils.recalcular(usuario_id, fecha_hora, fecha_hora)
+        PosprandialUtils.recalcular_por_lecturas(usuario_id, fechas_hora)
+        PronosticoUtils.reconstruir(usuario_id)
+        AnalisisUtils.invalidar_cache(usuario_id)
+
+
+class PronosticoUtils:
+    '''
+    Pronóstico de glucosa a 30/60 minutos con flecha de tendencia.
+    Persiste el estado de ModeloTendencia por usuario y lo actualiza en O(1)
+    por lectura; las predicciones se sirven del estado sin leer el historial.
+    '''
+
+    HORIZONTES = (30, 60)
+    VIGENCIA = timedelta(minutes=30)
+    CAMPOS_ESTADO = ('s0', 'st', 'sv', 'stt', 'stv')
+
+    @staticmethod
+    def _modelo(estado):
+        return ModeloTendencia(
+            ultima_ts=estado.ultima_fecha_hora.timestamp() if estado.ultima_fecha_hora else None,
+            ultimo_valor=estado.ultimo_valor,
+            **{campo: getattr(estado, campo) for campo in PronosticoUtils.CAMPOS_ESTADO}
+        )
+
+    @staticmethod
+    def _guardar(estado, modelo):
+        estado.ultima_fecha_hora = (
+            datetime.fromtimestamp(modelo.ultima_ts, tz=dt_timezone.utc)
+            if modelo.ultima_ts is not None else None
+        )
+        estado.ultimo_valor = modelo.ultimo_valor
+        for campo in PronosticoUtils.CAMPOS_ESTADO:
+            setattr(estado, campo, getattr(modelo, campo))
+        estado.save()
+
+    @staticmethod
+    def actualizar(usuario_id, mediciones):
+        '''Incorporar lecturas nuevas al estado del usuario (las anteriores a la última se ignoran).'''
+        with transaction.atomic():
+            estado, _ = EstadoPronostico.objects.select_for_update().get_or_create(usuario_id=usuario_id)
+            modelo = PronosticoUtils._modelo(estado)
+            for medicion in sorted(mediciones, key=lambda m: m.fecha_hora):
+                modelo.actualizar(medicion.fecha_hora.timestamp(), float(medicion.valor_glucosa))
+            PronosticoUtils._guardar(estado, modelo)
+
+    @staticmethod
+    def reconstruir(usuario_id):
+        '''Rehacer el estado con las lecturas recientes (tras editar o eliminar lecturas).'''
+        with transaction.atomic():
+            estado, _ = EstadoPronostico.objects.select_for_update().get_or_create(usuario_id=usuario_id)
+            modelo = ModeloTendencia()
+            ultima = MedicionGlucosa.objects.filter(usuario_id=usuario_id).order_by('-fecha_hora').first()
+            if ultima is not None:
+                # Lecturas con peso mayor a ~0.1% del de la última
+                desde = ultima.fecha_hora - timedelta(minutes=7 * ModeloTendencia.TAU_MINUTOS)
+                for fecha_hora, valor in MedicionGlucosa.objects.filter(
+                    usuario_id=usuario_id, fecha_hora__gte=desde
+                ).order_by('fecha_hora').values_list('fecha_hora', 'valor_glucosa'):
+                    modelo.actualizar(fecha_hora.timestamp(), float(valor))
+            PronosticoUtils._guardar(estado, modelo)
+
+    @staticmethod
+    def pronosticar(usuario_id, ahora=None):
+        '''
+        Pronóstico actual del usuario.
+
+        Returns:
+            dict: Última lectura, tendencia, pendiente y valores esperados por horizonte
+        '''
+        estado = EstadoPronostico.objects.filter(usuario_id=usuario_id).first()
+        if estado is None or estado.ultima_fecha_hora is None:
+            return {'vigente': False, 'ultima_lectura': None, 'tendencia': None, 'pendiente': None, 'pronosticos': []}
+
+        modelo = PronosticoUtils._modelo(estado)
+        ajuste = modelo.ajuste()
+        ahora = ahora or timezone.now()
+        vigente = ajuste is not None and ahora - estado.ultima_fecha_hora <= PronosticoUtils.VIGENCIA
+        resultado = {
+            'vigente': vigente,
+            'ultima_lectura': {'fecha_hora': estado.ultima_fecha_hora, 'valor_glucosa': estado.ultimo_valor},
+            'tendencia': None,
+            'pendiente': None,
+            'pronosticos': [],
+        }
+        if not vigente:
+            return resultado
+
+        _, pendiente = ajuste
+        resultado['tendencia'] = clasificar_tendencia(pendiente)
+        resultado['pendiente'] = round(pendiente, 2)
+        resultado['pronosticos'] = [
+            {
+                'minutos': minutos,
+                'fecha_hora': estado.ultima_fecha_hora + timedelta(minutes=minutos),
+                'valor_glucosa': round(
+                    min(max(modelo.predecir(minutos), VALOR_GLUCOSA_MINIMO), VALOR_GLUCOSA_MAXIMO), 2
+                ),
+            }
+            for minutos in PronosticoUtils.HORIZONTES
+        ]
+        return resultado
+
+
+class NotificacionUtils:
+    '''
+    Publicación de lecturas nuevas y alertas en el canal en tiempo real.
+    Se ejecuta al confirmar la transacción para no notificar escrituras
+    revertidas. Los lotes grandes (sincronización o importación) se
+    resumen en un evento 'lote' y solo se emiten sus lecturas más recientes.
+    '''
+
+    MAX_EVENTOS_POR_LOTE = 50
+    VENTANA_ALERTAS = timedelta(hours=1)
+
+    @staticmethod
+    def publicar_mediciones(usuario_id, mediciones):
+        mediciones = sorted(mediciones, key=lambda medicion: medicion.fecha_hora)
+
+        def publicar():
+            recientes = mediciones[-NotificacionUtils.MAX_EVENTOS_POR_LOTE:]
+            if len(mediciones) > len(recientes):
+                publicar_evento(usuario_id, 'lote', {
+                    'lecturas': len(mediciones),
+                    'desde': mediciones[0].fecha_hora,
+                    'hasta': mediciones[-1].fecha_hora,
+                })
+            clasificaciones, alertas = ClasificacionUtils.clasificar_lote(
+                [medicion.valor_glucosa for medicion in recientes]
+            )
+            limite_alertas = timezone.now() - NotificacionUtils.VENTANA_ALERTAS
+            for medicion, clasificacion, alerta in zip(recientes, clasificaciones, alertas):
+                datos = {
+                    'id': medicion.pk,
+                    'valor_glucosa': medicion.valor_glucosa,
+                    'fecha_hora': medicion.fecha_hora,
+                    'clasificacion': clasificacion,
+                    'es_alerta': alerta,
+                }
+                publicar_evento(usuario_id, 'medicion', datos)
+                if alerta and medicion.fecha_hora >= limite_alertas:
+                    publicar_evento(usuario_id, 'alerta', {
+                        **datos,
+                        'status': ConfiguracionUtils.get_status_glucosa(medicion.valor_glucosa),
+                    })
+
+        transaction.on_commit(publicar)
+
+
+class IndiceRangos:
+    '''
+    Índice de intervalos sobre los rangos de referencia.
+    Los límites de todos los rangos parten la recta en puntos y tramos
+    abiertos; para cada uno se precalcula el primer rango (en orden de
+    valor_minimo, id) que lo contiene. Una búsqueda es una bisección.
+    '''
+
+    def __init__(self, rangos):
+        '''
+        Args:
+            rangos: Lista de tuplas (nombre, valor_minimo, valor_maximo) en orden de prioridad
+        '''
+        self.nombres = [nombre for nombre, _, _ in rangos]
+        limites = [(float(minimo), float(maximo)) for _, minimo, maximo in rangos]
+        self.puntos = sorted({valor for limite in limites for valor in limite})
+
+        def primero(valor):
+            for i, (minimo, maximo) in enumerate(limites):
+                if minimo <= valor <= maximo:
+                    return i
+            return -1
+
+        self.en_punto = [primero(p) for p in self.puntos]
+        self.entre = [primero((a + b) / 2) for a, b in zip(self.puntos, self.puntos[1:])] + [-1]
+        self._puntos = np.array(self.puntos)
+        self._en_punto = np.array(self.en_punto, dtype=np.int64)
+        self._entre = np.array([-1] + self.entre, dtype=np.int64)
+        self._nombres = np.array(self.nombres + [None], dtype=object)
+
+    @classmethod
+    def desde_bd(cls):
+        return cls(list(
+            RangoGlucosaReferencia.objects.order_by('valor_minimo', 'id')
+            .values_list('nombre', 'valor_minimo', 'valor_maximo')
+        ))
+
+    def buscar(self, valor):
+        '''Nombre del rango que contiene el valor, o None.'''
+        valor = float(valor)
+        i = bisect_left(self.puntos, valor)
+        if i < len(self.puntos) and self.puntos[i] == valor:
+            indice = self.en_punto[i]
+        elif i == 0:
+            indice = -1
+        else:
+            indice = self.entre[i - 1]
+        return self.nombres[indice] if indice >= 0 else None
+
+    def buscar_lote(self, valores):
+        '''Nombres de rango para un arreglo de valores (None donde no hay rango).'''
+        if not self.puntos:
+            return np.full(len(valores), None, dtype=object)
+        i = np.searchsorted(self._puntos, valores, 'left')
+        acotado = np.minimum(i, len(self.puntos) - 1)
+        exacto = (i < len(self.puntos)) & (self._puntos[acotado] == valores)
+        indices = np.where(exacto, self._en_punto[acotado], self._entre[i])
+        return self._nombres[indices]
+
+
+class RangoUtils:
+    '''
+    Índice de rangos de referencia cargado una vez por proceso.
+    Cada escritura de un rango publica una nueva versión en el cache
+    compartido; los procesos comparan su versión local (como máximo una
+    vez por INTERVALO_VERIFICACION) y reconstruyen el índice si cambió.
+    '''
+
+    CLAVE_VERSION = 'rangos_glucosa_version'
+    INTERVALO_VERIFICACION = 1.0  # segundos
+
+    _indice = None
+    _version = None
+    _verificado = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_indice():
+        '''Obtener el índice vigente, reconstruyéndolo si otra escritura cambió la versión.'''
+        ahora = time.monotonic()
+        if RangoUtils._indice is not None and ahora - RangoUtils._verificado < RangoUtils.INTERVALO_VERIFICACION:
+            return RangoUtils._indice
+
+        with RangoUtils._lock:
+            version = cache.get(RangoUtils.CLAVE_VERSION)
+            if version is None:
+                cache.add(RangoUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+                version = cache.get(RangoUtils.CLAVE_VERSION)
+            if RangoUtils._indice is None or version != RangoUtils._version:
+                RangoUtils._indice = IndiceRangos.desde_bd()
+                RangoUtils._version = version
+            RangoUtils._verificado = ahora
+            return RangoUtils._indice
+
+    @staticmethod
+    def invalidar():
+        '''Publicar una nueva versión al confirmar la transacción.'''
+        def publicar():
+            cache.set(RangoUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+            RangoUtils._indice = None
+        transaction.on_commit(publicar)
+
+
+class ClasificacionUtils:
+    '''
+    Clasificación vectorizada de lecturas para respuestas de listado.
+    Resuelve umbrales y rangos de referencia una sola vez por lote y
+    reproduce exactamente MedicionGlucosa.get_clasificacion y es_alerta.
+    '''
+
+    @staticmethod
+    def clasificar_lote(valores):
+        '''
+        Clasificar muchos valores de glucosa en una sola pasada.
+
+        Returns:
+            tuple: (lista de clasificaciones, lista de banderas es_alerta)
+        '''
+        if not valores:
+            return [], []
+
+        config = ConfiguracionUtils.get_cached_config()
+        v = np.array([float(valor) for valor in valores])
+
+        hipo = v < float(config.umbral_hipoglucemia)
+        hiper = v > float(config.umbral_hiperglucemia)
+        status = np.where(hipo, 'hipoglucemia', np.where(hiper, 'hiperglucemia', 'normal')).astype(object)
+        alertas = (hipo | hiper).tolist()
+
+        nombres = RangoUtils.get_indice().buscar_lote(v)
+        en_rango = np.array([nombre is not None for nombre in nombres], dtype=bool)
+        status[en_rango] = nombres[en_rango]
+
+        return status.tolist(), alertas
+
+    @staticmethod
+    def anotar(mediciones):
+        '''Precalcular clasificación y alerta en cada instancia del lote.'''
+        clasificaciones, alertas = ClasificacionUtils.clasificar_lote(
+            [medicion.valor_glucosa for medicion in mediciones]
+        )
+        for medicion, clasificacion, alerta in zip(mediciones, clasificaciones, alertas):
+            medicion._clasificacion = clasificacion
+            medicion._es_alerta = alerta
+        return mediciones
+
+
+class EpisodioUtils:
+    '''
+    Detección de episodios de hipo/hiperglucemia.
+    Lecturas consecutivas fuera de los umbrales de ConfiguracionUtils, del
+    mismo tipo y sin huecos mayores a MAX_HUECO, forman un episodio. Cada
+    escritura redetecta solo la ventana afectada, ampliada hasta los
+    límites de los episodios que la tocan.
+    '''
+
+    MAX_HUECO = timedelta(minutes=30)
+    TAMANO_BLOQUE = 1000
+
+    @staticmethod
+    def _tipo(valor, umbral_hipo, umbral_hiper):
+        if valor < umbral_hipo:
+            return EpisodioGlucosa.TipoChoices.HIPOGLUCEMIA
+        if valor > umbral_hiper:
+            return EpisodioGlucosa.TipoChoices.HIPERGLUCEMIA
+        return None
+
+    @staticmethod
+    def detectar(usuario_id, lecturas):
+        '''
+        Agrupar lecturas ordenadas (fecha_hora, valor) en episodios.
+
+        Yields:
+            EpisodioGlucosa: Episodios sin guardar, en orden cronológico
+        '''
+        config = ConfiguracionUtils.get_cached_config()
+        actual = None
+        for fecha_hora, valor in lecturas:
+            tipo = EpisodioUtils._tipo(valor, config.umbral_hipoglucemia, config.umbral_hiperglucemia)
+            if actual is not None and (tipo != actual.tipo or fecha_hora - actual.fin > EpisodioUtils.MAX_HUECO):
+                actual.duracion = actual.fin - actual.inicio
+                yield actual
+                actual = None
+            if tipo is None:
+                continue
+            if actual is None:
+                actual = EpisodioGlucosa(
+                    usuario_id=usuario_id, tipo=tipo, inicio=fecha_hora, fin=fecha_hora,
+                    valor_extremo=valor, lecturas=1
+                )
+            else:
+                actual.fin = fecha_hora
+                actual.lecturas += 1
+                if tipo == EpisodioGlucosa.TipoChoices.HIPOGLUCEMIA:
+                    actual.valor_extremo = min(actual.valor_extremo, valor)
+                else:
+                    actual.valor_extremo = max(actual.valor_extremo, valor)
+        if actual is not None:
+            actual.duracion = actual.fin - actual.inicio
+            yield actual
+
+    @staticmethod
+    def recalcular(usuario_id, desde, hasta):
+        '''Redetectar los episodios de la ventana [desde, hasta] y de los que la tocan.'''
+        with transaction.atomic():
+            afectados = EpisodioGlucosa.objects.select_for_update().filter(
+                usuario_id=usuario_id,
+                inicio__lte=hasta + EpisodioUtils.MAX_HUECO,
+                fin__gte=desde - EpisodioUtils.MAX_HUECO
+            )
+            limites = afectados.aggregate(inicio=Min('inicio'), fin=Max('fin'))
+            if limites['inicio'] is not None:
+                desde = min(desde, limites['inicio'])
+                hasta = max(hasta, limites['fin'])
+            afectados.delete()
+
+            lecturas = MedicionGlucosa.objects.filter(
+                usuario_id=usuario_id, fecha_hora__gte=desde, fecha_hora__lte=hasta
+            ).order_by('fecha_hora').values_list('fecha_hora', 'valor_glucosa')
+            EpisodioGlucosa.objects.bulk_create(
+                EpisodioUtils.detectar(usuario_id, lecturas.iterator(chunk_size=EpisodioUtils.TAMANO_BLOQUE)),
+                batch_size=EpisodioUtils.TAMANO_BLOQUE
+            )
+
+    @staticmethod
+    def reconstruir(usuario_id):
+        '''
+        Redetectar todos los episodios de un usuario (ej. tras cambiar umbrales).
+
+        Returns:
+            int: Número de episodios detectados
+        '''
+        with transaction.atomic():
+            EpisodioGlucosa.objects.filter(usuario_id=usuario_id).delete()
+            lecturas = MedicionGlucosa.objects.filter(usuario_id=usuario_id).order_by(
+                'fecha_hora'
+            ).values_list('fecha_hora', 'valor_glucosa')
+            total = 0
+            pendientes = []
+            for episodio in EpisodioUtils.detectar(usuario_id, lecturas.iterator(chunk_size=EpisodioUtils.TAMANO_BLOQUE)):
+                pendientes.append(episodio)
+                if len(pendientes) >= EpisodioUtils.TAMANO_BLOQUE:
+                    EpisodioGlucosa.objects.bulk_create(pendientes)
+                    total += len(pendientes)
+                    pendientes = []
+            EpisodioGlucosa.objects.bulk_create(pendientes)
+            return total + len(pendientes)
+
+
+class PosprandialUtils:
+    '''
+    Respuesta glucémica posprandial (basal, pico, tiempo al pico e iAUC a 2 horas).
+    Une comidas y lecturas con un único merge ordenado: ambas series se leen
+    ordenadas una sola vez y np.searchsorted ubica la ventana de cada comida,
+    en lugar de una consulta de rango por comida.
+    '''
+
+    VENTANA = timedelta(hours=2)
+    VENTANA_BASAL = timedelta(minutes=30)
+    CAMPOS = [
+        'usuario', 'fecha_hora', 'glucosa_basal', 'glucosa_pico', 'excursion',
+        'minutos_al_pico', 'auc_incremental', 'lecturas', 'calculado_en'
+    ]
+
+    @staticmethod
+    def _decimal(valor):
+        return None if valor is None else Decimal(str(round(float(valor), 2)))
+
+    @staticmethod
+    def calcular(usuario_id, comidas):
+        '''
+        Calcular la respuesta de comidas ordenadas por fecha.
+
+        Args:
+            comidas: Lista de tuplas (comida_id, fecha_hora) en orden cronológico
+
+        Returns:
+            list: Instancias RespuestaPosprandial sin guardar
+        '''
+        if not comidas:
+            return []
+        tiempos, valores = AnalisisUtils.obtener_arreglos(
+            usuario_id,
+            comidas[0][1] - PosprandialUtils.VENTANA_BASAL,
+            comidas[-1][1] + PosprandialUtils.VENTANA + timedelta(microseconds=1)
+        )
+        momentos = np.array([fecha_hora.timestamp() for _, fecha_hora in comidas])
+        ventana = PosprandialUtils.VENTANA.total_seconds()
+        inicio_basal = np.searchsorted(tiempos, momentos - PosprandialUtils.VENTANA_BASAL.total_seconds(), 'left')
+        inicio = np.searchsorted(tiempos, momentos, 'right')
+        fin = np.searchsorted(tiempos, momentos + ventana, 'right')
+
+        respuestas = []
+        for i, (comida_id, fecha_hora) in enumerate(comidas):
+            respuesta = RespuestaPosprandial(
+                comida_id=comida_id, usuario_id=usuario_id, fecha_hora=fecha_hora,
+                lecturas=int(fin[i] - inicio[i]), calculado_en=timezone.now()
+            )
+            basal = valores[inicio[i] - 1] if inicio[i] > inicio_basal[i] else None
+            if fin[i] > inicio[i]:
+                t = tiempos[inicio[i]:fin[i]]
+                v = valores[inicio[i]:fin[i]]
+                pico = int(v.argmax())
+                respuesta.glucosa_pico = PosprandialUtils._decimal(v[pico])
+                respuesta.minutos_al_pico = int((t[pico] - momentos[i]) // 60)
+                if basal is not None:
+                    respuesta.glucosa_basal = PosprandialUtils._decimal(basal)
+                    respuesta.excursion = PosprandialUtils._decimal(v[pico] - basal)
+                    minutos = np.concatenate(([0.0], (t - momentos[i]) / 60))
+                    sobre_basal = np.clip(np.concatenate(([basal], v)) - basal, 0, None)
+                    respuesta.auc_incremental = PosprandialUtils._decimal(np.trapezoid(sobre_basal, minutos))
+            elif basal is not None:
+                respuesta.glucosa_basal = PosprandialUtils._decimal(basal)
+            respuestas.append(respuesta)
+        return respuestas
+
+    @staticmethod
+    def recalcular_comidas(usuario_id, desde=None, hasta=None, comida_ids=None):
+        '''Recalcular y persistir (upsert) las respuestas de las comidas indicadas o del periodo.'''
+        comidas = Comida.objects.filter(usuario_id=usuario_id)
+        if comida_ids is not None:
+            comidas = comidas.filter(id__in=comida_ids)
+        if desde is not None:
+            comidas = comidas.filter(fecha_hora__gte=desde)
+        if hasta is not None:
+            comidas = comidas.filter(fecha_hora__lte=hasta)
+        respuestas = PosprandialUtils.calcular(
+            usuario_id, list(comidas.order_by('fecha_hora').values_list('id', 'fecha_hora'))
+        )
+        RespuestaPosprandial.objects.bulk_create(
+            respuestas,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['comida'],
+            update_fields=PosprandialUtils.CAMPOS
+        )
+        return len(respuestas)
+
+    @staticmethod
+    def recalcular_por_lecturas(usuario_id, fechas_hora):
+        '''Recalcular las comidas cuyas ventanas contienen las lecturas escritas.'''
+        PosprandialUtils.recalcular_comidas(
+            usuario_id,
+            desde=min(fechas_hora) - PosprandialUtils.VENTANA,
+            hasta=max(fechas_hora) + PosprandialUtils.VENTANA_BASAL
+        )
+
+
+class ResumenUtils:
+    '''
+    Mantenimiento de los rollups de glucosa (15 minutos, hora y día).
+    Las lecturas nuevas se combinan con los intervalos existentes sin
+    releer datos crudos; ediciones y eliminaciones recalculan solo los
+    intervalos afectados.
+    '''
+
+    DURACIONES = {
+        ResumenGlucosa.ResolucionChoices.QUINCE_MINUTOS: timedelta(minutes=15),
+        ResumenGlucosa.ResolucionChoices.HORA: timedelta(hours=1),
+        ResumenGlucosa.ResolucionChoices.DIA: timedelta(days=1),
+    }
+    TAMANO_BLOQUE = 1000
+    INTENTOS = 3
+
+    @staticmethod
+    def inicio_intervalo(fecha_hora, resolucion):
+        '''Truncar una fecha al inicio de su intervalo en la zona horaria actual.'''
+        local = timezone.localtime(fecha_hora)
+        if resolucion == ResumenGlucosa.ResolucionChoices.DIA:
+            return local.replace(hour=0, minute=0, second=0, microsecond=0)
+        if resolucion == ResumenGlucosa.ResolucionChoices.HORA:
+            return local.replace(minute=0, second=0, microsecond=0)
+        return local.replace(minute=local.minute - local.minute % 15, second=0, microsecond=0)
+
+    @staticmethod
+    def _agrupar(pares):
+        '''Agrupar pares (fecha_hora, valor) en {(resolucion, inicio): [min, max, suma, conteo]}.'''
+        grupos = {}
+        for fecha_hora, valor in pares:
+            for resolucion in ResumenUtils.DURACIONES:
+                clave = (resolucion, ResumenUtils.inicio_intervalo(fecha_hora, resolucion))
+                grupo = grupos.get(clave)
+                if grupo is None:
+                    grupos[clave] = [valor, valor, valor, 1]
+                else:
+                    grupo[0] = min(grupo[0], valor)
+                    grupo[1] = max(grupo[1], valor)
+                    grupo[2] += valor
+                    grupo[3] += 1
+        return grupos
+
+    @staticmethod
+    def acumular(usuario_id, mediciones):
+        '''
+        Combinar lecturas nuevas con los intervalos ya agregados.
+        Si otra ingesta crea alguno de los intervalos entre el bloqueo y la
+        inserción, se reintenta sumando sobre las filas que ya existen.
+        '''
+        grupos = ResumenUtils._agrupar(
+            (m.fecha_hora, Decimal(m.valor_glucosa)) for m in mediciones
+        )
+        with transaction.atomic():
+            pendientes = grupos
+            for intento in range(ResumenUtils.INTENTOS):
+                nuevos = ResumenUtils._combinar(usuario_id, pendientes)
+                try:
+                    with transaction.atomic():
+                        ResumenGlucosa.objects.bulk_create(nuevos, batch_size=ResumenUtils.TAMANO_BLOQUE)
+                    return
+                except IntegrityError:
+                    if intento == ResumenUtils.INTENTOS - 1:
+                        raise
+                    pendientes = {(nuevo.resolucion, nuevo.inicio): grupos[(nuevo.resolucion, nuevo.inicio)]
+                                  for nuevo in nuevos}
+
+    @staticmethod
+    def _combinar(usuario_id, grupos):
+        '''
+        Bloquear y actualizar los intervalos existentes de los grupos.
+
+        Returns:
+            list: Intervalos nuevos sin guardar
+        '''
+        existentes = {}
+        for resolucion in ResumenUtils.DURACIONES:
+            inicios = [inicio for res, inicio in grupos if res == resolucion]
+            if not inicios:
+                continue
+            for resumen in ResumenGlucosa.objects.select_for_update().filter(
+                usuario_id=usuario_id, resolucion=resolucion, inicio__in=inicios
+            ):
+                existentes[(resumen.resolucion, resumen.inicio)] = resumen
+
+        nuevos = []
+        actualizados = []
+        for (resolucion, inicio), (minimo, maximo, suma, conteo) in grupos.items():
+            resumen = existentes.get((resolucion, inicio))
+            if resumen is None:
+                nuevos.append(ResumenGlucosa(
+                    usuario_id=usuario_id, resolucion=resolucion, inicio=inicio,
+                    minimo=minimo, maximo=maximo, suma=suma, conteo=conteo
+                ))
+            else:
+                resumen.minimo = min(resumen.minimo, minimo)
+                resumen.maximo = max(resumen.maximo, maximo)
+                resumen.suma += suma
+                resumen.conteo += conteo
+                actualizados.append(resumen)
+
+        ResumenGlucosa.objects.bulk_update(
+            actualizados, ['minimo', 'maximo', 'suma', 'conteo'],
+            batch_size=ResumenUtils.TAMANO_BLOQUE
+        )
+        return nuevos
+
+    @staticmethod
+    def recalcular(usuario_id, fechas_hora):
+        '''Recalcular desde datos crudos los intervalos que contienen las fechas dadas.'''
+        with transaction.atomic():
+            for resolucion, duracion in ResumenUtils.DURACIONES.items():
+                inicios = {ResumenUtils.inicio_intervalo(f, resolucion) for f in fechas_hora}
+                for inicio in inicios:
+                    datos = MedicionGlucosa.objects.filter(
+                        usuario_id=usuario_id,
+                        fecha_hora__gte=inicio,
+                        fecha_hora__lt=inicio + duracion
+                    ).aggregate(
+                        minimo=Min('valor_glucosa'), maximo=Max('valor_glucosa'),
+                        suma=Sum('valor_glucosa'), conteo=Count('id')
+                    )
+                    if datos['conteo']:
+                        ResumenGlucosa.objects.update_or_create(
+                            usuario_id=usuario_id, resolucion=resolucion, inicio=inicio,
+                            defaults=datos
+                        )
+                    else:
+                        ResumenGlucosa.objects.filter(
+                            usuario_id=usuario_id, resolucion=resolucion, inicio=inicio
+                        ).delete()
+
+    @staticmethod
+    def reconstruir(usuario_id):
+        '''
+        Reconstruir todos los rollups de un usuario desde datos crudos.
+        Recorre las lecturas en orden cronológico con un iterador de servidor,
+        por lo que la memoria usada no depende del tamaño del historial.
+
+        Returns:
+            int: Número de intervalos generados
+        '''
+        total = 0
+        with transaction.atomic():
+            ResumenGlucosa.objects.filter(usuario_id=usuario_id).delete()
+            abiertos = {}
+            pendientes = []
+            lecturas = MedicionGlucosa.objects.filter(usuario_id=usuario_id).order_by(
+                'fecha_hora'
+            ).values_list('fecha_hora', 'valor_glucosa')
+
+            for fecha_hora, valor in lecturas.iterator(chunk_size=ResumenUtils.TAMANO_BLOQUE):
+                for resolucion in ResumenUtils.DURACIONES:
+                    inicio = ResumenUtils.inicio_intervalo(fecha_hora, resolucion)
+                    actual = abiertos.get(resolucion)
+                    if actual is not None and actual.inicio == inicio:
+                        actual.minimo = min(actual.minimo, valor)
+                        actual.maximo = max(actual.maximo, valor)
+                        actual.suma += valor
+                        actual.conteo += 1
+                        continue
+                    if actual is not None:
+                        pendientes.append(actual)
+                    abiertos[resolucion] = ResumenGlucosa(
+                        usuario_id=usuario_id, resolucion=resolucion, inicio=inicio,
+                        minimo=valor, maximo=valor, suma=valor, conteo=1
+                    )
+                if len(pendientes) >= ResumenUtils.TAMANO_BLOQUE:
+                    ResumenGlucosa.objects.bulk_create(pendientes)
+                    total += len(pendientes)
+                    pendientes = []
+
+            pendientes.extend(abiertos.values())
+            ResumenGlucosa.objects.bulk_create(pendientes, batch_size=ResumenUtils.TAMANO_BLOQUE)
+            total += len(pendientes)
+        return total
+
+
+class AnalisisUtils:
+    '''
+    Perfil ambulatorio de glucosa (AGP) calculado de forma vectorizada.
+    Las lecturas se leen como arreglos numéricos planos y el resultado se
+    cachea por usuario y ventana; cada escritura incrementa la versión del
+    usuario, lo que invalida todas sus entradas sin tener que enumerarlas.
+    '''
+
+    PERCENTILES = (5, 25, 50, 75, 95)
+    MINUTOS_POR_INTERVALO = 15
+    CACHE_TTL = 900  # 15 minutos
+
+    @staticmethod
+    def _clave_version(usuario_id):
+        return f'agp_version_{usuario_id}'
+
+    @staticmethod
+    def invalidar_cache(usuario_id):
+        '''Invalidar los perfiles cacheados del usuario al confirmar la transacción.'''
+        def incrementar():
+            clave = AnalisisUtils._clave_version(usuario_id)
+            try:
+                cache.incr(clave)
+            except ValueError:
+                cache.set(clave, 1, None)
+        transaction.on_commit(incrementar)
+
+    @staticmethod
+    def obtener_arreglos(usuario_id, desde, hasta):
+        '''
+        Leer las lecturas del periodo como arreglos NumPy, en orden cronológico.
+
+        Returns:
+            tuple: (segundos epoch como float64, valores mg/dL como float64)
+        '''
+        filas = MedicionGlucosa.objects.filter(
+            usuario_id=usuario_id, fecha_hora__gte=desde, fecha_hora__lt=hasta
+        ).order_by('fecha_hora').values_list('fecha_hora', 'valor_glucosa')
+        datos = np.fromiter(
+            ((fecha_hora.timestamp(), valor) for fecha_hora, valor in filas.iterator(chunk_size=2000)),
+            dtype=[('t', 'f8'), ('v', 'f8')]
+        )
+        return datos['t'], datos['v']
+
+    @staticmethod
+    def calcular_percentiles(intervalos, valores, n_intervalos):
+        '''
+        Percentiles por intervalo sin iterar en Python.
+        Ordena por (intervalo, valor) y aplica interpolación lineal sobre las
+        posiciones de cada intervalo, igual que np.percentile(method='linear').
+
+        Returns:
+            tuple: (matriz n_intervalos x len(PERCENTILES) con NaN en intervalos vacíos,
+                    conteo de lecturas por intervalo)
+        '''
+        orden = np.lexsort((valores, intervalos))
+        ordenados = valores[orden]
+        conteos = np.bincount(intervalos, minlength=n_intervalos)
+        offsets = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+
+        resultado = np.full((n_intervalos, len(AnalisisUtils.PERCENTILES)), np.nan)
+        con_datos = conteos > 0
+        if not con_datos.any():
+            return resultado, conteos
+
+        fracciones = np.array(AnalisisUtils.PERCENTILES) / 100.0
+        posiciones = offsets[con_datos, None] + fracciones[None, :] * (conteos[con_datos, None] - 1)
+        inferior = np.floor(posiciones).astype(np.int64)
+        superior = np.ceil(posiciones).astype(np.int64)
+        peso = posiciones - inferior
+        resultado[con_datos] = ordenados[inferior] * (1 - peso) + ordenados[superior] * peso
+        return resultado, conteos
+
+    @staticmethod
+    def perfil_ambulatorio(usuario_id, dias, hasta=None):
+        '''
+        Obtener el AGP del usuario para los últimos `dias` días (con cache).
+
+        Returns:
+            dict: Percentiles por hora del día, tiempo en rango y métricas globales
+        '''
+        config = ConfiguracionUtils.get_cached_config()
+        umbral_hipo = float(config.umbral_hipoglucemia)
+        umbral_hiper = float(config.umbral_hiperglucemia)
+
+        version = cache.get(AnalisisUtils._clave_version(usuario_id), 0)
+        clave = f'agp_{usuario_id}_{dias}_{version}_{umbral_hipo}_{umbral_hiper}'
+        if hasta is None:
+            perfil = cache.get(clave)
+            if perfil is not None:
+                return perfil
+
+        fin = hasta or timezone.now()
+        inicio = fin - timedelta(days=dias)
+        tiempos, valores = AnalisisUtils.obtener_arreglos(usuario_id, inicio, fin)
+
+        n_intervalos = 24 * 60 // AnalisisUtils.MINUTOS_POR_INTERVALO
+        desfase = timezone.localtime(fin).utcoffset().total_seconds()
+        minutos_dia = ((tiempos + desfase) % 86400) // 60
+        intervalos = (minutos_dia // AnalisisUtils.MINUTOS_POR_INTERVALO).astype(np.int64)
+        percentiles, conteos = AnalisisUtils.calcular_percentiles(intervalos, valores, n_intervalos)
+
+        total = len(valores)
+        if total:
+            media = float(valores.mean())
+            desviacion = float(valores.std())
+            tiempo_en_rango = {
+                'bajo': round(float((valores < umbral_hipo).mean()) * 100, 2),
+                'en_rango': round(float(((valores >= umbral_hipo) & (valores <= umbral_hiper)).mean()) * 100, 2),
+                'alto': round(float((valores > umbral_hiper).mean()) * 100, 2),
+            }
+            metricas = {
+                'media': round(media, 2),
+                'desviacion_estandar': round(desviacion, 2),
+                'coeficiente_variacion': round(desviacion / media * 100, 2),
+                'gmi': round(3.31 + 0.02392 * media, 2),
+            }
+        else:
+            tiempo_en_rango = {'bajo': None, 'en_rango': None, 'alto': None}
+            metricas = {'media': None, 'desviacion_estandar': None, 'coeficiente_variacion': None, 'gmi': None}
+
+        perfil = {
+            'dias': dias,
+            'desde': inicio,
+            'hasta': fin,
+            'total_lecturas': total,
+            'umbral_hipoglucemia': umbral_hipo,
+            'umbral_hiperglucemia': umbral_hiper,
+            'tiempo_en_rango': tiempo_en_rango,
+            **metricas,
+            'perfil': [
+                {
+                    'hora': f'{(i * AnalisisUtils.MINUTOS_POR_INTERVALO) // 60:02d}:'
+                            f'{(i * AnalisisUtils.MINUTOS_POR_INTERVALO) % 60:02d}',
+                    'lecturas': int(conteos[i]),
+                    **{
+                        f'p{p}': None if np.isnan(percentiles[i, j]) else round(float(percentiles[i, j]), 2)
+                        for j, p in enumerate(AnalisisUtils.PERCENTILES)
+                    },
+                }
+                for i in range(n_intervalos)
+            ],
+        }
+        if hasta is None:
+            cache.set(clave, perfil, AnalisisUtils.CACHE_TTL)
+        return perfil
+
+
+class IngestaUtils:
+    '''
+    Utilidades para ingesta masiva de lecturas de glucosa (monitores continuos).
+    Valida el lote completo en una sola pasada sin instanciar un serializer
+    por lectura y escribe en una única transacción con bulk_create por bloques.
+    La validación no usa NumPy: cada elemento es un objeto JSON arbitrario y
+    el costo está en convertir a Decimal y parsear fechas, no en comparar.
+    '''
+
+    TAMANO_BLOQUE = 500
+    MAX_MEDICIONES_POR_LOTE = 10000
+
+    @staticmethod
+    def validar_lote(items):
+        '''
+        Validar un lote de lecturas crudas.
+
+        Returns:
+            tuple: (lecturas válidas como [(indice, valor, fecha_hora, notas)],
+                    errores como [{'indice': i, 'errores': {...}}])
+        '''
+        validas = []
+        errores = []
+        tz = timezone.get_current_timezone()
+
+        for indice, item in enumerate(items):
+            if not isinstance(item, dict):
+                errores.append({'indice': indice, 'errores': {'non_field_errors': ['Se esperaba un objeto.']}})
+                continue
+
+            errores_item = {}
+
+            try:
+                valor = Decimal(str(item.get('valor_glucosa'))).quantize(Decimal('0.01'))
+                if not VALOR_GLUCOSA_MINIMO <= valor <= VALOR_GLUCOSA_MAXIMO:
+                    errores_item['valor_glucosa'] = [
+                        f'Debe estar entre {VALOR_GLUCOSA_MINIMO} y {VALOR_GLUCOSA_MAXIMO} mg/dL.'
+                    ]
+            except (InvalidOperation, TypeError, ValueError):
+                errores_item['valor_glucosa'] = ['Se requiere un número válido.']
+
+            fecha_hora = item.get('fecha_hora')
+            try:
+                fecha_hora = parse_datetime(fecha_hora) if isinstance(fecha_hora, str) else None
+            except ValueError:
+                fecha_hora = None
+            if fecha_hora is None:
+                errores_item['fecha_hora'] = ['Se requiere una fecha y hora ISO 8601 válida.']
+            elif timezone.is_naive(fecha_hora):
+                fecha_hora = timezone.make_aware(fecha_hora, tz)
+
+            notas = item.get('notas') or ''
+            if not isinstance(notas, str):
+                errores_item['notas'] = ['Debe ser texto.']
+
+            if errores_item:
+                errores.append({'indice': indice, 'errores': errores_item})
+            else:
+                validas.append((indice, valor, fecha_hora, notas))
+
+        return validas, errores
+
+    @staticmethod
+    def guardar_lote(usuario, validas):
+        '''Insertar lecturas validadas en una transacción con bulk_create por bloques.'''
+        mediciones = [
+            MedicionGlucosa(usuario=usuario, valor_glucosa=valor, fecha_hora=fecha_hora, notas=notas)
+            for _, valor, fecha_hora, notas in validas
+        ]
+        with transaction.atomic():
+            MedicionGlucosa.objects.bulk_create(mediciones, batch_size=IngestaUtils.TAMANO_BLOQUE)
+            MedicionUtils.procesar_creadas(usuario.pk, mediciones)
+        return mediciones
+
+    @staticmethod
+    def descartar_existentes(usuario_id, lecturas):
+        '''
+        Quitar lecturas cuya fecha_hora ya está registrada para el usuario
+        (o repetida dentro del mismo lote). Una sola consulta por lote.
+
+        Args:
+            lecturas: Lista de tuplas (fecha_hora, valor)
+
+        Returns:
+            list: Lecturas nuevas, en el mismo orden
+        '''
+        if not lecturas:
+            return []
+        fechas = [fecha_hora for fecha_hora, _ in lecturas]
+        vistas = set(MedicionGlucosa.objects.filter(
+            usuario_id=usuario_id, fecha_hora__gte=min(fechas), fecha_hora__lte=max(fechas)
+        ).values_list('fecha_hora', flat=True))
+        nuevas = []
+        for fecha_hora, valor in lecturas:
+            if fecha_hora not in vistas:
+                vistas.add(fecha_hora)
+                nuevas.append((fecha_hora, valor))
+        return nuevas
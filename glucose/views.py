@@ -1,7 +1,54 @@
-from rest_framework import viewsets, permissions
-from .models import RangoGlucosaReferencia, MedicionGlucosa
-from .serializers import RangoGlucosaReferenciaSerializer, MedicionGlucosaSerializer
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Avg, Count, Sum, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.duration import duration_string
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from .models import (
+    RangoGlucosaReferencia,
+    MedicionGlucosa,
+    ResumenGlucosa,
+    EpisodioGlucosa,
+    RespuestaPosprandial,
+)
+from .serializers import (
+    RangoGlucosaReferenciaSerializer,
+    MedicionGlucosaSerializer,
+    ResumenGlucosaSerializer,
+    EpisodioGlucosaSerializer,
+    RespuestaPosprandialSerializer,
+)
+from .parsers import NDJSONParser
+from .utils import IngestaUtils, MedicionUtils, AnalisisUtils, PronosticoUtils
+from .tiempo_real import get_backend, canal_usuario, emitir_ticket, canjear_ticket, SEGUNDOS_VIGENCIA_TICKET
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from core.pagination import FechaHoraCursorPagination
+from core.utils import ExportacionUtils
+
+
+def _fecha_hora_parametro(parametro, valor):
+    """
+    Fecha y hora ISO 8601 de un parámetro de consulta. Los valores sin desfase
+    se interpretan en la zona horaria actual.
+    """
+    try:
+        fecha = parse_datetime(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({parametro: 'Se requiere una fecha y hora ISO 8601 válida.'})
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
 
 
 class RangoGlucosaReferenciaViewSet(viewsets.ReadOnlyModelViewSet):
@@ -13,9 +60,267 @@ class RangoGlucosaReferenciaViewSet(viewsets.ReadOnlyModelViewSet):
 class MedicionGlucosaViewSet(viewsets.ModelViewSet):
     serializer_class = MedicionGlucosaSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = FechaHoraCursorPagination
+
+    def _resolucion(self):
+        """Resolución solicitada en ?resolution= (raw por defecto)"""
+        resolucion = self.request.query_params.get('resolution', 'raw')
+        if resolucion != 'raw' and resolucion not in ResumenGlucosa.ResolucionChoices.values:
+            raise ValidationError({
+                'resolution': f"Valores permitidos: raw, {', '.join(ResumenGlucosa.ResolucionChoices.values)}."
+            })
+        return resolucion
 
     def get_queryset(self):
+        if self.action == 'list':
+            resolucion = self._resolucion()
+            if resolucion != 'raw':
+                return ResumenGlucosa.objects.filter(usuario=self.request.user, resolucion=resolucion)
         return MedicionGlucosa.objects.filter(usuario=self.request.user)
 
+    @property
+    def campo_cursor(self):
+        """Campo de fecha usado por la paginación por cursor"""
+        if self.action == 'list' and self._resolucion() != 'raw':
+            return 'inicio'
+        return 'fecha_hora'
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self._resolucion() != 'raw':
+            return ResumenGlucosaSerializer
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        """Aplica los parámetros opcionales desde/hasta (ISO 8601) en el listado"""
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        campo = 'fecha_hora' if self._resolucion() == 'raw' else 'inicio'
+        for parametro, lookup in (('desde', 'gte'), ('hasta', 'lt')):
+            valor = self.request.query_params.get(parametro)
+            if not valor:
+                continue
+            fecha = _fecha_hora_parametro(parametro, valor)
+            queryset = queryset.filter(**{f'{campo}__{lookup}': fecha})
+        return queryset
+
     def perform_create(self, serializer):
-        serializer.save(usuario=self.request.user)
+        with transaction.atomic():
+            medicion = serializer.save(usuario=self.request.user)
+            MedicionUtils.procesar_creadas(medicion.usuario_id, [medicion])
+
+    def perform_update(self, serializer):
+        fecha_anterior = serializer.instance.fecha_hora
+        with transaction.atomic():
+            medicion = serializer.save()
+            MedicionUtils.procesar_modificadas(medicion.usuario_id, [fecha_anterior, medicion.fecha_hora])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            MedicionUtils.procesar_modificadas(instance.usuario_id, [instance.fecha_hora])
+
+    @action(detail=False, methods=['post'], url_path='ingesta', parser_classes=[JSONParser, NDJSONParser])
+    def ingesta(self, request):
+        """
+        Ingesta masiva de lecturas (arreglo JSON o NDJSON).
+        Las lecturas inválidas se reportan por índice sin rechazar el lote.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Se esperaba un arreglo de lecturas.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > IngestaUtils.MAX_MEDICIONES_POR_LOTE:
+            return Response(
+                {'detail': f'Máximo {IngestaUtils.MAX_MEDICIONES_POR_LOTE} lecturas por lote.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        validas, errores = IngestaUtils.validar_lote(items)
+        creadas = IngestaUtils.guardar_lote(request.user, validas) if validas else []
+
+        return Response(
+            {
+                'recibidas': len(items),
+                'creadas': len(creadas),
+                'errores': errores,
+            },
+            status=status.HTTP_201_CREATED if creadas else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'], url_path='agp')
+    def agp(self, request):
+        """
+        Perfil ambulatorio de glucosa: percentiles 5/25/50/75/95 por hora del día
+        y tiempo en rango según los umbrales de configuración.
+        Parámetros: dias (1-90, por defecto 14) y hasta (ISO 8601, opcional).
+        """
+        try:
+            dias = int(request.query_params.get('dias', 14))
+        except ValueError:
+            dias = 0
+        if not 1 <= dias <= 90:
+            raise ValidationError({'dias': 'Debe ser un entero entre 1 y 90.'})
+
+        hasta = request.query_params.get('hasta')
+        hasta = _fecha_hora_parametro('hasta', hasta) if hasta else None
+
+        return Response(AnalisisUtils.perfil_ambulatorio(request.user.pk, dias, hasta))
+
+    @action(detail=False, methods=['post'], url_path='ticket-stream')
+    def ticket_stream(self, request):
+        """
+        Ticket de un solo uso (30 s) para abrir /tiempo-real/glucosa/?ticket=
+        desde EventSource sin exponer el JWT en la URL.
+        """
+        return Response({
+            'ticket': emitir_ticket(request.user.pk),
+            'expira_en': SEGUNDOS_VIGENCIA_TICKET,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def pronostico(self, request):
+        """
+        Pronóstico a 30 y 60 minutos con flecha de tendencia, servido desde el
+        estado incremental del usuario (sin leer el historial).
+        """
+        return Response(PronosticoUtils.pronosticar(request.user.pk))
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Historial completo de lecturas en streaming (?formato=csv|ndjson)"""
+        formato = ExportacionUtils.formato_solicitado(request)
+        return ExportacionUtils.respuesta_streaming(
+            MedicionGlucosa.objects.filter(usuario=request.user).order_by('fecha_hora', 'id'),
+            ['id', 'fecha_hora', 'valor_glucosa', 'notas'],
+            formato,
+            f'mediciones_glucosa_{request.user.pk}'
+        )
+
+
+class EpisodioGlucosaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Episodios de hipo/hiperglucemia detectados durante la ingesta.
+    Filtros opcionales: tipo, desde y hasta (ISO 8601, sobre el inicio).
+    """
+    serializer_class = EpisodioGlucosaSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = FechaHoraCursorPagination
+    campo_cursor = 'inicio'
+
+    def get_queryset(self):
+        queryset = EpisodioGlucosa.objects.filter(usuario=self.request.user)
+        tipo = self.request.query_params.get('tipo')
+        if tipo:
+            if tipo not in EpisodioGlucosa.TipoChoices.values:
+                raise ValidationError({'tipo': f"Valores permitidos: {', '.join(EpisodioGlucosa.TipoChoices.values)}."})
+            queryset = queryset.filter(tipo=tipo)
+        for parametro, lookup in (('desde', 'gte'), ('hasta', 'lt')):
+            valor = self.request.query_params.get(parametro)
+            if not valor:
+                continue
+            fecha = _fecha_hora_parametro(parametro, valor)
+            queryset = queryset.filter(**{f'inicio__{lookup}': fecha})
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """Conteo y duración total/máxima de episodios por tipo en el periodo filtrado"""
+        datos = self.get_queryset().order_by().values('tipo').annotate(
+            episodios=Count('id'),
+            duracion_total=Sum('duracion'),
+            duracion_maxima=Max('duracion'),
+        )
+        return Response({fila['tipo']: {
+            'episodios': fila['episodios'],
+            'duracion_total': duration_string(fila['duracion_total']),
+            'duracion_maxima': duration_string(fila['duracion_maxima']),
+        } for fila in datos})
+
+
+class RespuestaPosprandialViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Respuesta glucémica de 2 horas por comida (basal, pico, tiempo al pico, iAUC).
+    Filtros opcionales: desde y hasta (ISO 8601, sobre la fecha de la comida).
+    """
+    serializer_class = RespuestaPosprandialSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = FechaHoraCursorPagination
+
+    def get_queryset(self):
+        queryset = RespuestaPosprandial.objects.filter(usuario=self.request.user).select_related('comida')
+        for parametro, lookup in (('desde', 'gte'), ('hasta', 'lt')):
+            valor = self.request.query_params.get(parametro)
+            if not valor:
+                continue
+            fecha = _fecha_hora_parametro(parametro, valor)
+            queryset = queryset.filter(**{f'fecha_hora__{lookup}': fecha})
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """Excursión e iAUC promedio por tipo de comida en el periodo filtrado"""
+        datos = self.get_queryset().order_by().values('comida__tipo_comida').annotate(
+            comidas=Count('id'),
+            excursion_promedio=Avg('excursion'),
+            auc_incremental_promedio=Avg('auc_incremental'),
+            minutos_al_pico_promedio=Avg('minutos_al_pico'),
+        )
+        return Response({fila.pop('comida__tipo_comida'): {
+            clave: round(float(valor), 2) if valor is not None and clave != 'comidas' else valor
+            for clave, valor in fila.items()
+        } for fila in datos})
+
+
+SEGUNDOS_LATIDO = 15
+
+
+def _autenticar_stream(request):
+    """
+    Autentica con el header Authorization o, para EventSource (que no permite
+    headers), con un ticket de un solo uso en ?ticket= emitido por
+    POST /mediciones-glucosa/ticket-stream/. El JWT nunca viaja en la URL.
+    """
+    try:
+        resultado = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if resultado is not None:
+        return resultado[0]
+    ticket = request.GET.get('ticket')
+    usuario_id = canjear_ticket(ticket) if ticket else None
+    if usuario_id is None:
+        return None
+    return get_user_model().objects.filter(pk=usuario_id, is_active=True).first()
+
+
+async def stream_glucosa(request):
+    """
+    Canal Server-Sent Events con lecturas nuevas ('medicion'), resúmenes
+    de lotes ('lote') y alertas de hipo/hiperglucemia ('alerta') del usuario.
+    Reemplaza el polling de /mediciones-glucosa/.
+
+    Requiere un servidor ASGI (uvicorn, daphne): bajo WSGI cada conexión
+    abierta ocupa un worker completo.
+    """
+    usuario = await sync_to_async(_autenticar_stream)(request)
+    if usuario is None:
+        return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron o son inválidas.'}, status=401)
+
+    suscripcion = get_backend().suscribir(canal_usuario(usuario.pk))
+
+    async def eventos():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                mensaje = await suscripcion.recibir(SEGUNDOS_LATIDO)
+                yield mensaje if mensaje is not None else ': latido\n\n'
+        finally:
+            suscripcion.cerrar()
+
+    respuesta = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -0,0 +1,86 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from nutrition.models import TipoAlimento
+from nutrition.utils import BusquedaAlimentosUtils
+
+BASES = [
+    'arroz', 'frijol', 'plátano', 'manzana', 'piña', 'pollo', 'res', 'cerdo', 'atún', 'salmón',
+    'leche', 'yogur', 'queso', 'pan', 'tortilla', 'avena', 'lenteja', 'garbanzo', 'nuez', 'almendra',
+    'jitomate', 'cebolla', 'calabacín', 'brócoli', 'espinaca', 'zanahoria', 'papa', 'camote', 'elote', 'mango',
+]
+VARIANTES = [
+    'integral', 'cocido', 'crudo', 'frito', 'asado', 'al vapor', 'light', 'deshidratado', 'en almíbar',
+    'orgánico', 'con sal', 'sin azúcar', 'descremado', 'entero', 'molido', 'rallado', 'en trozos', 'tostado',
+]
+MARCAS = ['La Huerta', 'Del Valle', 'Campo Real', 'Señorial', 'Norteño', 'Andino', 'Tropical', 'Serrano']
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia de búsqueda/autocompletado de alimentos sobre un catálogo '
+        'sintético (dentro de una transacción que se revierte al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alimentos', type=int, default=100000)
+        parser.add_argument('--consultas', type=int, default=1000)
+        parser.add_argument('--limite', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        total = options['alimentos']
+        categorias = TipoAlimento.CategoriaChoices.values
+
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            lote = []
+            for i in range(total):
+                nombre = f'{rnd.choice(BASES).capitalize()} {rnd.choice(VARIANTES)} {rnd.choice(MARCAS)} {i}'
+                lote.append(TipoAlimento(
+                    nombre=nombre,
+                    nombre_normalizado=TipoAlimento.normalizar_nombre(nombre),
+                    categoria=rnd.choice(categorias),
+                ))
+                if len(lote) == 5000:
+                    TipoAlimento.objects.bulk_create(lote)
+                    lote = []
+            TipoAlimento.objects.bulk_create(lote)
+            self.stdout.write(f'Catálogo sintético: {total} alimentos en {time.perf_counter() - inicio:.1f} s')
+
+            consultas = []
+            for _ in range(options['consultas']):
+                palabra = TipoAlimento.normalizar_nombre(rnd.choice(BASES + VARIANTES))
+                consulta = palabra[:rnd.randint(2, max(2, len(palabra)))]
+                if rnd.random() < 0.3:
+                    consulta += ' ' + TipoAlimento.normalizar_nombre(rnd.choice(MARCAS))[:3]
+                consultas.append(consulta)
+
+            for etiqueta, buscar in (
+                ('Índice del motor', BusquedaAlimentosUtils.buscar),
+                ('Escaneo icontains', self._buscar_icontains),
+            ):
+                tiempos = []
+                for consulta in consultas:
+                    inicio = time.perf_counter()
+                    buscar(consulta, options['limite'])
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                self.stdout.write(
+                    f'{etiqueta}: p50 {self._percentil(tiempos, 50):.2f} ms, '
+                    f'p95 {self._percentil(tiempos, 95):.2f} ms, '
+                    f'p99 {self._percentil(tiempos, 99):.2f} ms ({len(tiempos)} consultas, top-{options["limite"]})'
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _buscar_icontains(consulta, limite):
+        '''Línea base: el filtro icontains sobre nombre que usaban los clientes.'''
+        return list(TipoAlimento.objects.filter(nombre__icontains=consulta, activo=True)[:limite])
+
+    @staticmethod
+    def _percentil(valores, percentil):
+        return valores[min(len(valores) - 1, int(len(valores) * percentil / 100))]
@@ -0,0 +1,120 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from nutrition.models import TipoAlimento, Comida, DetalleComida
+from nutrition.utils import ComidaUtils
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la carga glucémica calculada con una consulta agregada contra el '
+        'cálculo por objeto en Python, sobre comidas sintéticas (dentro de una '
+        'transacción que se revierte al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comidas', type=int, default=100000)
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--alimentos', type=int, default=500)
+        parser.add_argument('--detalles', type=int, default=3, help='Detalles por comida')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            usuarios = User.objects.bulk_create([
+                User(username=f'benchmark_carga_{i}') for i in range(options['usuarios'])
+            ])
+            alimentos = TipoAlimento.objects.bulk_create([
+                TipoAlimento(
+                    nombre=f'Alimento sintético {i}',
+                    nombre_normalizado=f'alimento sintetico {i}',
+                    categoria=rnd.choice(TipoAlimento.CategoriaChoices.values),
+                    indice_glucemico=Decimal(rnd.randint(10, 95)) if rnd.random() < 0.9 else None,
+                    calorias_por_100g=Decimal(rnd.randint(20, 600)),
+                    carbohidratos_por_100g=Decimal(rnd.randint(0, 80)) if rnd.random() < 0.9 else None,
+                    fibra_por_100g=Decimal(rnd.randint(0, 10)),
+                )
+                for i in range(options['alimentos'])
+            ])
+            ahora = timezone.now()
+            unidades = DetalleComida.UnidadMedidaChoices.values
+            for desde in range(0, options['comidas'], 5000):
+                comidas = Comida.objects.bulk_create([
+                    Comida(
+                        usuario=rnd.choice(usuarios),
+                        tipo_comida=rnd.choice(Comida.TipoComidaChoices.values),
+                        fecha_hora=ahora - timedelta(minutes=rnd.randint(0, 365 * 24 * 60)),
+                    )
+                    for _ in range(min(5000, options['comidas'] - desde))
+                ])
+                DetalleComida.objects.bulk_create([
+                    DetalleComida(
+                        comida=comida, tipo_alimento=alimento,
+                        cantidad=Decimal(rnd.randint(1, 300)), unidad_medida=rnd.choice(unidades)
+                    )
+                    for comida in comidas
+                    for alimento in rnd.sample(alimentos, options['detalles'])
+                ])
+            self.stdout.write(
+                f"Datos sintéticos: {options['comidas']} comidas en {time.perf_counter() - inicio:.1f} s"
+            )
+
+            comidas = Comida.objects.filter(usuario__in=usuarios)
+            inicio = time.perf_counter()
+            por_comida = ComidaUtils.agregar(DetalleComida.objects.filter(comida__in=comidas), 'comida_id')
+            agregada = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            por_objeto = {}
+            for comida in comidas.prefetch_related(
+                Prefetch('detalles', queryset=DetalleComida.objects.select_related('tipo_alimento'))
+            ).iterator(chunk_size=2000):
+                por_objeto[comida.pk] = sum(self._carga_detalle(detalle) for detalle in comida.detalles.all())
+            python = time.perf_counter() - inicio
+
+            diferencia = max(abs(fila['carga_glucemica'] - por_objeto[fila['comida_id']]) for fila in por_comida)
+            self.stdout.write(f'Consulta agregada: {agregada * 1000:.0f} ms ({len(por_comida)} comidas)')
+            self.stdout.write(f'Cálculo por objeto: {python * 1000:.0f} ms (diferencia máxima {diferencia:.6f})')
+
+            usuario = usuarios[0]
+            desde = timezone.localdate() - timedelta(days=89)
+            inicio = time.perf_counter()
+            dias = ComidaUtils.agregar(
+                DetalleComida.objects.filter(comida__usuario=usuario, comida__fecha_hora__date__gte=desde)
+                .annotate(fecha=TruncDate('comida__fecha_hora')),
+                'fecha'
+            )
+            self.stdout.write(
+                f'Carga diaria de 90 días de un usuario: {(time.perf_counter() - inicio) * 1000:.1f} ms ({len(dias)} días)'
+            )
+
+            tiempos = []
+            for _ in range(20):
+                inicio = time.perf_counter()
+                list(ComidaUtils.con_carga_glucemica(Comida.objects.filter(usuario=rnd.choice(usuarios)))[:20])
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            tiempos.sort()
+            self.stdout.write(f'Página de 20 comidas con carga anotada: p50 {tiempos[len(tiempos) // 2]:.1f} ms')
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _carga_detalle(detalle):
+        '''Línea base: carga glucémica de un detalle calculada en Python.'''
+        alimento = detalle.tipo_alimento
+        if alimento.indice_glucemico is None or alimento.carbohidratos_por_100g is None:
+            return 0
+        disponibles = max(float(alimento.carbohidratos_por_100g) - float(alimento.fibra_por_100g or 0), 0)
+        return detalle.cantidad_gramos * disponibles / 100 * float(alimento.indice_glucemico) / 100
@@ -0,0 +1,107 @@
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from nutrition.utils import NutricionUtils, clasificacion_nutricional
+
+
+def _buscar_lineal(alimento):
+    '''Implementación anterior: recorrido lineal de cada lista de categoría.'''
+    return [
+        categoria for categoria, lista in clasificacion_nutricional.items()
+        if alimento in lista
+    ]
+
+
+def _multiples_lineal():
+    alimentos = set(item for lista in clasificacion_nutricional.values() for item in lista)
+    resultado = {}
+    for alimento in alimentos:
+        categorias = _buscar_lineal(alimento)
+        if len(categorias) > 1:
+            resultado[alimento] = categorias
+    return resultado
+
+
+def _filtrar_lineal(*categorias_deseadas):
+    alimentos = set(item for lista in clasificacion_nutricional.values() for item in lista)
+    return [
+        alimento for alimento in alimentos
+        if set(_buscar_lineal(alimento)) == set(categorias_deseadas)
+    ]
+
+
+def _estadisticas_lineal():
+    alimentos_unicos = set(item for lista in clasificacion_nutricional.values() for item in lista)
+    return {
+        'total_por_categoria': {categoria: len(lista) for categoria, lista in clasificacion_nutricional.items()},
+        'alimentos_unicos': len(alimentos_unicos),
+        'alimentos_multiples': len(_multiples_lineal()),
+        'total_entradas': sum(len(lista) for lista in clasificacion_nutricional.values())
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el índice invertido de clasificacion_nutricional con el recorrido lineal '
+        'anterior: verifica que los resultados coincidan y mide el tiempo de cada operación'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etiquetas', type=int, default=100000, help='Etiquetas a clasificar en lote')
+        parser.add_argument('--repeticiones', type=int, default=200)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        alimentos = sorted({item for lista in clasificacion_nutricional.values() for item in lista})
+        etiquetas = [rnd.choice(alimentos + ['desconocido']) for _ in range(options['etiquetas'])]
+        categorias = list(clasificacion_nutricional)
+        combinaciones = [
+            tuple(rnd.sample(categorias, rnd.randint(1, 2))) for _ in range(50)
+        ]
+
+        self._verificar(etiquetas, combinaciones)
+
+        repeticiones = options['repeticiones']
+        casos = [
+            (
+                f'Clasificar {len(etiquetas)} etiquetas',
+                lambda: [_buscar_lineal(etiqueta) for etiqueta in etiquetas],
+                lambda: NutricionUtils.clasificar_lote(etiquetas),
+                3,
+            ),
+            ('encontrar_alimentos_multiples', _multiples_lineal, NutricionUtils.encontrar_alimentos_multiples, repeticiones),
+            (
+                f'filtrar_por_categoria ({len(combinaciones)} combinaciones)',
+                lambda: [_filtrar_lineal(*combinacion) for combinacion in combinaciones],
+                lambda: NutricionUtils.filtrar_por_categorias_lote(combinaciones),
+                max(1, repeticiones // 20),
+            ),
+            ('obtener_estadisticas', _estadisticas_lineal, NutricionUtils.obtener_estadisticas, repeticiones),
+        ]
+        for nombre, lineal, indexado, veces in casos:
+            tiempo_lineal = self._medir(lineal, veces)
+            tiempo_indexado = self._medir(indexado, veces)
+            self.stdout.write(
+                f'{nombre}: lineal {tiempo_lineal * 1e3:.3f} ms, índice {tiempo_indexado * 1e3:.3f} ms '
+                f'({tiempo_lineal / tiempo_indexado:.0f}x)'
+            )
+        self.stdout.write(self.style.SUCCESS('Resultados idénticos a la implementación lineal'))
+
+    def _verificar(self, etiquetas, combinaciones):
+        if NutricionUtils.clasificar_lote(etiquetas) != [_buscar_lineal(etiqueta) for etiqueta in etiquetas]:
+            raise CommandError('clasificar_lote difiere de la búsqueda lineal')
+        if NutricionUtils.encontrar_alimentos_multiples() != _multiples_lineal():
+            raise CommandError('encontrar_alimentos_multiples difiere de la implementación lineal')
+        if NutricionUtils.obtener_estadisticas() != _estadisticas_lineal():
+            raise CommandError('obtener_estadisticas difiere de la implementación lineal')
+        for combinacion in combinaciones:
+            if set(NutricionUtils.filtrar_por_categoria(*combinacion)) != set(_filtrar_lineal(*combinacion)):
+                raise CommandError(f'filtrar_por_categoria{combinacion} difiere de la implementación lineal')
+
+    @staticmethod
+    def _medir(funcion, veces):
+        inicio = time.perf_counter()
+        for _ in range(veces):
+            funcion()
+        return (time.perf_counter() - inicio) / veces
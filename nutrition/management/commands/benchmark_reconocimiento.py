@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from nutrition.reconocimiento import ProcesadorLotes, ReconocedorSimulado
+
+
+class _ReconocedorMedido(ReconocedorSimulado):
+    '''Reconocedor simulado que cuenta los lotes recibidos.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lotes = 0
+        self._lock = threading.Lock()
+
+    def predecir_lote(self, imagenes):
+        with self._lock:
+            self.lotes += 1
+        return super().predecir_lote(imagenes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide throughput y latencia de la etapa de reconocimiento con micro-lotes '
+        'para distintos tamaños de lote, usando el reconocedor simulado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imagenes', type=int, default=1000)
+        parser.add_argument('--tamanos', default='1,4,8,16,32', help='Tamaños de lote separados por coma')
+        parser.add_argument('--trabajadores', type=int, default=2)
+        parser.add_argument('--espera-ms', type=float, default=10.0, help='Espera máxima para llenar un lote')
+        parser.add_argument('--tasa', type=float, default=0, help='Imágenes por segundo que llegan (0: todas a la vez)')
+        parser.add_argument('--costo-lote-ms', type=float, default=20.0)
+        parser.add_argument('--costo-imagen-ms', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [int(tamano) for tamano in options['tamanos'].split(',')]
+        except ValueError:
+            raise CommandError('--tamanos debe ser una lista de enteros separados por coma')
+        imagenes = [os.urandom(64) for _ in range(options['imagenes'])]
+
+        llegada = f"{options['tasa']:g} img/s" if options['tasa'] else 'simultánea'
+        self.stdout.write(
+            f"{len(imagenes)} imágenes, {options['trabajadores']} trabajadores, "
+            f"costo simulado {options['costo_lote_ms']:g} ms/lote + {options['costo_imagen_ms']:g} ms/imagen, "
+            f"llegada {llegada}"
+        )
+        for tamano in tamanos:
+            reconocedor = _ReconocedorMedido(options['costo_lote_ms'], options['costo_imagen_ms'])
+            procesador = ProcesadorLotes(
+                reconocedor,
+                tamano_lote=tamano,
+                espera_maxima=options['espera_ms'] / 1000,
+                trabajadores=options['trabajadores'],
+                max_pendientes=len(imagenes),
+            )
+            latencias = []
+            lock = threading.Lock()
+
+            def registrar(futuro, enviado):
+                with lock:
+                    latencias.append(time.perf_counter() - enviado)
+
+            inicio = time.perf_counter()
+            futuros = []
+            for i, imagen in enumerate(imagenes):
+                if options['tasa']:
+                    espera = inicio + i / options['tasa'] - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                enviado = time.perf_counter()
+                futuro = procesador.enviar(imagen)
+                futuro.add_done_callback(lambda f, enviado=enviado: registrar(f, enviado))
+                futuros.append(futuro)
+            for futuro in futuros:
+                futuro.result()
+            total = time.perf_counter() - inicio
+            procesador.cerrar()
+
+            latencias.sort()
+            self.stdout.write(
+                f'Lote {tamano:>3}: {len(imagenes) / total:8.1f} img/s, '
+                f'latencia p50 {self._percentil(latencias, 50) * 1e3:7.1f} ms, '
+                f'p95 {self._percentil(latencias, 95) * 1e3:7.1f} ms, '
+                f'p99 {self._percentil(latencias, 99) * 1e3:7.1f} ms, '
+                f'lote promedio {len(imagenes) / reconocedor.lotes:.1f}'
+            )
+
+    @staticmethod
+    def _percentil(valores, percentil):
+        return valores[min(len(valores) - 1, int(len(valores) * percentil / 100))]
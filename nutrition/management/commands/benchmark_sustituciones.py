@@ -0,0 +1,77 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from nutrition.models import TipoAlimento
+from nutrition.utils import CatalogoUtils, SustitucionUtils
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la construcción del índice de sustituciones y la latencia de las '
+        'consultas top-k sobre un catálogo sintético (dentro de una transacción '
+        'que se revierte al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alimentos', type=int, default=100000)
+        parser.add_argument('--consultas', type=int, default=10000)
+        parser.add_argument('--k', type=int, default=SustitucionUtils.K_POR_DEFECTO)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        categorias = TipoAlimento.CategoriaChoices.values
+
+        with transaction.atomic():
+            lote = []
+            for i in range(options['alimentos']):
+                nombre = f'Alimento sintético {i}'
+                lote.append(TipoAlimento(
+                    nombre=nombre,
+                    nombre_normalizado=TipoAlimento.normalizar_nombre(nombre),
+                    categoria=rnd.choice(categorias),
+                    indice_glucemico=rnd.randint(10, 95) if rnd.random() < 0.9 else None,
+                    calorias_por_100g=rnd.randint(20, 600),
+                    carbohidratos_por_100g=rnd.randint(0, 80),
+                    proteinas_por_100g=rnd.randint(0, 30) if rnd.random() < 0.8 else None,
+                    grasas_por_100g=rnd.randint(0, 40) if rnd.random() < 0.8 else None,
+                    fibra_por_100g=rnd.randint(0, 10) if rnd.random() < 0.6 else None,
+                ))
+                if len(lote) == 5000:
+                    TipoAlimento.objects.bulk_create(lote)
+                    lote = []
+            TipoAlimento.objects.bulk_create(lote)
+            CatalogoUtils._snapshot = None
+            SustitucionUtils._indice = None
+
+            inicio = time.perf_counter()
+            snapshot = CatalogoUtils.construir('benchmark')
+            CatalogoUtils._snapshot, CatalogoUtils._verificado = snapshot, time.monotonic() + 3600
+            self.stdout.write(f'Snapshot del catálogo: {time.perf_counter() - inicio:.1f} s')
+
+            inicio = time.perf_counter()
+            indice = SustitucionUtils.get_indice()
+            SustitucionUtils._verificado = time.monotonic() + 3600
+            self.stdout.write(
+                f'Índice de sustituciones: {time.perf_counter() - inicio:.1f} s '
+                f'({int((indice.vecinos[:, 0] >= 0).sum())} alimentos con sustitutos)'
+            )
+
+            ids = list(indice.alimentos)
+            tiempos = []
+            for _ in range(options['consultas']):
+                alimento_id = rnd.choice(ids)
+                inicio = time.perf_counter()
+                SustitucionUtils.sugerir(alimento_id, options['k'])
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            tiempos.sort()
+            self.stdout.write(
+                f'Consulta top-{options["k"]}: p50 {tiempos[len(tiempos) // 2]:.3f} ms, '
+                f'p99 {tiempos[min(len(tiempos) - 1, len(tiempos) * 99 // 100)]:.3f} ms '
+                f'({len(tiempos)} consultas)'
+            )
+
+            CatalogoUtils._snapshot = None
+            SustitucionUtils._indice = None
+            transaction.set_rollback(True)
@@ -0,0 +1,308 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from nutrition.models import TipoAlimento
+from nutrition.utils import CatalogoUtils, ComidaUtils
+
+# Palabras clave (normalizadas) para mapear categorías externas a CategoriaChoices
+PALABRAS_CATEGORIA = [
+    ('lacteo', ('lacteo', 'leche', 'queso', 'yogur', 'dairy', 'milk', 'cheese', 'yogurt')),
+    ('fruta', ('fruta', 'fruit')),
+    ('verdura', ('verdura', 'hortaliza', 'vegetal', 'vegetable', 'ensalada', 'salad')),
+    ('grasa', ('grasa', 'aceite', 'mantequilla', 'fat', 'oil', 'butter', 'nut', 'semilla', 'seed')),
+    ('proteina', (
+        'proteina', 'carne', 'cerdo', 'pollo', 'pescado', 'marisco', 'huevo', 'leguminosa',
+        'protein', 'meat', 'beef', 'pork', 'poultry', 'fish', 'seafood', 'egg', 'legume', 'bean',
+    )),
+    ('carbohidrato', (
+        'carbohidrato', 'cereal', 'grano', 'pan', 'pasta', 'arroz', 'tuberculo', 'azucar', 'dulce',
+        'carbohydrate', 'grain', 'bread', 'rice', 'tuber', 'starch', 'sugar', 'sweet', 'baked',
+    )),
+]
+CLAVES_COLUMNAS = {
+    'nombre': ('nombre', 'name', 'descripcion', 'description', 'alimento', 'food'),
+    'categoria': ('categoria', 'category', 'grupo', 'group'),
+    'calorias': ('calorias', 'kcal', 'energia', 'energy', 'calories'),
+    'indice': ('indice_glucemico', 'glucemico', 'glycemic', 'gi'),
+    'carbohidratos': ('carbohidratos', 'carbohidrato', 'carbohydrate', 'carbs', 'hidratos'),
+    'proteinas': ('proteinas', 'proteina', 'protein'),
+    'grasas': ('grasas', 'grasa', 'lipidos', 'lipid', 'fat'),
+    'fibra': ('fibra', 'fiber', 'fibre'),
+}
+MACRONUTRIENTES = {
+    'carbohidratos': 'carbohidratos_por_100g',
+    'proteinas': 'proteinas_por_100g',
+    'grasas': 'grasas_por_100g',
+    'fibra': 'fibra_por_100g',
+}
+CAMPOS_ACTUALIZABLES = ['categoria', 'indice_glucemico', 'calorias_por_100g', *MACRONUTRIENTES.values()]
+MAX_INDICE = Decimal('99.99')
+MAX_CALORIAS = Decimal('9999.99')
+MAX_GRAMOS = Decimal('100')
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa tablas de composición de alimentos (CSV, JSON o NDJSON) a TipoAlimento. '
+        'Procesa el archivo en streaming y hace upsert por lotes usando el nombre único: '
+        'inserta los alimentos nuevos, actualiza solo los que cambiaron y omite el resto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV, JSON (arreglo de objetos) o NDJSON')
+        parser.add_argument('--formato', choices=['auto', 'csv', 'json', 'ndjson'], default='auto')
+        parser.add_argument('--columna-nombre', help='Columna/clave del nombre (autodetectada si se omite)')
+        parser.add_argument('--columna-categoria', help='Columna/clave de la categoría (autodetectada si se omite)')
+        parser.add_argument('--columna-calorias', help='Columna/clave de kcal por 100 g (autodetectada si se omite)')
+        parser.add_argument('--columna-indice', help='Columna/clave del índice glucémico (autodetectada si se omite)')
+        for clave in MACRONUTRIENTES:
+            parser.add_argument(
+                f'--columna-{clave}', help=f'Columna/clave de {clave} en g por 100 g (autodetectada si se omite)'
+            )
+        parser.add_argument(
+            '--mapa-categorias',
+            help='JSON con {categoría externa: categoría de TipoAlimento} que tiene prioridad sobre las palabras clave'
+        )
+        parser.add_argument('--delimitador', default=',', help='Delimitador del CSV')
+        parser.add_argument('--tamano-lote', type=int, default=2000, help='Filas por transacción')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        if not os.path.isfile(archivo):
+            raise CommandError(f'No existe el archivo {archivo}')
+        formato = options['formato']
+        if formato == 'auto':
+            extension = os.path.splitext(archivo)[1].lower()
+            formato = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(extension, 'csv')
+        self.mapa_categorias = self._leer_mapa(options['mapa_categorias'])
+
+        contadores = {'insertados': 0, 'actualizados': 0, 'omitidos': 0, 'invalidos': 0}
+        procesadas = 0
+        inicio = time.monotonic()
+
+        with open(archivo, newline='', encoding='utf-8-sig') as f:
+            registros = self._leer_registros(f, formato, options['delimitador'])
+            columnas = None
+            while True:
+                filas = list(islice(registros, options['tamano_lote']))
+                if not filas:
+                    break
+                if columnas is None:
+                    columnas = self._resolver_columnas(filas[0], options)
+
+                alimentos = {}
+                validas = 0
+                for fila in filas:
+                    alimento = self._parsear(fila, columnas)
+                    if alimento is None:
+                        contadores['invalidos'] += 1
+                        continue
+                    # Dentro del lote gana la última fila con el mismo nombre
+                    validas += 1
+                    alimentos[alimento.nombre] = alimento
+
+                with transaction.atomic():
+                    insertados, actualizados = self._guardar_lote(list(alimentos.values()))
+                contadores['insertados'] += insertados
+                contadores['actualizados'] += actualizados
+                contadores['omitidos'] += validas - insertados - actualizados
+                procesadas += len(filas)
+
+                transcurrido = time.monotonic() - inicio
+                self.stdout.write(
+                    f"Filas {procesadas}: {contadores['insertados']} insertados, "
+                    f"{contadores['actualizados']} actualizados, {contadores['omitidos']} omitidos, "
+                    f"{contadores['invalidos']} inválidos "
+                    f"({procesadas / transcurrido if transcurrido else 0:.0f} filas/s)"
+                )
+
+        if contadores['insertados'] or contadores['actualizados']:
+            # bulk_create no emite señales: publicar la nueva versión del catálogo una sola vez
+            CatalogoUtils.invalidar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completa: {contadores['insertados']} insertados, "
+            f"{contadores['actualizados']} actualizados, {contadores['omitidos']} omitidos, "
+            f"{contadores['invalidos']} inválidos"
+        ))
+
+    def _leer_registros(self, f, formato, delimitador):
+        '''Generador de registros (dict) sin cargar el archivo completo en memoria.'''
+        if formato == 'csv':
+            yield from csv.DictReader(f, delimiter=delimitador)
+        elif formato == 'ndjson':
+            for numero, linea in enumerate(f, start=1):
+                if linea.strip():
+                    yield self._decodificar(linea, numero)
+        else:
+            yield from self._leer_arreglo_json(f)
+
+    def _decodificar(self, texto, numero):
+        try:
+            registro = json.loads(texto)
+        except ValueError:
+            raise CommandError(f'JSON inválido en la línea {numero}')
+        return registro if isinstance(registro, dict) else {}
+
+    def _leer_arreglo_json(self, f, tamano_bloque=1 << 16):
+        '''Recorrer un arreglo JSON de objetos decodificando un elemento a la vez.'''
+        decodificador = json.JSONDecoder()
+        bufer = f.read(tamano_bloque).lstrip()
+        if not bufer.startswith('['):
+            raise CommandError('Se esperaba un arreglo JSON de objetos')
+        bufer = bufer[1:]
+        fin_archivo = False
+        while True:
+            bufer = bufer.lstrip().lstrip(',').lstrip()
+            if bufer.startswith(']'):
+                return
+            try:
+                registro, posicion = decodificador.raw_decode(bufer)
+            except ValueError:
+                if fin_archivo:
+                    raise CommandError('Arreglo JSON incompleto o inválido')
+                bloque = f.read(tamano_bloque)
+                fin_archivo = not bloque
+                bufer += bloque
+                continue
+            yield registro if isinstance(registro, dict) else {}
+            bufer = bufer[posicion:]
+
+    def _resolver_columnas(self, registro, options):
+        '''Ubicar las claves de nombre, categoría, calorías, índice glucémico y macronutrientes.'''
+        normalizado = {clave.strip().lower(): clave for clave in registro}
+
+        def buscar(nombre, claves, requerida=False):
+            if nombre:
+                if nombre.strip().lower() not in normalizado:
+                    raise CommandError(f'No existe la columna "{nombre}"')
+                return normalizado[nombre.strip().lower()]
+            for clave in claves:
+                for columna, original in normalizado.items():
+                    if clave == columna or (len(clave) > 3 and clave in columna):
+                        return original
+            if requerida:
+                raise CommandError(f'No se pudo detectar la columna ({", ".join(claves)}); use las opciones --columna-*')
+            return None
+
+        return {
+            'nombre': buscar(options['columna_nombre'], CLAVES_COLUMNAS['nombre'], requerida=True),
+            'categoria': buscar(options['columna_categoria'], CLAVES_COLUMNAS['categoria']),
+            'calorias': buscar(options['columna_calorias'], CLAVES_COLUMNAS['calorias']),
+            'indice': buscar(options['columna_indice'], CLAVES_COLUMNAS['indice']),
+            **{
+                clave: buscar(options[f'columna_{clave}'], CLAVES_COLUMNAS[clave])
+                for clave in MACRONUTRIENTES
+            },
+        }
+
+    def _parsear(self, registro, columnas):
+        '''Convertir un registro en un TipoAlimento sin guardar, o None si no es válido.'''
+        nombre = ' '.join(str(registro.get(columnas['nombre']) or '').split())
+        if not nombre or len(nombre) > TipoAlimento._meta.get_field('nombre').max_length:
+            return None
+        try:
+            calorias = self._decimal(registro.get(columnas['calorias']) if columnas['calorias'] else None)
+            indice = self._decimal(registro.get(columnas['indice']) if columnas['indice'] else None)
+            macronutrientes = {
+                campo: self._decimal(registro.get(columnas[clave]) if columnas[clave] else None)
+                for clave, campo in MACRONUTRIENTES.items()
+            }
+        except InvalidOperation:
+            return None
+        if calorias is not None and not 0 <= calorias <= MAX_CALORIAS:
+            return None
+        if indice is not None and not 0 <= indice <= MAX_INDICE:
+            return None
+        if any(valor is not None and not 0 <= valor <= MAX_GRAMOS for valor in macronutrientes.values()):
+            return None
+
+        categoria = registro.get(columnas['categoria']) if columnas['categoria'] else None
+        return TipoAlimento(
+            nombre=nombre,
+            nombre_normalizado=TipoAlimento.normalizar_nombre(nombre),
+            categoria=self._mapear_categoria(categoria),
+            calorias_por_100g=calorias,
+            indice_glucemico=indice,
+            **macronutrientes,
+        )
+
+    @staticmethod
+    def _decimal(valor):
+        '''Decimal con dos cifras; None si falta o es NaN (celda vacía en exportaciones de pandas/JSON).'''
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            return None
+        numero = Decimal(str(valor).strip().replace(',', '.'))
+        if numero.is_nan():
+            return None
+        if not numero.is_finite():
+            raise InvalidOperation(f'Valor no finito: {valor}')
+        return numero.quantize(Decimal('0.01'))
+
+    def _mapear_categoria(self, categoria):
+        '''Categoría de TipoAlimento para una categoría externa (otro si no se reconoce).'''
+        texto = TipoAlimento.normalizar_nombre(str(categoria or ''))
+        if not texto:
+            return TipoAlimento.CategoriaChoices.OTRO
+        if texto in self.mapa_categorias:
+            return self.mapa_categorias[texto]
+        if texto in TipoAlimento.CategoriaChoices.values:
+            return texto
+        # Palabras completas, aceptando plurales simples (frutas, vegetables, cereales)
+        palabras = set()
+        for palabra in texto.split():
+            palabras.update((palabra, palabra.removesuffix('s'), palabra.removesuffix('es')))
+        for valor, claves in PALABRAS_CATEGORIA:
+            if palabras.intersection(claves):
+                return valor
+        return TipoAlimento.CategoriaChoices.OTRO
+
+    def _leer_mapa(self, ruta):
+        if not ruta:
+            return {}
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                mapa = json.load(f)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'No se pudo leer el mapa de categorías: {error}')
+        invalidas = set(mapa.values()) - set(TipoAlimento.CategoriaChoices.values)
+        if invalidas:
+            raise CommandError(f"Categorías desconocidas en el mapa: {', '.join(sorted(invalidas))}")
+        return {TipoAlimento.normalizar_nombre(clave): valor for clave, valor in mapa.items()}
+
+    def _guardar_lote(self, alimentos):
+        '''
+        Upsert de un lote por nombre: una consulta para los existentes y un
+        INSERT ... ON CONFLICT (nombre) DO UPDATE solo con los nuevos y los que cambiaron.
+
+        Returns:
+            tuple: (insertados, actualizados)
+        '''
+        existentes = {
+            fila[0]: (fila[1], dict(zip(CAMPOS_ACTUALIZABLES, fila[2:])))
+            for fila in TipoAlimento.objects.filter(nombre__in=[a.nombre for a in alimentos])
+            .values_list('nombre', 'id', *CAMPOS_ACTUALIZABLES)
+        }
+        nuevos = [a for a in alimentos if a.nombre not in existentes]
+        cambiados = [
+            a for a in alimentos
+            if a.nombre in existentes
+            and any(existentes[a.nombre][1][campo] != getattr(a, campo) for campo in CAMPOS_ACTUALIZABLES)
+        ]
+        if nuevos or cambiados:
+            TipoAlimento.objects.bulk_create(
+                nuevos + cambiados,
+                update_conflicts=True,
+                unique_fields=['nombre'],
+                update_fields=CAMPOS_ACTUALIZABLES + ['updated_at'],
+            )
+        # bulk_create no emite señales: recalcular las comidas de los alimentos con otros valores nutricionales
+        ComidaUtils.invalidar_alimentos(
+            existentes[a.nombre][0] for a in cambiados
+            if any(existentes[a.nombre][1][campo] != getattr(a, campo) for campo in ComidaUtils.CAMPOS_ALIMENTO)
+        )
+        return len(nuevos), len(cambiados)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from nutrition.models import Comida
+from nutrition.utils import ComidaUtils, ResumenNutricionUtils
+
+
+class Command(BaseCommand):
+    help = 'Recalcula en bloque los totales desnormalizados de las comidas (calorías, gramos e índice glucémico)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a recalcular (repetible). Por defecto, todos.'
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo reporta las comidas con totales desactualizados, sin corregirlas.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuario'] or (
+            Comida.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+        )
+        verificar = options['verificar']
+        total = 0
+        total_diferentes = 0
+        for usuario_id in usuarios:
+            revisadas, diferentes = ComidaUtils.recalcular(
+                Comida.objects.filter(usuario_id=usuario_id), verificar=verificar
+            )
+            if not verificar:
+                ResumenNutricionUtils.recalcular_comidas(diferentes)
+            total += revisadas
+            total_diferentes += len(diferentes)
+            linea = f'Usuario {usuario_id}: {revisadas} comidas, {len(diferentes)} con diferencias'
+            if verificar and diferentes:
+                linea += f" ({', '.join(str(pk) for pk in diferentes[:20])}{', ...' if len(diferentes) > 20 else ''})"
+            self.stdout.write(linea)
+
+        if verificar:
+            estilo = self.style.SUCCESS if not total_diferentes else self.style.WARNING
+            self.stdout.write(estilo(f'Comidas revisadas: {total}, con diferencias: {total_diferentes}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Comidas revisadas: {total}, corregidas: {total_diferentes}'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from nutrition.models import Comida
+from nutrition.utils import ResumenNutricionUtils
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes nutricionales diarios desde las comidas registradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a reconstruir (repetible). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuario'] or (
+            Comida.objects.values_list('usuario_id', flat=True).distinct().order_by('usuario_id')
+        )
+        total = 0
+        for usuario_id in usuarios:
+            dias = ResumenNutricionUtils.reconstruir(usuario_id)
+            total += dias
+            self.stdout.write(f'Usuario {usuario_id}: {dias} días')
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes reconstruidos: {total} días'))
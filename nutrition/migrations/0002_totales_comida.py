@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comida',
+            name='gramos_con_indice',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='comida',
+            name='gramos_totales',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='comida',
+            name='indice_glucemico_promedio',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Índice glucémico promedio ponderado por gramos', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='comida',
+            name='suma_indice_ponderada',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:28
+
+import re
+import unicodedata
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'[0-9a-z]+', texto))
+
+
+def poblar_nombre_normalizado(apps, schema_editor):
+    TipoAlimento = apps.get_model('nutrition', 'TipoAlimento')
+    alimentos = list(TipoAlimento.objects.only('id', 'nombre'))
+    for alimento in alimentos:
+        alimento.nombre_normalizado = normalizar(alimento.nombre)
+    TipoAlimento.objects.bulk_update(alimentos, ['nombre_normalizado'], batch_size=1000)
+
+
+# SQLite: índice FTS5 de contenido externo sincronizado con triggers
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE tipos_alimentos_fts USING fts5(
+        nombre_normalizado, categoria,
+        content='tipos_alimentos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tipos_alimentos_fts_ai AFTER INSERT ON tipos_alimentos BEGIN
+        INSERT INTO tipos_alimentos_fts(rowid, nombre_normalizado, categoria)
+        VALUES (new.id, new.nombre_normalizado, new.categoria);
+    END
+    """,
+    """
+    CREATE TRIGGER tipos_alimentos_fts_ad AFTER DELETE ON tipos_alimentos BEGIN
+        INSERT INTO tipos_alimentos_fts(tipos_alimentos_fts, rowid, nombre_normalizado, categoria)
+        VALUES ('delete', old.id, old.nombre_normalizado, old.categoria);
+    END
+    """,
+    """
+    CREATE TRIGGER tipos_alimentos_fts_au AFTER UPDATE OF nombre_normalizado, categoria ON tipos_alimentos BEGIN
+        INSERT INTO tipos_alimentos_fts(tipos_alimentos_fts, rowid, nombre_normalizado, categoria)
+        VALUES ('delete', old.id, old.nombre_normalizado, old.categoria);
+        INSERT INTO tipos_alimentos_fts(rowid, nombre_normalizado, categoria)
+        VALUES (new.id, new.nombre_normalizado, new.categoria);
+    END
+    """,
+    "INSERT INTO tipos_alimentos_fts(tipos_alimentos_fts) VALUES ('rebuild')",
+]
+SQLITE_BORRAR = [
+    'DROP TRIGGER IF EXISTS tipos_alimentos_fts_ai',
+    'DROP TRIGGER IF EXISTS tipos_alimentos_fts_ad',
+    'DROP TRIGGER IF EXISTS tipos_alimentos_fts_au',
+    'DROP TABLE IF EXISTS tipos_alimentos_fts',
+]
+
+# PostgreSQL: índice de trigramas para prefijos de palabra (LIKE '% term%')
+POSTGRESQL_CREAR = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS tipos_alimentos_nombre_trgm '
+    'ON tipos_alimentos USING gin (nombre_normalizado gin_trgm_ops)',
+]
+POSTGRESQL_BORRAR = ['DROP INDEX IF EXISTS tipos_alimentos_nombre_trgm']
+
+
+def ejecutar(sentencias_por_motor):
+    def operacion(apps, schema_editor):
+        for sentencia in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0002_totales_comida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tipoalimento',
+            name='nombre_normalizado',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='tipoalimento',
+            index=models.Index(fields=['nombre_normalizado'], name='tipos_alime_nombre__9449bb_idx'),
+        ),
+        migrations.RunPython(poblar_nombre_normalizado, migrations.RunPython.noop),
+        migrations.RunPython(
+            ejecutar({'sqlite': SQLITE_CREAR, 'postgresql': POSTGRESQL_CREAR}),
+            ejecutar({'sqlite': SQLITE_BORRAR, 'postgresql': POSTGRESQL_BORRAR}),
+        ),
+    ]
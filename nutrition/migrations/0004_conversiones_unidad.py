@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:37
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_busqueda_alimentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversionUnidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unidad_medida', models.CharField(choices=[('gramos', 'Gramos'), ('piezas', 'Piezas'), ('tazas', 'Tazas'), ('cucharadas', 'Cucharadas'), ('ml', 'Mililitros')], max_length=20)),
+                ('gramos_por_unidad', models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('tipo_alimento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversiones', to='nutrition.tipoalimento')),
+            ],
+            options={
+                'verbose_name': 'Conversión de Unidad',
+                'verbose_name_plural': 'Conversiones de Unidad',
+                'db_table': 'conversiones_unidad',
+                'ordering': ['tipo_alimento', 'unidad_medida'],
+                'unique_together': {('tipo_alimento', 'unidad_medida')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0004_conversiones_unidad'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenNutricionDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('calorias_totales', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('gramos_totales', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('comidas_por_tipo', models.JSONField(default=dict, help_text='Número de comidas por tipo_comida')),
+                ('gramos_por_categoria', models.JSONField(default=dict, help_text='Gramos por categoría de alimento')),
+                ('gramos_con_indice', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('suma_indice_ponderada', models.DecimalField(decimal_places=2, default=0, max_digits=13)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_nutricion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Nutricional Diario',
+                'verbose_name_plural': 'Resúmenes Nutricionales Diarios',
+                'db_table': 'resumenes_nutricion_diarios',
+                'ordering': ['-fecha'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'fecha'), name='resumen_nutricion_diario_unico')],
+            },
+        ),
+    ]
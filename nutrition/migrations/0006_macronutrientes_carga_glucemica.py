@@ -0,0 +1,39 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:43
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0005_resumenes_nutricion_diarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumennutriciondiario',
+            name='carga_glucemica',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Suma de índice glucémico × carbohidratos disponibles / 100 del día', max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='tipoalimento',
+            name='carbohidratos_por_100g',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Carbohidratos totales; descontando la fibra son la base de la carga glucémica', max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AddField(
+            model_name='tipoalimento',
+            name='fibra_por_100g',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AddField(
+            model_name='tipoalimento',
+            name='grasas_por_100g',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AddField(
+            model_name='tipoalimento',
+            name='proteinas_por_100g',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
@@ -1,9 +1,22 @@
+import re
+import unicodedata
+from decimal import Decimal
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 User = get_user_model()
 
+# Factores de conversión a gramos por unidad de medida (estimaciones promedio).
+# Se usan cuando el alimento no tiene una ConversionUnidad propia.
+FACTORES_GRAMOS = {
+    'gramos': 1,
+    'piezas': 100,
+    'tazas': 250,
+    'cucharadas': 15,
+    'ml': 1,  # Para líquidos, similar peso
+}
+
 
 class TipoAlimento(models.Model):
     """
@@ -21,6 +34,8 @@ class TipoAlimento(models.Model):
         OTRO = 'otro', 'Otro'
     
     nombre = models.CharField(max_length=100, unique=True)
+    # Nombre sin acentos ni mayúsculas para búsqueda (se mantiene en save)
+    nombre_normalizado = models.CharField(max_length=100, default='', editable=False)
     categoria = models.CharField(
         max_length=20,
         choices=CategoriaChoices.choices
@@ -40,6 +55,37 @@ class TipoAlimento(models.Model):
         blank=True,
         validators=[MinValueValidator(0)]
     )
+
+    # Macronutrientes en gramos por 100 g (opcionales)
+    carbohidratos_por_100g = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        help_text="Carbohidratos totales; descontando la fibra son la base de la carga glucémica"
+    )
+    proteinas_por_100g = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    grasas_por_100g = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    fibra_por_100g = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
     
     # Campos de auditoría
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,10 +100,25 @@ class TipoAlimento(models.Model):
         indexes = [
             models.Index(fields=['categoria']),
             models.Index(fields=['indice_glucemico']),
+            models.Index(fields=['nombre_normalizado']),
         ]
     
     def __str__(self):
         return f"{self.nombre} ({self.get_categoria_display()})"
+
+    @staticmethod
+    def normalizar_nombre(texto):
+        """Minúsculas, sin acentos y con separadores simples: 'Plátano Macho' -> 'platano macho'"""
+        texto = unicodedata.normalize('NFKD', texto or '')
+        texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+        return ' '.join(re.findall(r'[0-9a-z]+', texto))
+
+    def save(self, *args, **kwargs):
+        self.nombre_normalizado = TipoAlimento.normalizar_nombre(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nombre_normalizado'}
+        super().save(*args, **kwargs)
     
     @property
     def impacto_glucemico(self):
@@ -103,6 +164,18 @@ class Comida(models.Model):
         validators=[MinValueValidator(0)]
     )
     notas = models.TextField(blank=True)
+
+    # Totales desnormalizados, mantenidos en cada escritura de DetalleComida
+    gramos_totales = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    indice_glucemico_promedio = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Índice glucémico promedio ponderado por gramos"
+    )
+    gramos_con_indice = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    suma_indice_ponderada = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     # Campos de auditoría
     created_at = models.DateTimeField(auto_now_add=True)
@@ -134,9 +207,11 @@ class Comida(models.Model):
         self.calorias_totales = total
         return total
     
-    @property
-    def indice_glucemico_promedio(self):
-        """Calcula el índice glucémico promedio ponderado de la comida"""
+    def calcular_indice_glucemico_promedio(self):
+        """
+        Calcula el índice glucémico promedio ponderado de la comida desde sus detalles.
+        El valor persistido en indice_glucemico_promedio se mantiene de forma incremental.
+        """
         detalles = self.detalles.select_related('tipo_alimento')
         total_peso = 0
         suma_ponderada = 0
@@ -197,17 +272,10 @@ class DetalleComida(models.Model):
     def cantidad_gramos(self):
         """
         Convierte la cantidad a gramos para cálculos uniformes.
-        Implementa conversiones básicas de unidades.
+        Usa la conversión propia del alimento o, si no existe, el factor general.
         """
-        conversion_factor = {
-            'gramos': 1,
-            'piezas': 100,  # Estimación promedio
-            'tazas': 250,   # Estimación promedio
-            'cucharadas': 15,  # Estimación estándar
-            'ml': 1,  # Para líquidos, similar peso
-        }
-        
-        factor = conversion_factor.get(self.unidad_medida, 1)
+        from .utils import ConversionUtils
+        factor = ConversionUtils.factor(self.tipo_alimento_id, self.unidad_medida)
         return float(self.cantidad) * factor
     
     def calcular_calorias(self):
@@ -217,3 +285,83 @@ class DetalleComida(models.Model):
             calorias_por_gramo = float(self.tipo_alimento.calorias_por_100g) / 100
             return round(gramos * calorias_por_gramo, 2)
         return 0
+
+
+class ConversionUnidad(models.Model):
+    """
+    Gramos por unidad de medida para un alimento específico
+    (una pieza de uva no pesa lo mismo que una de sandía).
+    Sin registro para el alimento y la unidad se usa FACTORES_GRAMOS.
+    """
+
+    tipo_alimento = models.ForeignKey(
+        TipoAlimento,
+        on_delete=models.CASCADE,
+        related_name='conversiones'
+    )
+    unidad_medida = models.CharField(
+        max_length=20,
+        choices=DetalleComida.UnidadMedidaChoices.choices
+    )
+    gramos_por_unidad = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))]
+    )
+
+    class Meta:
+        db_table = 'conversiones_unidad'
+        verbose_name = 'Conversión de Unidad'
+        verbose_name_plural = 'Conversiones de Unidad'
+        unique_together = ['tipo_alimento', 'unidad_medida']
+        ordering = ['tipo_alimento', 'unidad_medida']
+
+    def __str__(self):
+        return f"1 {self.unidad_medida} de {self.tipo_alimento.nombre} = {self.gramos_por_unidad} g"
+
+
+class ResumenNutricionDiario(models.Model):
+    """
+    Resumen nutricional por usuario y día (zona horaria actual).
+    Tabla de rollup mantenida en cada escritura de comidas y detalles.
+    """
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='resumenes_nutricion'
+    )
+    fecha = models.DateField()
+    calorias_totales = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    gramos_totales = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    comidas_por_tipo = models.JSONField(default=dict, help_text="Número de comidas por tipo_comida")
+    gramos_por_categoria = models.JSONField(default=dict, help_text="Gramos por categoría de alimento")
+    gramos_con_indice = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    suma_indice_ponderada = models.DecimalField(max_digits=13, decimal_places=2, default=0)
+    carga_glucemica = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de índice glucémico × carbohidratos disponibles / 100 del día"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'resumenes_nutricion_diarios'
+        verbose_name = 'Resumen Nutricional Diario'
+        verbose_name_plural = 'Resúmenes Nutricionales Diarios'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'fecha'],
+                name='resumen_nutricion_diario_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario.get_full_name()} - {self.fecha.strftime('%d/%m/%Y')} ({self.calorias_totales} kcal)"
+
+    @property
+    def indice_glucemico_promedio(self):
+        """Índice glucémico promedio del día ponderado por gramos"""
+        return round(self.suma_indice_ponderada / self.gramos_con_indice, 2) if self.gramos_con_indice else None
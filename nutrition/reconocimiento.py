@@ -0,0 +1,155 @@
+import hashlib
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .utils import INDICE_NUTRICIONAL
+
+
+class ColaLlena(Exception):
+    '''La cola de reconocimiento alcanzó su capacidad máxima.'''
+
+
+class Reconocedor(ABC):
+    '''
+    Interfaz de un modelo de reconocimiento de alimentos en fotos.
+    Recibe un micro-lote de imágenes (bytes) y devuelve una predicción por
+    imagen. Las implementaciones reales (ONNX Runtime, PyTorch) liberan el
+    GIL durante la inferencia, por lo que varios lotes corren en paralelo
+    en el pool de hilos de ProcesadorLotes.
+    '''
+
+    @abstractmethod
+    def predecir_lote(self, imagenes):
+        '''
+        Returns:
+            list: Tuplas (etiqueta Food-101, confianza 0-1), una por imagen y en el mismo orden
+        '''
+
+
+class ReconocedorSimulado(Reconocedor):
+    '''
+    Reconocedor determinista para pruebas y benchmarks: la etiqueta y la
+    confianza se derivan del hash de la imagen. Simula el costo de un modelo
+    real con un costo fijo por lote más un costo por imagen, que es lo que
+    hace rentable agrupar imágenes.
+    '''
+
+    ETIQUETAS = tuple(sorted(INDICE_NUTRICIONAL))
+
+    def __init__(self, costo_lote_ms=20.0, costo_imagen_ms=2.0):
+        self.costo_lote = costo_lote_ms / 1000
+        self.costo_imagen = costo_imagen_ms / 1000
+
+    def predecir_lote(self, imagenes):
+        costo = self.costo_lote + self.costo_imagen * len(imagenes)
+        if costo > 0:
+            time.sleep(costo)
+        predicciones = []
+        for imagen in imagenes:
+            resumen = hashlib.sha256(imagen).digest()
+            etiqueta = self.ETIQUETAS[int.from_bytes(resumen[:4], 'big') % len(self.ETIQUETAS)]
+            predicciones.append((etiqueta, round(0.5 + resumen[4] / 510, 3)))
+        return predicciones
+
+
+class ProcesadorLotes:
+    '''
+    Etapa de reconocimiento con micro-lotes.
+
+    enviar() encola una imagen y devuelve un Future. Un hilo despachador
+    agrupa las imágenes pendientes en lotes de hasta tamano_lote, esperando
+    como máximo espera_maxima a que el lote se llene, y los entrega a un pool
+    de trabajadores. Como mucho hay `trabajadores` lotes en curso: mientras
+    el pool está ocupado las imágenes se acumulan y el siguiente lote sale
+    más grande, así el tamaño del lote se adapta a la carga.
+    '''
+
+    TAMANO_LOTE = 16
+    ESPERA_MAXIMA = 0.01  # segundos
+    TRABAJADORES = 2
+    MAX_PENDIENTES = 1000
+
+    def __init__(self, reconocedor, tamano_lote=TAMANO_LOTE, espera_maxima=ESPERA_MAXIMA,
+                 trabajadores=TRABAJADORES, max_pendientes=MAX_PENDIENTES):
+        self.reconocedor = reconocedor
+        self.tamano_lote = tamano_lote
+        self.espera_maxima = espera_maxima
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        self._en_curso = threading.Semaphore(trabajadores)
+        self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='reconocimiento')
+        self._despachador = threading.Thread(target=self._despachar, name='reconocimiento-lotes', daemon=True)
+        self._despachador.start()
+
+    def enviar(self, imagen):
+        '''Encolar una imagen; el Future se resuelve con (etiqueta, confianza).'''
+        futuro = Future()
+        try:
+            self.cola.put_nowait((imagen, futuro))
+        except queue.Full:
+            raise ColaLlena()
+        return futuro
+
+    def cerrar(self):
+        '''Procesar lo pendiente y detener el despachador y los trabajadores.'''
+        self.cola.put(None)
+        self._despachador.join()
+        self._ejecutor.shutdown(wait=True)
+
+    def _despachar(self):
+        terminar = False
+        while not terminar:
+            primero = self.cola.get()
+            if primero is None:
+                break
+            lote = [primero]
+            limite = time.monotonic() + self.espera_maxima
+            while len(lote) < self.tamano_lote:
+                try:
+                    elemento = self.cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if elemento is None:
+                    terminar = True
+                    break
+                lote.append(elemento)
+            self._en_curso.acquire()
+            self._ejecutor.submit(self._procesar, lote)
+
+    def _procesar(self, lote):
+        try:
+            predicciones = self.reconocedor.predecir_lote([imagen for imagen, _ in lote])
+        except Exception as error:
+            for _, futuro in lote:
+                futuro.set_exception(error)
+        else:
+            for (_, futuro), prediccion in zip(lote, predicciones):
+                futuro.set_result(prediccion)
+            # Un lote con menos predicciones que imágenes no debe dejar solicitudes esperando
+            faltantes = lote[len(predicciones):]
+            if faltantes:
+                error = RuntimeError(
+                    f'El reconocedor devolvió {len(predicciones)} predicciones para {len(lote)} imágenes'
+                )
+                for _, futuro in faltantes:
+                    futuro.set_exception(error)
+        finally:
+            self._en_curso.release()
+
+
+_procesador = None
+_procesador_lock = threading.Lock()
+
+
+def get_procesador():
+    '''Procesador del proceso con el reconocedor configurado en NUTRICION_RECONOCEDOR.'''
+    global _procesador
+    if _procesador is None:
+        with _procesador_lock:
+            if _procesador is None:
+                ruta = getattr(settings, 'NUTRICION_RECONOCEDOR', 'nutrition.reconocimiento.ReconocedorSimulado')
+                _procesador = ProcesadorLotes(import_string(ruta)())
+    return _procesador
@@ -1,10 +1,21 @@
+from collections.abc import Mapping
+from django.db import transaction
 from rest_framework import serializers
-from .models import TipoAlimento, Comida, DetalleComida
+from .models import TipoAlimento, Comida, DetalleComida, ConversionUnidad, ResumenNutricionDiario
+from .utils import ComidaUtils
 
 
 class TipoAlimentoSerializer(serializers.ModelSerializer):
     class Meta:
         model = TipoAlimento
+        exclude = ['nombre_normalizado']
+
+
+class ConversionUnidadSerializer(serializers.ModelSerializer):
+    tipo_alimento_nombre = serializers.CharField(source='tipo_alimento.nombre', read_only=True)
+
+    class Meta:
+        model = ConversionUnidad
         fields = '__all__'
 
 
@@ -16,11 +27,127 @@ class DetalleComidaSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class DetalleComidaAnidadoSerializer(serializers.ModelSerializer):
+    """
+    Detalle escrito junto con su comida.
+    El alimento se recibe como id y se valida en bloque en ComidaSerializer.
+    """
+    tipo_alimento = serializers.IntegerField(source='tipo_alimento_id')
+    tipo_alimento_nombre = serializers.CharField(source='tipo_alimento.nombre', read_only=True)
+
+    class Meta:
+        model = DetalleComida
+        fields = '__all__'
+        read_only_fields = ['comida']
+        validators = []
+
+    def to_internal_value(self, data):
+        # En PATCH DRF omite los campos requeridos en todo el árbol; cada detalle
+        # reemplaza al anterior, así que se exige completo
+        if getattr(self.root, 'partial', False) and isinstance(data, Mapping):
+            faltantes = {
+                campo.field_name: [campo.error_messages['required']]
+                for campo in self._writable_fields
+                if campo.required and campo.field_name not in data
+            }
+            if faltantes:
+                raise serializers.ValidationError(faltantes)
+        return super().to_internal_value(data)
+
+
 class ComidaSerializer(serializers.ModelSerializer):
-    detalles = DetalleComidaSerializer(many=True, read_only=True)
+    detalles = DetalleComidaAnidadoSerializer(many=True, required=False)
     usuario_nombre = serializers.CharField(source='usuario.get_full_name', read_only=True)
-    indice_glucemico_promedio = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    carga_glucemica = serializers.SerializerMethodField()
 
     class Meta:
         model = Comida
-        fields = '__all__'
+        exclude = ['gramos_con_indice', 'suma_indice_ponderada']
+        read_only_fields = ['calorias_totales', 'gramos_totales', 'indice_glucemico_promedio']
+
+    def get_carga_glucemica(self, obj):
+        # Los listados la traen anotada (ComidaUtils.con_relaciones); si no, una consulta agregada
+        if hasattr(obj, 'carga_glucemica'):
+            return obj.carga_glucemica
+        carga = ComidaUtils.agregar(DetalleComida.objects.filter(comida=obj))['carga_glucemica']
+        return round(carga, 2)
+
+    def validate_detalles(self, detalles):
+        """Valida todos los alimentos con una sola consulta y sin duplicados"""
+        ids = [detalle['tipo_alimento_id'] for detalle in detalles]
+        alimentos = TipoAlimento.objects.in_bulk(set(ids))
+
+        errores = []
+        vistos = set()
+        for tipo_alimento_id in ids:
+            if tipo_alimento_id not in alimentos:
+                errores.append({'tipo_alimento': [f'El alimento {tipo_alimento_id} no existe.']})
+            elif tipo_alimento_id in vistos:
+                errores.append({'tipo_alimento': ['El alimento ya está en la comida.']})
+            else:
+                errores.append({})
+            vistos.add(tipo_alimento_id)
+        if any(errores):
+            raise serializers.ValidationError(errores)
+
+        for detalle in detalles:
+            detalle['tipo_alimento'] = alimentos[detalle.pop('tipo_alimento_id')]
+        return detalles
+
+    def create(self, validated_data):
+        datos_detalles = validated_data.pop('detalles', [])
+        with transaction.atomic():
+            detalles = [DetalleComida(**datos) for datos in datos_detalles]
+            comida = Comida.objects.create(**validated_data, **ComidaUtils.totales(detalles))
+            for detalle in detalles:
+                detalle.comida = comida
+            DetalleComida.objects.bulk_create(detalles)
+        comida._prefetched_objects_cache = {'detalles': detalles}
+        return comida
+
+    def update(self, instance, validated_data):
+        datos_detalles = validated_data.pop('detalles', None)
+        if datos_detalles is None:
+            return super().update(instance, validated_data)
+
+        with transaction.atomic():
+            # Reemplaza el conjunto de detalles: actualiza, crea y borra por alimento
+            existentes = {
+                detalle.tipo_alimento_id: detalle
+                for detalle in instance.detalles.select_related('tipo_alimento')
+            }
+            detalles, nuevos, modificados = [], [], []
+            for datos in datos_detalles:
+                detalle = existentes.pop(datos['tipo_alimento'].pk, None)
+                if detalle is None:
+                    detalle = DetalleComida(comida=instance, **datos)
+                    nuevos.append(detalle)
+                else:
+                    detalle.cantidad = datos['cantidad']
+                    detalle.unidad_medida = datos['unidad_medida']
+                    modificados.append(detalle)
+                detalles.append(detalle)
+
+            if existentes:
+                DetalleComida.objects.filter(pk__in=[d.pk for d in existentes.values()]).delete()
+            if modificados:
+                DetalleComida.objects.bulk_update(modificados, ['cantidad', 'unidad_medida'])
+            if nuevos:
+                DetalleComida.objects.bulk_create(nuevos)
+
+            for campo, valor in {**validated_data, **ComidaUtils.totales(detalles)}.items():
+                setattr(instance, campo, valor)
+            instance.save()
+        instance._prefetched_objects_cache = {'detalles': detalles}
+        return instance
+
+
+class ResumenNutricionDiarioSerializer(serializers.ModelSerializer):
+    indice_glucemico_promedio = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ResumenNutricionDiario
+        fields = [
+            'fecha', 'calorias_totales', 'gramos_totales', 'comidas_por_tipo',
+            'gramos_por_categoria', 'indice_glucemico_promedio', 'carga_glucemica',
+        ]
@@ -0,0 +1,109 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import TipoAlimento, Comida, DetalleComida, ConversionUnidad
+from .utils import ComidaUtils, CatalogoUtils, ConversionUtils, ResumenNutricionUtils, SustitucionUtils
+
+
+@receiver(pre_save, sender=DetalleComida)
+def recordar_detalle_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda el estado previo del detalle para restar su aporte anterior"""
+    instance._detalle_anterior = None
+    if instance.pk and not raw:
+        instance._detalle_anterior = (
+            DetalleComida.objects.select_related('tipo_alimento').filter(pk=instance.pk).first()
+        )
+
+
+@receiver(post_save, sender=DetalleComida)
+def actualizar_totales_comida(sender, instance, raw=False, **kwargs):
+    """Aplica a la comida la diferencia entre el aporte anterior y el nuevo"""
+    if raw:
+        return
+    ComidaUtils.registrar_cambio(getattr(instance, '_detalle_anterior', None), instance)
+    instance._detalle_anterior = None
+
+
+@receiver(post_delete, sender=DetalleComida)
+def descontar_totales_comida(sender, instance, **kwargs):
+    """Resta el aporte del detalle borrado de los totales de la comida"""
+    ComidaUtils.registrar_cambio(instance, None)
+
+
+@receiver(pre_save, sender=TipoAlimento)
+def recordar_alimento_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda los valores nutricionales previos para detectar cambios que afectan a las comidas"""
+    instance._valores_anteriores = None
+    if instance.pk and not raw:
+        instance._valores_anteriores = TipoAlimento.objects.filter(pk=instance.pk).values_list(
+            *ComidaUtils.CAMPOS_ALIMENTO
+        ).first()
+
+
+@receiver(post_save, sender=TipoAlimento)
+@receiver(post_delete, sender=TipoAlimento)
+def invalidar_catalogo(sender, **kwargs):
+    """Publica una nueva versión del catálogo de alimentos y reconstruye el índice de sustituciones"""
+    CatalogoUtils.invalidar()
+    SustitucionUtils.invalidar()
+
+
+@receiver(post_save, sender=TipoAlimento)
+def actualizar_comidas_alimento(sender, instance, raw=False, **kwargs):
+    """Recalcula las comidas y los días que usan el alimento si cambiaron sus valores nutricionales"""
+    anteriores = getattr(instance, '_valores_anteriores', None)
+    instance._valores_anteriores = None
+    if raw or anteriores is None:
+        return
+    # Comparar con lo guardado: los valores asignados pueden ser texto o float
+    actuales = TipoAlimento.objects.filter(pk=instance.pk).values_list(*ComidaUtils.CAMPOS_ALIMENTO).first()
+    if actuales != anteriores:
+        ComidaUtils.invalidar_alimentos([instance.pk])
+
+
+@receiver(pre_save, sender=ConversionUnidad)
+def recordar_conversion_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda el alimento y la unidad previos para recalcular las comidas que dejan de usarla"""
+    instance._clave_anterior = None
+    if instance.pk and not raw:
+        instance._clave_anterior = ConversionUnidad.objects.filter(pk=instance.pk).values_list(
+            'tipo_alimento_id', 'unidad_medida'
+        ).first()
+
+
+@receiver(post_save, sender=ConversionUnidad)
+@receiver(post_delete, sender=ConversionUnidad)
+def actualizar_conversiones(sender, instance, **kwargs):
+    """Publica la nueva tabla de conversiones y recalcula las comidas afectadas"""
+    claves = [(instance.tipo_alimento_id, instance.unidad_medida)]
+    anterior = getattr(instance, '_clave_anterior', None)
+    if anterior is not None:
+        claves.append(anterior)
+    instance._clave_anterior = None
+    ConversionUtils.invalidar(*claves)
+
+
+@receiver(pre_save, sender=Comida)
+def recordar_dia_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda el usuario y la fecha previos para recalcular el día que deja la comida"""
+    instance._dia_anterior = None
+    if instance.pk and not raw:
+        instance._dia_anterior = Comida.objects.filter(pk=instance.pk).values_list('usuario_id', 'fecha_hora').first()
+
+
+@receiver(post_save, sender=Comida)
+def actualizar_resumen_comida(sender, instance, raw=False, **kwargs):
+    """Marca el día de la comida (y el anterior, si cambió) en el resumen nutricional"""
+    if raw:
+        return
+    anterior = getattr(instance, '_dia_anterior', None)
+    if anterior is not None:
+        ResumenNutricionUtils.marcar(*anterior)
+    ResumenNutricionUtils.marcar_comida(instance.pk)
+    instance._dia_anterior = None
+
+
+@receiver(post_delete, sender=Comida)
+def descontar_resumen_comida(sender, instance, **kwargs):
+    """Marca el día de la comida borrada en el resumen nutricional"""
+    ResumenNutricionUtils.marcar(instance.usuario_id, instance.fecha_hora)
+
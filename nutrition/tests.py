@@ -1,3 +1,807 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import SurveyInicial, User as Paciente
+from .models import TipoAlimento, Comida, DetalleComida, ConversionUnidad, ResumenNutricionDiario
+from .reconocimiento import ProcesadorLotes, Reconocedor, ReconocedorSimulado
+from .utils import (
+    BusquedaAlimentosUtils, CatalogoUtils, ComidaUtils, IndiceSustituciones, NutricionUtils, ResumenNutricionUtils,
+    SustitucionUtils, _compilar_indice_nutricional, clasificacion_nutricional,
+)
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ComidaListadoConsultasTests(TestCase):
+    """El listado de comidas cuesta un número constante de consultas por página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x', first_name='Ana', last_name='Pérez')
+        cls.alimentos = [
+            TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato',
+                                        indice_glucemico=Decimal('73'), calorias_por_100g=Decimal('130')),
+            TipoAlimento.objects.create(nombre='Pollo', categoria='proteina',
+                                        indice_glucemico=None, calorias_por_100g=Decimal('165')),
+            TipoAlimento.objects.create(nombre='Manzana', categoria='fruta',
+                                        indice_glucemico=Decimal('36'), calorias_por_100g=None),
+        ]
+        ahora = timezone.now()
+        for i in range(20):
+            comida = Comida.objects.create(
+                usuario=cls.usuario, tipo_comida='almuerzo', fecha_hora=ahora - timedelta(hours=i)
+            )
+            DetalleComida.objects.create(comida=comida, tipo_alimento=cls.alimentos[0], cantidad=Decimal('1.5'), unidad_medida='tazas')
+            DetalleComida.objects.create(comida=comida, tipo_alimento=cls.alimentos[1], cantidad=Decimal('120'), unidad_medida='gramos')
+            DetalleComida.objects.create(comida=comida, tipo_alimento=cls.alimentos[2], cantidad=Decimal('1'), unidad_medida='piezas')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_consultas_constantes(self):
+        # Comidas del usuario + detalles precargados con su alimento
+        with self.assertNumQueries(2):
+            respuesta = self.client.get('/comidas/', {'page_size': 5})
+        self.assertEqual(len(respuesta.data['results']), 5)
+
+        with self.assertNumQueries(2):
+            respuesta = self.client.get('/comidas/', {'page_size': 20})
+        self.assertEqual(len(respuesta.data['results']), 20)
+
+    def test_indicadores_coinciden_con_el_modelo(self):
+        respuesta = self.client.get('/comidas/', {'page_size': 20})
+        for fila in respuesta.data['results']:
+            comida = Comida.objects.get(pk=fila['id'])
+            self.assertEqual(Decimal(fila['indice_glucemico_promedio']),
+                             Decimal(str(comida.calcular_indice_glucemico_promedio())).quantize(Decimal('0.01')))
+            self.assertEqual(Decimal(fila['calorias_totales']),
+                             Decimal(str(comida.calcular_calorias_totales())).quantize(Decimal('0.01')))
+            self.assertEqual(fila['usuario_nombre'], 'Ana Pérez')
+            self.assertEqual({d['tipo_alimento_nombre'] for d in fila['detalles']}, {'Arroz', 'Pollo', 'Manzana'})
+
+
+class ComidaDetallesAnidadosTests(TestCase):
+    """Crear o editar una comida con detalles anidados deja detalles, totales y resumen diario coherentes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.arroz = TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato',
+                                                indice_glucemico=Decimal('73'), calorias_por_100g=Decimal('130'))
+        cls.pollo = TipoAlimento.objects.create(nombre='Pollo', categoria='proteina',
+                                                indice_glucemico=None, calorias_por_100g=Decimal('165'))
+        cls.manzana = TipoAlimento.objects.create(nombre='Manzana', categoria='fruta',
+                                                  indice_glucemico=Decimal('36'), calorias_por_100g=Decimal('52'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.fecha_hora = timezone.now().replace(hour=13, minute=0, second=0, microsecond=0)
+
+    def _guardar(self, metodo, url, detalles=None, **campos):
+        datos = {'usuario': self.usuario.pk, 'tipo_comida': 'almuerzo',
+                 'fecha_hora': self.fecha_hora.isoformat(), **campos}
+        if detalles is not None:
+            datos['detalles'] = detalles
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, metodo)(url, datos, format='json')
+
+    def _verificar_coherencia(self, comida_id):
+        comida = Comida.objects.get(pk=comida_id)
+        _, diferentes = ComidaUtils.recalcular(Comida.objects.filter(pk=comida_id), verificar=True)
+        self.assertEqual(diferentes, [])
+        self.assertEqual(comida.calorias_totales,
+                         Decimal(str(comida.calcular_calorias_totales())).quantize(Decimal('0.01')))
+
+        resumen = ResumenNutricionDiario.objects.get(usuario=self.usuario, fecha=timezone.localdate(comida.fecha_hora))
+        dia = Comida.objects.filter(usuario=self.usuario, fecha_hora__date=resumen.fecha)
+        self.assertEqual(resumen.calorias_totales, sum(c.calorias_totales for c in dia))
+        self.assertEqual(resumen.gramos_totales, sum(c.gramos_totales for c in dia))
+        return comida
+
+    def test_crear_con_detalles(self):
+        respuesta = self._guardar('post', '/comidas/', [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '150', 'unidad_medida': 'gramos'},
+            {'tipo_alimento': self.pollo.pk, 'cantidad': '120', 'unidad_medida': 'gramos'},
+        ])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(len(respuesta.data['detalles']), 2)
+
+        comida = self._verificar_coherencia(respuesta.data['id'])
+        self.assertEqual(comida.detalles.count(), 2)
+        self.assertEqual(comida.calorias_totales, Decimal('393.00'))
+        self.assertEqual(comida.indice_glucemico_promedio, Decimal('73.00'))
+        self.assertEqual(Decimal(respuesta.data['calorias_totales']), comida.calorias_totales)
+
+    def test_actualizar_reemplaza_detalles(self):
+        creada = self._guardar('post', '/comidas/', [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '150', 'unidad_medida': 'gramos'},
+            {'tipo_alimento': self.pollo.pk, 'cantidad': '120', 'unidad_medida': 'gramos'},
+        ]).data
+        id_arroz = next(d['id'] for d in creada['detalles'] if d['tipo_alimento'] == self.arroz.pk)
+
+        # Modifica el arroz, quita el pollo y agrega una manzana
+        respuesta = self._guardar('put', f"/comidas/{creada['id']}/", [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '200', 'unidad_medida': 'gramos'},
+            {'tipo_alimento': self.manzana.pk, 'cantidad': '100', 'unidad_medida': 'gramos'},
+        ])
+        self.assertEqual(respuesta.status_code, 200)
+
+        comida = self._verificar_coherencia(creada['id'])
+        detalles = {d.tipo_alimento_id: d for d in comida.detalles.all()}
+        self.assertEqual(set(detalles), {self.arroz.pk, self.manzana.pk})
+        self.assertEqual(detalles[self.arroz.pk].pk, id_arroz)
+        self.assertEqual(detalles[self.arroz.pk].cantidad, Decimal('200'))
+        self.assertEqual(comida.calorias_totales, Decimal('312.00'))
+        self.assertEqual(comida.indice_glucemico_promedio, Decimal('60.67'))
+
+    def test_actualizar_sin_detalles_los_conserva(self):
+        creada = self._guardar('post', '/comidas/', [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '150', 'unidad_medida': 'gramos'},
+        ]).data
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(f"/comidas/{creada['id']}/", {'notas': 'Sin sal'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+        comida = self._verificar_coherencia(creada['id'])
+        self.assertEqual(comida.notas, 'Sin sal')
+        self.assertEqual(comida.detalles.count(), 1)
+        self.assertEqual(comida.calorias_totales, Decimal('195.00'))
+
+    def test_patch_exige_detalles_completos(self):
+        creada = self._guardar('post', '/comidas/', [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '150', 'unidad_medida': 'gramos'},
+        ]).data
+        url = f"/comidas/{creada['id']}/"
+        for detalles in (
+            [{'tipo_alimento': self.arroz.pk, 'cantidad': '200'}],
+            [{'tipo_alimento': self.pollo.pk, 'cantidad': '200'}],
+            [{'cantidad': '200', 'unidad_medida': 'gramos'}],
+        ):
+            with self.subTest(detalles=detalles):
+                with self.captureOnCommitCallbacks(execute=True):
+                    respuesta = self.client.patch(url, {'detalles': detalles}, format='json')
+                self.assertEqual(respuesta.status_code, 400)
+                faltantes = {'tipo_alimento', 'cantidad', 'unidad_medida'} - set(detalles[0])
+                self.assertEqual(set(respuesta.data['detalles'][0]), faltantes)
+
+        comida = self._verificar_coherencia(creada['id'])
+        self.assertEqual([(d.tipo_alimento_id, d.cantidad) for d in comida.detalles.all()],
+                         [(self.arroz.pk, Decimal('150'))])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(url, {'detalles': [
+                {'tipo_alimento': self.pollo.pk, 'cantidad': '100', 'unidad_medida': 'gramos'},
+            ]}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        comida = self._verificar_coherencia(creada['id'])
+        self.assertEqual(comida.detalles.get().unidad_medida, 'gramos')
+        self.assertEqual(comida.calorias_totales, Decimal('165.00'))
+
+    def test_detalles_invalidos_no_escriben(self):
+        respuesta = self._guardar('post', '/comidas/', [
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '150', 'unidad_medida': 'gramos'},
+            {'tipo_alimento': self.arroz.pk, 'cantidad': '50', 'unidad_medida': 'gramos'},
+            {'tipo_alimento': 999999, 'cantidad': '50', 'unidad_medida': 'gramos'},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data['detalles'][0], {})
+        self.assertIn('tipo_alimento', respuesta.data['detalles'][1])
+        self.assertIn('tipo_alimento', respuesta.data['detalles'][2])
+        self.assertFalse(Comida.objects.exists())
+        self.assertFalse(DetalleComida.objects.exists())
+
+
+class BusquedaAlimentosTests(TestCase):
+    """El ranking y los filtros se aplican a todas las coincidencias, no a un subconjunto"""
+
+    @staticmethod
+    def _crear(nombre, categoria, activo=True):
+        return TipoAlimento(nombre=nombre, nombre_normalizado=TipoAlimento.normalizar_nombre(nombre),
+                            categoria=categoria, activo=activo)
+
+    @classmethod
+    def setUpTestData(cls):
+        # Muchas coincidencias con ids bajos antes de las relevantes
+        TipoAlimento.objects.bulk_create(
+            [cls._crear(f'Sopa de pollo con verduras de temporada {i}', 'proteina') for i in range(1200)]
+            + [cls._crear(f'Caldo de pollo casero {i}', 'proteina', activo=False) for i in range(1200)]
+        )
+        TipoAlimento.objects.bulk_create([
+            cls._crear('Arroz con pollo', 'carbohidrato'),
+            cls._crear('Barra de proteína', 'otro'),
+            cls._crear('Atún', 'proteina'),
+            cls._crear('Queso casero', 'lacteo'),
+        ])
+
+    def _nombres(self, consulta, limite=10, categoria=None):
+        return [a.nombre for a in BusquedaAlimentosUtils.buscar(consulta, limite, categoria)]
+
+    def test_filtro_categoria(self):
+        self.assertEqual(self._nombres('pollo', categoria='carbohidrato'), ['Arroz con pollo'])
+        self.assertEqual(self._nombres('pollo', categoria='fruta'), [])
+
+    def test_inactivos_no_ocultan_coincidencias(self):
+        self.assertEqual(self._nombres('casero'), ['Queso casero'])
+        resultados = self._nombres('pollo', limite=50)
+        self.assertEqual(len(resultados), 50)
+        self.assertFalse(any(nombre.startswith('Caldo') for nombre in resultados))
+
+    def test_ranking_sobre_todas_las_coincidencias(self):
+        # El nombre más corto (mayor bm25) gana aunque tenga el id más alto
+        self.assertEqual(self._nombres('pollo', limite=1), ['Arroz con pollo'])
+        # Coincidencia en el nombre antes que solo en la categoría
+        self.assertEqual(self._nombres('prote', limite=2), ['Barra de proteína', 'Atún'])
+        self.assertEqual(self._nombres('proteina atun'), ['Atún'])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('paciente', password='x'))
+        respuesta = client.get('/tipos-alimentos/buscar/', {'q': 'pollo', 'categoria': 'carbohidrato'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([fila['nombre'] for fila in respuesta.data], ['Arroz con pollo'])
+
+
+class ImportarAlimentosTests(TestCase):
+    """Los valores NaN cuentan como celdas vacías y los infinitos invalidan la fila, sin abortar la importación"""
+
+    def test_valores_no_finitos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'alimentos.csv')
+            with open(archivo, 'w') as f:
+                f.write('nombre,categoria,calorias,indice_glucemico,carbohidratos\n')
+                f.write('Avena,carbohidrato,389,55,66\n')
+                f.write('Lenteja,proteina,NaN,32,nan\n')
+                f.write('Mango,fruta,Infinity,51,15\n')
+                f.write('Pera,fruta,57,38,-inf\n')
+            salida = StringIO()
+            call_command('importar_alimentos', archivo, stdout=salida)
+
+        self.assertIn('2 insertados, 0 actualizados, 0 omitidos, 2 inválidos', salida.getvalue())
+        lenteja = TipoAlimento.objects.get(nombre='Lenteja')
+        self.assertIsNone(lenteja.calorias_por_100g)
+        self.assertIsNone(lenteja.carbohidratos_por_100g)
+        self.assertEqual(lenteja.indice_glucemico, Decimal('32'))
+        self.assertFalse(TipoAlimento.objects.filter(nombre__in=['Mango', 'Pera']).exists())
+
+
+class ClasificacionNutricionalTests(SimpleTestCase):
+    """El índice de máscaras responde lo mismo que recorrer las listas de clasificacion_nutricional"""
+
+    @staticmethod
+    def _categorias(clasificacion, alimento):
+        return [categoria for categoria, lista in clasificacion.items() if alimento in lista]
+
+    def _alimentos(self):
+        return {alimento for lista in clasificacion_nutricional.values() for alimento in lista}
+
+    def test_consultas_por_alimento(self):
+        etiquetas = sorted(self._alimentos()) + ['desconocido', '', 'Pizza']
+        esperado = [self._categorias(clasificacion_nutricional, alimento) for alimento in etiquetas]
+        self.assertEqual([NutricionUtils.buscar_alimento_por_categoria(a) for a in etiquetas], esperado)
+        self.assertEqual(NutricionUtils.clasificar_lote(etiquetas), esperado)
+        self.assertEqual(
+            NutricionUtils.mascaras_lote(etiquetas),
+            [NutricionUtils.mascara(*categorias) for categorias in esperado]
+        )
+
+    def test_multiples_y_estadisticas(self):
+        multiples = {
+            alimento: self._categorias(clasificacion_nutricional, alimento)
+            for alimento in self._alimentos()
+            if len(self._categorias(clasificacion_nutricional, alimento)) > 1
+        }
+        self.assertEqual(NutricionUtils.encontrar_alimentos_multiples(), multiples)
+        self.assertEqual(NutricionUtils.obtener_estadisticas(), {
+            'total_por_categoria': {c: len(lista) for c, lista in clasificacion_nutricional.items()},
+            'alimentos_unicos': len(self._alimentos()),
+            'alimentos_multiples': len(multiples),
+            'total_entradas': sum(len(lista) for lista in clasificacion_nutricional.values()),
+        })
+        # El resultado es una copia: modificarlo no altera las consultas siguientes
+        NutricionUtils.obtener_estadisticas()['total_por_categoria']['fibras'] = 0
+        self.assertEqual(NutricionUtils.obtener_estadisticas()['total_por_categoria']['fibras'],
+                         len(clasificacion_nutricional['fibras']))
+
+    def test_filtros_por_combinacion(self):
+        categorias = list(clasificacion_nutricional)
+        combinaciones = [()] + [
+            tuple(c for i, c in enumerate(categorias) if mascara >> i & 1)
+            for mascara in range(1, 1 << len(categorias))
+        ] + [('proteinas', 'grasas'), ('fibras', 'fibras'), ('fibras', 'azucares')]
+        esperado = [
+            {a for a in self._alimentos() if set(self._categorias(clasificacion_nutricional, a)) == set(combinacion)}
+            for combinacion in combinaciones
+        ]
+        self.assertEqual([set(NutricionUtils.filtrar_por_categoria(*c)) for c in combinaciones], esperado)
+        self.assertEqual([set(f) for f in NutricionUtils.filtrar_por_categorias_lote(combinaciones)], esperado)
+        self.assertEqual(sum(len(alimentos) for alimentos in esperado[1:1 << len(categorias)]), len(self._alimentos()))
+
+    def test_indice_de_clasificaciones_aleatorias(self):
+        aleatorio = random.Random(19)
+        etiquetas = [f'alimento_{i}' for i in range(60)]
+        for _ in range(20):
+            clasificacion = {
+                f'categoria_{i}': aleatorio.sample(etiquetas, aleatorio.randint(0, 30))
+                for i in range(aleatorio.randint(1, 6))
+            }
+            categorias, _, indice, por_mascara, alimentos_por_mascara = _compilar_indice_nutricional(clasificacion)
+            for alimento in etiquetas:
+                esperado = self._categorias(clasificacion, alimento)
+                self.assertEqual(list(por_mascara[indice.get(alimento, 0)]), esperado)
+                if esperado:
+                    self.assertIn(alimento, alimentos_por_mascara[indice[alimento]])
+            self.assertEqual(categorias, tuple(clasificacion))
+            self.assertEqual(set(indice), {a for lista in clasificacion.values() for a in lista})
+
+
+class ProcesadorLotesTests(SimpleTestCase):
+    """Cada imagen enviada recibe su predicción o un error, nunca queda esperando"""
+
+    class ReconocedorIncompleto(Reconocedor):
+        def predecir_lote(self, imagenes):
+            return [('apple_pie', 0.9)] * (len(imagenes) - 1)
+
+    def test_predicciones_faltantes(self):
+        procesador = ProcesadorLotes(self.ReconocedorIncompleto(), tamano_lote=3, espera_maxima=1.0)
+        try:
+            futuros = [procesador.enviar(bytes([i])) for i in range(3)]
+            self.assertEqual(futuros[0].result(timeout=5), ('apple_pie', 0.9))
+            self.assertEqual(futuros[1].result(timeout=5), ('apple_pie', 0.9))
+            with self.assertRaises(RuntimeError):
+                futuros[2].result(timeout=5)
+        finally:
+            procesador.cerrar()
+
+    def test_simulado_una_prediccion_por_imagen(self):
+        procesador = ProcesadorLotes(ReconocedorSimulado(costo_lote_ms=0, costo_imagen_ms=0), tamano_lote=4)
+        try:
+            imagenes = [bytes([i]) * 10 for i in range(10)]
+            resultados = [futuro.result(timeout=5) for futuro in [procesador.enviar(imagen) for imagen in imagenes]]
+        finally:
+            procesador.cerrar()
+        self.assertEqual(resultados, ReconocedorSimulado(0, 0).predecir_lote(imagenes))
+
+    def test_interfaz_abstracta(self):
+        with self.assertRaises(TypeError):
+            Reconocedor()
+
+
+class ConversionUnidadTests(TestCase):
+    """Editar una conversión recalcula los totales guardados de las comidas y de sus días"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.arroz = TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato',
+                                                indice_glucemico=Decimal('73'), calorias_por_100g=Decimal('130'))
+        cls.frijol = TipoAlimento.objects.create(nombre='Frijol', categoria='proteina',
+                                                 indice_glucemico=Decimal('30'), calorias_por_100g=Decimal('120'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversion = ConversionUnidad.objects.create(
+                tipo_alimento=self.arroz, unidad_medida='tazas', gramos_por_unidad=Decimal('200')
+            )
+            self.comida = Comida.objects.create(usuario=self.usuario, tipo_comida='almuerzo', fecha_hora=timezone.now())
+            DetalleComida.objects.create(comida=self.comida, tipo_alimento=self.arroz,
+                                         cantidad=Decimal('1'), unidad_medida='tazas')
+
+    def _totales(self):
+        self.comida.refresh_from_db()
+        resumen = ResumenNutricionDiario.objects.get(usuario=self.usuario, fecha=timezone.localdate(self.comida.fecha_hora))
+        return self.comida.gramos_totales, self.comida.calorias_totales, resumen.calorias_totales
+
+    def _editar(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(f'/conversiones-unidad/{self.conversion.pk}/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_cambio_de_gramos(self):
+        self.assertEqual(self._totales(), (Decimal('200.00'), Decimal('260.00'), Decimal('260.00')))
+        self._editar(gramos_por_unidad='180')
+        self.assertEqual(self._totales(), (Decimal('180.00'), Decimal('234.00'), Decimal('234.00')))
+
+    def test_cambio_de_unidad(self):
+        # Las tazas de arroz vuelven al factor general (250 g)
+        self._editar(unidad_medida='piezas')
+        self.assertEqual(self._totales(), (Decimal('250.00'), Decimal('325.00'), Decimal('325.00')))
+
+    def test_cambio_de_alimento(self):
+        self._editar(tipo_alimento=self.frijol.pk)
+        self.assertEqual(self._totales(), (Decimal('250.00'), Decimal('325.00'), Decimal('325.00')))
+
+    def test_borrado(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.delete(f'/conversiones-unidad/{self.conversion.pk}/')
+        self.assertEqual(respuesta.status_code, 204)
+        self.assertEqual(self._totales(), (Decimal('250.00'), Decimal('325.00'), Decimal('325.00')))
+
+
+class ResumenNutricionParametrosTests(TestCase):
+    """Las fechas con formato válido pero inexistentes se rechazan con 400"""
+
+    def test_fechas_invalidas(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('paciente', password='x'))
+        for parametros in ({'to': '2024-02-30'}, {'from': '2024-13-01', 'to': '2024-12-31'}, {'to': 'ayer'}):
+            with self.subTest(parametros=parametros):
+                respuesta = client.get('/resumenes-nutricion/', parametros)
+                self.assertEqual(respuesta.status_code, 400)
+        respuesta = client.get('/resumenes-nutricion/', {'from': '2024-02-28', 'to': '2024-02-29'})
+        self.assertEqual([fila['fecha'] for fila in respuesta.data], ['2024-02-28', '2024-02-29'])
+
+
+class CambiosAlimentoTests(TestCase):
+    """Cambiar los valores nutricionales de un alimento recalcula las comidas y los días que lo usan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arroz = TipoAlimento.objects.create(
+                nombre='Arroz', categoria='carbohidrato', indice_glucemico=Decimal('73'),
+                calorias_por_100g=Decimal('130'), carbohidratos_por_100g=Decimal('28'), fibra_por_100g=Decimal('0.4'),
+            )
+            self.comida = Comida.objects.create(usuario=self.usuario, tipo_comida='almuerzo', fecha_hora=timezone.now())
+            DetalleComida.objects.create(comida=self.comida, tipo_alimento=self.arroz,
+                                         cantidad=Decimal('200'), unidad_medida='gramos')
+
+    def _resumen(self):
+        return ResumenNutricionDiario.objects.get(usuario=self.usuario, fecha=timezone.localdate(self.comida.fecha_hora))
+
+    def _editar(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(f'/tipos-alimentos/{self.arroz.pk}/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.comida.refresh_from_db()
+
+    def test_calorias_e_indice(self):
+        self._editar(calorias_por_100g='150', indice_glucemico='60')
+        self.assertEqual(self.comida.calorias_totales, Decimal('300.00'))
+        self.assertEqual(self.comida.indice_glucemico_promedio, Decimal('60.00'))
+        self.assertEqual(self._resumen().calorias_totales, Decimal('300.00'))
+        # 200 g × (28 - 0.4) / 100 × 60 / 100
+        self.assertEqual(self._resumen().carga_glucemica, Decimal('33.12'))
+
+    def test_carbohidratos_y_categoria(self):
+        self.assertEqual(self._resumen().carga_glucemica, Decimal('40.30'))
+        self._editar(carbohidratos_por_100g='25', fibra_por_100g='1', categoria='otro')
+        resumen = self._resumen()
+        self.assertEqual(resumen.carga_glucemica, Decimal('35.04'))
+        self.assertEqual(resumen.gramos_por_categoria['otro'], 200.0)
+        self.assertEqual(resumen.gramos_por_categoria['carbohidrato'], 0)
+
+    def test_cambio_sin_efecto_nutricional(self):
+        with mock.patch.object(ComidaUtils, 'invalidar_alimentos') as invalidar:
+            self._editar(nombre='Arroz blanco', calorias_por_100g='130.00')
+        invalidar.assert_not_called()
+
+    def test_importacion(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'alimentos.csv')
+            with open(archivo, 'w') as f:
+                f.write('nombre,categoria,calorias,indice_glucemico,carbohidratos,fibra\n')
+                f.write('Arroz,carbohidrato,120,73,28,0.4\n')
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('importar_alimentos', archivo, stdout=StringIO())
+        self.comida.refresh_from_db()
+        self.assertEqual(self.comida.calorias_totales, Decimal('240.00'))
+        self.assertEqual(self._resumen().calorias_totales, Decimal('240.00'))
+
+
+class SustitucionesTests(TestCase):
+    """Sustitutos de la misma categoría, con menor índice glucémico y ordenados por distancia"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        # La encuesta pertenece al modelo de usuario de accounts, enlazado por username
+        Paciente.objects.create(username='relleno')
+        paciente = Paciente.objects.create(username='paciente')
+        SurveyInicial.objects.create(usuario=paciente, objetivo_principal='control_glucosa')
+
+        aleatorio = random.Random(7)
+        TipoAlimento.objects.bulk_create([
+            TipoAlimento(
+                nombre=f'Alimento {i}', nombre_normalizado=f'alimento {i}',
+                categoria=aleatorio.choice(['carbohidrato', 'fruta', 'lacteo']),
+                activo=aleatorio.random() < 0.95,
+                indice_glucemico=aleatorio.randint(10, 95) if aleatorio.random() < 0.9 else None,
+                calorias_por_100g=aleatorio.randint(20, 600),
+                carbohidratos_por_100g=aleatorio.randint(0, 80) if aleatorio.random() < 0.8 else None,
+                proteinas_por_100g=aleatorio.randint(0, 30),
+                fibra_por_100g=aleatorio.randint(0, 10) if aleatorio.random() < 0.6 else None,
+            )
+            for i in range(400)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        CatalogoUtils._snapshot = None
+        SustitucionUtils._indice = None
+
+    def tearDown(self):
+        CatalogoUtils._snapshot = None
+        SustitucionUtils._indice = None
+
+    def test_propiedades_y_orden(self):
+        alimentos = {a.pk: a for a in TipoAlimento.objects.all()}
+        indice = SustitucionUtils.get_indice()
+        con_sustitutos = 0
+        for alimento in alimentos.values():
+            sugerencias = indice.sugerir(alimento.pk, SustitucionUtils.K_MAXIMO)
+            if not alimento.activo or alimento.indice_glucemico is None:
+                self.assertEqual(sugerencias, [])
+                continue
+            con_sustitutos += bool(sugerencias)
+            distancias = [distancia for _, distancia in sugerencias]
+            self.assertEqual(distancias, sorted(distancias))
+            for sustituto_id, _ in sugerencias:
+                sustituto = alimentos[sustituto_id]
+                self.assertEqual(sustituto.categoria, alimento.categoria)
+                self.assertTrue(sustituto.activo)
+                self.assertLessEqual(sustituto.indice_glucemico,
+                                     alimento.indice_glucemico - IndiceSustituciones.DIFERENCIA_MINIMA)
+        self.assertGreater(con_sustitutos, 100)
+
+    def test_endpoint(self):
+        alimento = TipoAlimento.objects.filter(activo=True, indice_glucemico__gte=80).first()
+        respuesta = self.client.get(f'/tipos-alimentos/{alimento.pk}/sustituciones/', {'k': 5})
+        self.assertEqual(respuesta.status_code, 200)
+        sustituciones = respuesta.data['sustituciones']
+        self.assertEqual(len(sustituciones), 5)
+        self.assertEqual([s['distancia'] for s in sustituciones], sorted(s['distancia'] for s in sustituciones))
+        for sustitucion in sustituciones:
+            self.assertEqual(sustitucion['categoria'], alimento.categoria)
+            self.assertGreaterEqual(sustitucion['reduccion_indice_glucemico'], IndiceSustituciones.DIFERENCIA_MINIMA)
+
+        otro = APIClient()
+        otro.force_authenticate(User.objects.create_user('otro', password='x'))
+        self.assertEqual(otro.get(f'/tipos-alimentos/{alimento.pk}/sustituciones/').status_code, 403)
+
+    def test_paciente_por_username_y_no_por_id(self):
+        paciente = Paciente.objects.get(username='paciente')
+        self.assertNotEqual(paciente.pk, self.usuario.pk)
+        self.assertTrue(SustitucionUtils.aplica(self.usuario))
+
+        # Un paciente sin encuesta cuyo id coincide con el de una cuenta con encuesta
+        sin_encuesta = User.objects.create(pk=500, username='sin_encuesta')
+        SurveyInicial.objects.create(usuario=Paciente.objects.create(pk=500, username='homonimo'),
+                                     objetivo_principal='control_glucosa')
+        self.assertFalse(SustitucionUtils.aplica(sin_encuesta))
+
+        otro_objetivo = User.objects.create_user('otro_objetivo', password='x')
+        SurveyInicial.objects.create(usuario=Paciente.objects.create(username='otro_objetivo'),
+                                     objetivo_principal='peso')
+        self.assertFalse(SustitucionUtils.aplica(otro_objetivo))
+
+    def test_reconstruccion_fuera_de_la_solicitud(self):
+        anterior = SustitucionUtils.get_indice()
+        with mock.patch.object(SustitucionUtils, 'reconstruir_en_segundo_plano') as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                TipoAlimento.objects.create(nombre='Pan integral', categoria='carbohidrato', indice_glucemico=Decimal('51'))
+            reconstruir.assert_called_once()
+
+            # Mientras la reconstrucción no termina se sigue sirviendo el índice anterior
+            SustitucionUtils._verificado = 0.0
+            self.assertIs(SustitucionUtils.get_indice(), anterior)
+            self.assertEqual(reconstruir.call_count, 2)
+
+        nuevo = SustitucionUtils.construir()
+        self.assertIsNot(nuevo, anterior)
+        self.assertIs(SustitucionUtils.get_indice(), nuevo)
+        self.assertIn(TipoAlimento.objects.get(nombre='Pan integral').pk, nuevo.alimentos)
+
+
+class TotalesComidaTests(TestCase):
+    """Los totales guardados de cada comida y de su día siguen a cada escritura de detalles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.arroz = TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato',
+                                                indice_glucemico=Decimal('73'), calorias_por_100g=Decimal('130'))
+        cls.pollo = TipoAlimento.objects.create(nombre='Pollo', categoria='proteina',
+                                                indice_glucemico=None, calorias_por_100g=Decimal('165'))
+        cls.manzana = TipoAlimento.objects.create(nombre='Manzana', categoria='fruta',
+                                                  indice_glucemico=Decimal('36'), calorias_por_100g=Decimal('52'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.ayer = timezone.now().replace(hour=13, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comida = Comida.objects.create(usuario=self.usuario, tipo_comida='almuerzo', fecha_hora=self.ayer)
+            self.cena = Comida.objects.create(usuario=self.usuario, tipo_comida='cena',
+                                              fecha_hora=self.ayer + timedelta(hours=6))
+
+    def _escribir(self, metodo, url, datos=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = getattr(self.client, metodo)(url, datos, format='json')
+        self.assertIn(respuesta.status_code, (200, 201, 204), respuesta.data)
+        return respuesta.data
+
+    def _crear_detalle(self, comida, alimento, cantidad, unidad='gramos'):
+        return self._escribir('post', '/detalles-comida/', {
+            'comida': comida.pk, 'tipo_alimento': alimento.pk, 'cantidad': cantidad, 'unidad_medida': unidad,
+        })
+
+    def _verificar(self):
+        '''Totales de cada comida y resúmenes de cada día iguales a recalcularlos desde cero.'''
+        _, diferentes = ComidaUtils.recalcular(Comida.objects.all(), verificar=True)
+        self.assertEqual(diferentes, [])
+        guardados = sorted(ResumenNutricionDiario.objects.values_list(
+            'fecha', 'calorias_totales', 'gramos_totales', 'gramos_por_categoria', 'carga_glucemica'
+        ))
+        ResumenNutricionUtils.reconstruir(self.usuario.pk)
+        self.assertEqual(guardados, sorted(ResumenNutricionDiario.objects.values_list(
+            'fecha', 'calorias_totales', 'gramos_totales', 'gramos_por_categoria', 'carga_glucemica'
+        )))
+
+    def _totales(self, comida):
+        comida.refresh_from_db()
+        return comida.calorias_totales, comida.gramos_totales, comida.indice_glucemico_promedio
+
+    def test_crear_modificar_y_borrar_detalles(self):
+        arroz = self._crear_detalle(self.comida, self.arroz, '1', 'tazas')
+        pollo = self._crear_detalle(self.comida, self.pollo, '120')
+        self.assertEqual(self._totales(self.comida), (Decimal('523.00'), Decimal('370.00'), Decimal('73.00')))
+        self._verificar()
+
+        self._escribir('patch', f"/detalles-comida/{arroz['id']}/", {'cantidad': '200', 'unidad_medida': 'gramos'})
+        self.assertEqual(self._totales(self.comida), (Decimal('458.00'), Decimal('320.00'), Decimal('73.00')))
+        self._verificar()
+
+        self._escribir('delete', f"/detalles-comida/{pollo['id']}/")
+        self.assertEqual(self._totales(self.comida), (Decimal('260.00'), Decimal('200.00'), Decimal('73.00')))
+        self._verificar()
+
+        self._escribir('delete', f"/detalles-comida/{arroz['id']}/")
+        self.assertEqual(self._totales(self.comida), (Decimal('0.00'), Decimal('0.00'), None))
+        self._verificar()
+
+    def test_cambio_de_alimento_y_de_comida(self):
+        detalle = self._crear_detalle(self.comida, self.arroz, '100')
+        self._crear_detalle(self.cena, self.pollo, '100')
+
+        self._escribir('patch', f"/detalles-comida/{detalle['id']}/", {'tipo_alimento': self.manzana.pk})
+        self.assertEqual(self._totales(self.comida), (Decimal('52.00'), Decimal('100.00'), Decimal('36.00')))
+        self._verificar()
+
+        self._escribir('patch', f"/detalles-comida/{detalle['id']}/", {'comida': self.cena.pk})
+        self.assertEqual(self._totales(self.comida), (Decimal('0.00'), Decimal('0.00'), None))
+        self.assertEqual(self._totales(self.cena), (Decimal('217.00'), Decimal('200.00'), Decimal('36.00')))
+        self._verificar()
+
+    def test_cambio_de_fecha_de_la_comida(self):
+        self._crear_detalle(self.comida, self.arroz, '100')
+        self._crear_detalle(self.cena, self.pollo, '100')
+        hoy = timezone.localdate(self.ayer) + timedelta(days=1)
+
+        self._escribir('patch', f'/comidas/{self.comida.pk}/', {'fecha_hora': (self.ayer + timedelta(days=1)).isoformat()})
+        resumenes = dict(ResumenNutricionDiario.objects.values_list('fecha', 'calorias_totales'))
+        self.assertEqual(resumenes, {hoy - timedelta(days=1): Decimal('165.00'), hoy: Decimal('130.00')})
+        self._verificar()
+
+        self._escribir('delete', f'/comidas/{self.cena.pk}/')
+        self.assertEqual(dict(ResumenNutricionDiario.objects.values_list('fecha', 'calorias_totales')),
+                         {hoy: Decimal('130.00')})
+        self._verificar()
+
+    def test_comando_recalcular_totales(self):
+        self._crear_detalle(self.comida, self.arroz, '100')
+        self._crear_detalle(self.cena, self.pollo, '100')
+        Comida.objects.filter(pk=self.comida.pk).update(calorias_totales=Decimal('1'), gramos_totales=Decimal('1'))
+
+        salida = StringIO()
+        call_command('recalcular_totales_comidas', verificar=True, stdout=salida)
+        self.assertIn(f'2 comidas, 1 con diferencias ({self.comida.pk})', salida.getvalue())
+        self.assertEqual(self._totales(self.comida)[0], Decimal('1.00'))
+
+        salida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recalcular_totales_comidas', usuario=[self.usuario.pk], stdout=salida)
+        self.assertIn('Comidas revisadas: 2, corregidas: 1', salida.getvalue())
+        self.assertEqual(self._totales(self.comida), (Decimal('130.00'), Decimal('100.00'), Decimal('73.00')))
+        self._verificar()
+
+
+class CatalogoAlimentosTests(TestCase):
+    """El listado y el catálogo compacto responden 304 a la versión vigente y cambian de ETag con cada escritura"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('paciente', password='x')
+        cls.arroz = TipoAlimento.objects.create(nombre='Arroz', categoria='carbohidrato',
+                                                indice_glucemico=Decimal('73'), calorias_por_100g=Decimal('130'))
+        cls.pollo = TipoAlimento.objects.create(nombre='Pollo', categoria='proteina', calorias_por_100g=Decimal('165'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        CatalogoUtils._snapshot = None
+        cache.clear()
+
+    def tearDown(self):
+        # Las escrituras confirmadas publican versiones en la caché compartida
+        CatalogoUtils._snapshot = None
+        cache.clear()
+
+    def _escribir(self, funcion):
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion()
+
+    def test_listado_condicional(self):
+        respuesta = self.client.get('/tipos-alimentos/')
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta['ETag']
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+
+        with self.assertNumQueries(0):
+            respuesta = self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+        self.assertEqual(self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH=f'"otro", {etag}').status_code, 304)
+        self.assertEqual(self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+        # Otros parámetros son otra representación con su propio ETag
+        pagina = self.client.get('/tipos-alimentos/', {'page': 1})
+        self.assertNotEqual(pagina['ETag'], etag)
+        self.assertEqual(self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH=pagina['ETag']).status_code, 200)
+
+    def test_etag_cambia_con_cada_escritura(self):
+        etags = [self.client.get('/tipos-alimentos/')['ETag']]
+
+        self._escribir(lambda: TipoAlimento.objects.filter(pk=self.arroz.pk).first().save())
+        etags.append(self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH=etags[-1])['ETag'])
+
+        self._escribir(lambda: self.pollo.delete())
+        respuesta = self.client.get('/tipos-alimentos/', HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Pollo', [fila['nombre'] for fila in respuesta.data['results']])
+        etags.append(respuesta['ETag'])
+
+        self.assertEqual(len(set(etags)), 3)
+        catalogo = self.client.get('/tipos-alimentos/catalogo/', HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(catalogo.status_code, 200)
+
+    def test_catalogo_compacto(self):
+        respuesta = self.client.get('/tipos-alimentos/catalogo/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/json')
+        datos = json.loads(respuesta.content)
+        self.assertEqual(datos['campos'], CatalogoUtils.CAMPOS_COMPACTOS)
+        self.assertEqual(respuesta['ETag'], f'"{datos["version"]}-completo"')
+        alimentos = {fila[0]: dict(zip(datos['campos'], fila)) for fila in datos['alimentos']}
+        self.assertEqual(alimentos[self.arroz.pk], {
+            'id': self.arroz.pk, 'nombre': 'Arroz', 'categoria': 'carbohidrato',
+            'indice_glucemico': '73.00', 'calorias_por_100g': '130.00', 'activo': True,
+        })
+        self.assertIsNone(alimentos[self.pollo.pk]['indice_glucemico'])
+
+        self.assertEqual(self.client.get('/tipos-alimentos/catalogo/', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+        self._escribir(lambda: TipoAlimento.objects.create(nombre='Pan', categoria='carbohidrato'))
+        nueva = self.client.get('/tipos-alimentos/catalogo/', HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertNotEqual(json.loads(nueva.content)['version'], datos['version'])
+        self.assertEqual(len(json.loads(nueva.content)['alimentos']), 3)
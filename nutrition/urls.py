@@ -1,9 +1,11 @@
 from rest_framework.routers import DefaultRouter
-from .views import TipoAlimentoViewSet, ComidaViewSet, DetalleComidaViewSet
+from .views import TipoAlimentoViewSet, ConversionUnidadViewSet, ComidaViewSet, DetalleComidaViewSet, ResumenNutricionViewSet
 
 router = DefaultRouter()
 router.register(r'tipos-alimentos', TipoAlimentoViewSet)
-router.register(r'comidas', ComidaViewSet)
-router.register(r'detalles-comida', DetalleComidaViewSet)
+router.register(r'conversiones-unidad', ConversionUnidadViewSet, basename='conversiones-unidad')
+router.register(r'comidas', ComidaViewSet, basename='comidas')
+router.register(r'detalles-comida', DetalleComidaViewSet, basename='detalles-comida')
+router.register(r'resumenes-nutricion', ResumenNutricionViewSet, basename='resumenes-nutricion')
 
 urlpatterns = router.urls
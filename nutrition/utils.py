@@ -1,3 +1,21 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import MappingProxyType
+import numpy as np
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Func, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Length, NullIf, Round, TruncDate
+from django.utils import timezone
+from accounts.models import SurveyInicial
+from .models import FACTORES_GRAMOS, TipoAlimento, Comida, DetalleComida, ConversionUnidad, ResumenNutricionDiario
+
 clasificacion_nutricional = {
     'fibras': [
         "beet_salad", "bruschetta", "caesar_salad", "caprese_salad", "edamame",
@@ -37,52 +55,1127 @@ clasificacion_nutricional = {
 }
 
 
+def _compilar_indice_nutricional(clasificacion):
+    '''
+    Compilar la clasificación en un índice invertido alimento -> máscara de bits.
+    El bit i corresponde a la i-ésima categoría en el orden del diccionario.
+    '''
+    categorias = tuple(clasificacion)
+    bits = {categoria: 1 << i for i, categoria in enumerate(categorias)}
+    indice = {}
+    for categoria, lista in clasificacion.items():
+        for alimento in lista:
+            indice[alimento] = indice.get(alimento, 0) | bits[categoria]
+
+    # Decodificación precalculada de cada máscara posible (categorías en el orden original)
+    categorias_por_mascara = tuple(
+        tuple(categoria for categoria in categorias if mascara & bits[categoria])
+        for mascara in range(1 << len(categorias))
+    )
+    alimentos_por_mascara = {}
+    for alimento, mascara in indice.items():
+        alimentos_por_mascara.setdefault(mascara, []).append(alimento)
+    return (
+        categorias,
+        MappingProxyType(bits),
+        MappingProxyType(indice),
+        categorias_por_mascara,
+        MappingProxyType({mascara: tuple(alimentos) for mascara, alimentos in alimentos_por_mascara.items()}),
+    )
+
+
+(
+    CATEGORIAS_NUTRICIONALES,
+    BITS_CATEGORIA,
+    INDICE_NUTRICIONAL,
+    _CATEGORIAS_POR_MASCARA,
+    _ALIMENTOS_POR_MASCARA,
+) = _compilar_indice_nutricional(clasificacion_nutricional)
+
+_ESTADISTICAS = {
+    'total_por_categoria': {
+        categoria: len(lista)
+        for categoria, lista in clasificacion_nutricional.items()
+    },
+    'alimentos_unicos': len(INDICE_NUTRICIONAL),
+    'alimentos_multiples': sum(1 for mascara in INDICE_NUTRICIONAL.values() if mascara & (mascara - 1)),
+    'total_entradas': sum(len(lista) for lista in clasificacion_nutricional.values())
+}
+
+
 class NutricionUtils:
+    '''
+    Consultas sobre clasificacion_nutricional a través de INDICE_NUTRICIONAL,
+    compilado una sola vez al importar el módulo: cada búsqueda es un acceso
+    a diccionario y un filtro por combinación exacta de categorías es una
+    búsqueda por máscara.
+    '''
+
+    @staticmethod
+    def mascara(*categorias):
+        '''Máscara de bits de un conjunto de categorías (None si alguna no existe).'''
+        mascara = 0
+        for categoria in categorias:
+            if categoria not in BITS_CATEGORIA:
+                return None
+            mascara |= BITS_CATEGORIA[categoria]
+        return mascara
 
     @staticmethod
     def buscar_alimento_por_categoria(alimento):
-        return [
-            categoria for categoria, lista in clasificacion_nutricional.items()
-            if alimento in lista
-        ]
+        return list(_CATEGORIAS_POR_MASCARA[INDICE_NUTRICIONAL.get(alimento, 0)])
+
+    @staticmethod
+    def clasificar_lote(alimentos):
+        '''Categorías de muchas etiquetas de alimento a la vez (mismo orden que la entrada).'''
+        indice = INDICE_NUTRICIONAL
+        decodificar = _CATEGORIAS_POR_MASCARA
+        return [list(decodificar[indice.get(alimento, 0)]) for alimento in alimentos]
+
+    @staticmethod
+    def mascaras_lote(alimentos):
+        '''Máscaras de bits de muchas etiquetas (0 si la etiqueta no está clasificada).'''
+        indice = INDICE_NUTRICIONAL
+        return [indice.get(alimento, 0) for alimento in alimentos]
 
     @staticmethod
     def encontrar_alimentos_multiples():
-        alimentos = set(
-            item for lista in clasificacion_nutricional.values() for item in lista
-        )
-        resultado = {}
-        for alimento in alimentos:
-            categorias = NutricionUtils.buscar_alimento_por_categoria(alimento)
-            if len(categorias) > 1:
-                resultado[alimento] = categorias
-        return resultado
+        return {
+            alimento: list(_CATEGORIAS_POR_MASCARA[mascara])
+            for alimento, mascara in INDICE_NUTRICIONAL.items()
+            if mascara & (mascara - 1)
+        }
 
     @staticmethod
     def obtener_estadisticas():
-        alimentos_unicos = set(
-            item for lista in clasificacion_nutricional.values() for item in lista
+        return {**_ESTADISTICAS, 'total_por_categoria': dict(_ESTADISTICAS['total_por_categoria'])}
+
+    @staticmethod
+    def filtrar_por_categoria(*categorias_deseadas):
+        '''Alimentos cuyas categorías son exactamente las indicadas.'''
+        mascara = NutricionUtils.mascara(*categorias_deseadas)
+        return list(_ALIMENTOS_POR_MASCARA.get(mascara, ()))
+
+    @staticmethod
+    def filtrar_por_categorias_lote(combinaciones):
+        '''
+        filtrar_por_categoria para varias combinaciones a la vez.
+
+        Args:
+            combinaciones: Iterable de tuplas de categorías
+
+        Returns:
+            list: Listas de alimentos, una por combinación
+        '''
+        return [NutricionUtils.filtrar_por_categoria(*combinacion) for combinacion in combinaciones]
+
+
+class ReconocimientoUtils:
+    '''
+    Conversión de predicciones del reconocedor de fotos (etiquetas Food-101)
+    en borradores de DetalleComida que el cliente confirma y envía como
+    detalles anidados de la comida.
+    '''
+
+    MAX_IMAGENES = 10
+    TIEMPO_ESPERA = 10  # segundos por solicitud
+
+    @staticmethod
+    def borradores_detalle(predicciones):
+        '''
+        Args:
+            predicciones: Lista de tuplas (etiqueta, confianza), una por imagen
+
+        Returns:
+            list: Un borrador por etiqueta (las fotos repetidas suman cantidad)
+        '''
+        etiquetas = list(dict.fromkeys(etiqueta for etiqueta, _ in predicciones))
+        grupos = dict(zip(etiquetas, NutricionUtils.clasificar_lote(etiquetas)))
+        normalizadas = {etiqueta: TipoAlimento.normalizar_nombre(etiqueta) for etiqueta in etiquetas}
+        alimentos = {
+            alimento.nombre_normalizado: alimento
+            for alimento in TipoAlimento.objects.filter(
+                activo=True, nombre_normalizado__in=set(normalizadas.values())
+            )
+        }
+
+        borradores = {}
+        for etiqueta, confianza in predicciones:
+            if etiqueta in borradores:
+                borrador = borradores[etiqueta]
+                borrador['cantidad'] += 1
+                borrador['confianza'] = max(borrador['confianza'], confianza)
+                continue
+            alimento = alimentos.get(normalizadas[etiqueta])
+            borradores[etiqueta] = {
+                'etiqueta': etiqueta,
+                'confianza': confianza,
+                'grupos_nutricionales': grupos[etiqueta],
+                'tipo_alimento': alimento.pk if alimento else None,
+                'tipo_alimento_nombre': alimento.nombre if alimento else None,
+                'cantidad': 1,
+                'unidad_medida': DetalleComida.UnidadMedidaChoices.PIEZAS,
+            }
+        return list(borradores.values())
+
+
+class ConversionUtils:
+    '''
+    Conversión de cantidades a gramos por alimento y unidad.
+    La tabla ConversionUnidad se carga una vez por proceso y se revalida con
+    una versión en el cache compartido (como RangoUtils); las mismas reglas
+    están disponibles como expresión SQL para agregar en la base de datos.
+    '''
+
+    CLAVE_VERSION = 'conversiones_unidad_version'
+    INTERVALO_VERIFICACION = 1.0  # segundos
+
+    _tabla = None
+    _version = None
+    _verificado = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_tabla():
+        '''Diccionario {(tipo_alimento_id, unidad_medida): gramos por unidad} vigente.'''
+        ahora = time.monotonic()
+        if ConversionUtils._tabla is not None and ahora - ConversionUtils._verificado < ConversionUtils.INTERVALO_VERIFICACION:
+            return ConversionUtils._tabla
+
+        with ConversionUtils._lock:
+            version = cache.get(ConversionUtils.CLAVE_VERSION)
+            if version is None:
+                cache.add(ConversionUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+                version = cache.get(ConversionUtils.CLAVE_VERSION)
+            if ConversionUtils._tabla is None or version != ConversionUtils._version:
+                ConversionUtils._tabla = {
+                    (tipo_alimento_id, unidad): float(gramos)
+                    for tipo_alimento_id, unidad, gramos in ConversionUnidad.objects.values_list(
+                        'tipo_alimento_id', 'unidad_medida', 'gramos_por_unidad'
+                    )
+                }
+                ConversionUtils._version = version
+            ConversionUtils._verificado = ahora
+            return ConversionUtils._tabla
+
+    @staticmethod
+    def factor(tipo_alimento_id, unidad_medida):
+        '''Gramos por unidad: conversión del alimento o factor general de la unidad.'''
+        factor = ConversionUtils.get_tabla().get((tipo_alimento_id, unidad_medida))
+        return factor if factor is not None else FACTORES_GRAMOS.get(unidad_medida, 1)
+
+    @staticmethod
+    def expresion_gramos(prefijo=''):
+        '''
+        Expresión SQL equivalente a DetalleComida.cantidad_gramos.
+
+        Args:
+            prefijo: Ruta al detalle desde el modelo consultado (ej. 'detalles__')
+        '''
+        especifica = ConversionUnidad.objects.filter(
+            tipo_alimento=OuterRef(f'{prefijo}tipo_alimento'),
+            unidad_medida=OuterRef(f'{prefijo}unidad_medida'),
+        ).values('gramos_por_unidad')[:1]
+        general = Case(
+            *[When(**{f'{prefijo}unidad_medida': unidad}, then=Value(float(factor)))
+              for unidad, factor in FACTORES_GRAMOS.items()],
+            default=Value(1.0),
+            output_field=FloatField()
+        )
+        return Cast(f'{prefijo}cantidad', FloatField()) * Coalesce(
+            Cast(Subquery(especifica), FloatField()), general
         )
-        multiples = NutricionUtils.encontrar_alimentos_multiples()
 
+    @staticmethod
+    def invalidar(*claves):
+        '''
+        Al confirmar la transacción: publicar una nueva versión de la tabla y
+        recalcular los totales de las comidas que usan esos alimentos en esas unidades.
+
+        Args:
+            claves: Pares (tipo_alimento_id, unidad_medida) afectados
+        '''
+        filtro = Q()
+        for tipo_alimento_id, unidad_medida in set(claves):
+            filtro |= Q(detalles__tipo_alimento_id=tipo_alimento_id, detalles__unidad_medida=unidad_medida)
+
+        def publicar():
+            cache.set(ConversionUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+            ConversionUtils._tabla = None
+            _, corregidas = ComidaUtils.recalcular(Comida.objects.filter(filtro).distinct())
+            ResumenNutricionUtils.recalcular_comidas(corregidas)
+        transaction.on_commit(publicar)
+
+
+class ComidaUtils:
+    '''
+    Totales desnormalizados de comidas.
+    Cada escritura de DetalleComida suma o resta su aporte a los totales de
+    la comida con un UPDATE atómico (F expressions); los listados leen las
+    columnas directamente. recalcular() reconstruye los totales en bloque
+    sumando el mismo aporte por detalle.
+    '''
+
+    TAMANO_BLOQUE = 1000
+    TOLERANCIA = Decimal('0.01')
+    # Campos de TipoAlimento de los que dependen los totales de comidas y los resúmenes diarios
+    CAMPOS_ALIMENTO = (
+        'categoria', 'indice_glucemico', 'calorias_por_100g', 'carbohidratos_por_100g', 'fibra_por_100g',
+    )
+
+    @staticmethod
+    def con_relaciones(queryset):
+        '''
+        Precargar usuario, detalles y alimentos y anotar la carga glucémica
+        para serializar sin consultas por fila.
+        '''
+        return ComidaUtils.con_carga_glucemica(queryset).select_related('usuario').prefetch_related(
+            Prefetch('detalles', queryset=DetalleComida.objects.select_related('tipo_alimento'))
+        )
+
+    @staticmethod
+    def expresion_carga_glucemica(prefijo=''):
+        '''
+        Carga glucémica de un detalle como expresión SQL: índice glucémico ×
+        gramos de carbohidratos disponibles (carbohidratos - fibra) / 100.
+        Es nula si al alimento le falta el índice o los carbohidratos.
+
+        Args:
+            prefijo: Ruta al detalle desde el modelo consultado (ej. 'detalles__')
+        '''
+        alimento = f'{prefijo}tipo_alimento__'
+        disponibles = Greatest(
+            Cast(f'{alimento}carbohidratos_por_100g', FloatField())
+            - Coalesce(Cast(f'{alimento}fibra_por_100g', FloatField()), Value(0.0)),
+            Value(0.0)
+        )
+        return (
+            ConversionUtils.expresion_gramos(prefijo) * disponibles / 100
+            * Cast(f'{alimento}indice_glucemico', FloatField()) / 100
+        )
+
+    @staticmethod
+    def con_carga_glucemica(queryset):
+        '''Anotar carga_glucemica en un QuerySet de Comida con una subconsulta agregada por comida.'''
+        carga = DetalleComida.objects.filter(comida=OuterRef('pk')).order_by().values('comida').annotate(
+            total=Sum(ComidaUtils.expresion_carga_glucemica())
+        ).values('total')
+        return queryset.annotate(carga_glucemica=Round(
+            Coalesce(Subquery(carga, output_field=FloatField()), Value(0.0)), 2
+        ))
+
+    @staticmethod
+    def aporte_detalle(detalle):
+        '''
+        Aporte de un detalle a los totales de su comida.
+
+        Returns:
+            tuple: (calorías, gramos, gramos con índice glucémico, suma gramos × índice)
+        '''
+        gramos = Decimal(str(round(detalle.cantidad_gramos, 2)))
+        calorias = Decimal(str(detalle.calcular_calorias()))
+        indice = detalle.tipo_alimento.indice_glucemico
+        if not indice:
+            return calorias, gramos, Decimal(0), Decimal(0)
+        return calorias, gramos, gramos, (gramos * indice).quantize(ComidaUtils.TOLERANCIA)
+
+    @staticmethod
+    def totales(detalles):
+        '''
+        Totales de una comida a partir de sus detalles (con tipo_alimento cargado).
+
+        Returns:
+            dict: Valores de los campos desnormalizados de Comida
+        '''
+        calorias, gramos, gramos_con_indice, suma_indice = (Decimal(0),) * 4
+        for detalle in detalles:
+            aporte = ComidaUtils.aporte_detalle(detalle)
+            calorias += aporte[0]
+            gramos += aporte[1]
+            gramos_con_indice += aporte[2]
+            suma_indice += aporte[3]
         return {
-            'total_por_categoria': {
-                categoria: len(lista)
-                for categoria, lista in clasificacion_nutricional.items()
-            },
-            'alimentos_unicos': len(alimentos_unicos),
-            'alimentos_multiples': len(multiples),
-            'total_entradas': sum(len(lista) for lista in clasificacion_nutricional.values())
+            'calorias_totales': calorias,
+            'gramos_totales': gramos,
+            'gramos_con_indice': gramos_con_indice,
+            'suma_indice_ponderada': suma_indice,
+            'indice_glucemico_promedio': (
+                (suma_indice / gramos_con_indice).quantize(ComidaUtils.TOLERANCIA)
+                if gramos_con_indice > 0 else None
+            ),
         }
 
     @staticmethod
-    def filtrar_por_categoria(*categorias_deseadas):
-        alimentos = set(
-            item for lista in clasificacion_nutricional.values() for item in lista
+    def aplicar(comida_id, calorias, gramos, gramos_con_indice, suma_indice):
+        '''Sumar un aporte (negativo para restar) a los totales de una comida en un solo UPDATE.'''
+        gramos_con_indice = Round(F('gramos_con_indice') + Value(gramos_con_indice), 2)
+        Comida.objects.filter(pk=comida_id).update(
+            calorias_totales=Round(Coalesce(F('calorias_totales'), Value(Decimal(0))) + Value(calorias), 2),
+            gramos_totales=Round(F('gramos_totales') + Value(gramos), 2),
+            gramos_con_indice=gramos_con_indice,
+            suma_indice_ponderada=Round(F('suma_indice_ponderada') + Value(suma_indice), 2),
+            indice_glucemico_promedio=Round(
+                Cast(F('suma_indice_ponderada') + Value(suma_indice), FloatField())
+                / NullIf(gramos_con_indice, Value(Decimal(0))),
+                2
+            ),
+        )
+
+    @staticmethod
+    def registrar_cambio(anterior, actual):
+        '''
+        Actualizar totales por la creación, modificación o borrado de un detalle
+        y marcar el día de la comida para su resumen nutricional.
+
+        Args:
+            anterior: Estado previo del detalle o None si es nuevo
+            actual: Estado nuevo del detalle o None si se borró
+        '''
+        deltas = {}
+        for detalle, signo in ((anterior, -1), (actual, 1)):
+            if detalle is None:
+                continue
+            aporte = ComidaUtils.aporte_detalle(detalle)
+            acumulado = deltas.setdefault(detalle.comida_id, [Decimal(0)] * 4)
+            for i, valor in enumerate(aporte):
+                acumulado[i] += signo * valor
+        for comida_id, delta in deltas.items():
+            if any(delta):
+                ComidaUtils.aplicar(comida_id, *delta)
+            ResumenNutricionUtils.marcar_comida(comida_id)
+
+    @staticmethod
+    def invalidar_alimentos(tipo_alimento_ids):
+        '''
+        Al confirmar la transacción: recalcular los totales de las comidas que
+        usan esos alimentos y los resúmenes de sus días (la carga glucémica y
+        los gramos por categoría cambian aunque los totales de la comida no).
+        '''
+        ids = list(tipo_alimento_ids)
+        if not ids:
+            return
+
+        def recalcular():
+            comidas = Comida.objects.filter(detalles__tipo_alimento_id__in=ids).distinct()
+            ComidaUtils.recalcular(comidas)
+            ResumenNutricionUtils.recalcular({
+                (usuario_id, timezone.localdate(fecha_hora))
+                for usuario_id, fecha_hora in comidas.values_list('usuario_id', 'fecha_hora')
+            })
+        transaction.on_commit(recalcular)
+
+    @staticmethod
+    def agregar(detalles, *agrupar_por):
+        '''
+        Calorías, gramos, índice glucémico ponderado y carga glucémica de muchos
+        detalles en una sola consulta, opcionalmente agrupados (ej. 'comida_id').
+
+        Args:
+            detalles: QuerySet de DetalleComida
+            agrupar_por: Campos de agrupación; sin ellos se devuelve un solo total
+
+        Returns:
+            dict | list: Totales (una fila por grupo si se agrupa)
+        '''
+        gramos = ConversionUtils.expresion_gramos()
+        con_indice = Q(tipo_alimento__indice_glucemico__gt=0)
+        agregados = {
+            'calorias_totales': Coalesce(
+                Sum(gramos * Cast('tipo_alimento__calorias_por_100g', FloatField()) / 100), Value(0.0)
+            ),
+            'gramos_totales': Coalesce(Sum(gramos), Value(0.0)),
+            'indice_glucemico_promedio': Round(
+                Sum(gramos * Cast('tipo_alimento__indice_glucemico', FloatField()), filter=con_indice)
+                / NullIf(Sum(gramos, filter=con_indice), Value(0.0)),
+                2
+            ),
+            'carga_glucemica': Coalesce(Sum(ComidaUtils.expresion_carga_glucemica()), Value(0.0)),
+        }
+        if not agrupar_por:
+            return detalles.aggregate(**agregados)
+        return list(detalles.order_by().values(*agrupar_por).annotate(**agregados).order_by(*agrupar_por))
+
+    @staticmethod
+    def recalcular(queryset, verificar=False):
+        '''
+        Recalcular en bloque los totales de las comidas indicadas.
+
+        Args:
+            queryset: Comidas a revisar
+            verificar: Si es True solo reporta diferencias, sin escribir
+
+        Returns:
+            tuple: (comidas revisadas, ids de comidas con diferencias)
+        '''
+        revisadas = 0
+        diferentes = []
+        campos = ['calorias_totales', 'gramos_totales', 'gramos_con_indice',
+                  'suma_indice_ponderada', 'indice_glucemico_promedio']
+        comidas = queryset.order_by('id').only('id', *campos).prefetch_related(
+            Prefetch('detalles', queryset=DetalleComida.objects.select_related('tipo_alimento'))
+        )
+        ultimo_id = 0
+
+        while True:
+            # Bloques por id (keyset): dos consultas por bloque y sin cursor abierto mientras se escribe
+            bloque = list(comidas.filter(pk__gt=ultimo_id)[:ComidaUtils.TAMANO_BLOQUE])
+            if not bloque:
+                break
+            ultimo_id = bloque[-1].pk
+            diferencias = ComidaUtils._comparar_bloque(bloque, campos)
+            revisadas += len(bloque)
+            diferentes.extend(comida.pk for comida in diferencias)
+            if diferencias and not verificar:
+                Comida.objects.bulk_update(diferencias, campos)
+
+        return revisadas, diferentes
+
+    @staticmethod
+    def _comparar_bloque(bloque, campos):
+        '''Comidas del bloque cuyos totales difieren de la suma de sus detalles (ya corregidas en memoria).'''
+        diferencias = []
+        for comida in bloque:
+            esperado = ComidaUtils.totales(comida.detalles.all())
+            actuales = {campo: getattr(comida, campo) for campo in campos}
+            # Las comidas creadas sin detalles fuera del serializer no tienen calorías; aplicar() las toma como 0
+            if actuales['calorias_totales'] is None:
+                actuales['calorias_totales'] = Decimal(0)
+            if all(
+                (actual is None) == (valor is None)
+                and (valor is None or abs(actual - valor) <= ComidaUtils.TOLERANCIA)
+                for actual, valor in ((actuales[campo], esperado[campo]) for campo in campos)
+            ):
+                continue
+
+            for campo, valor in esperado.items():
+                setattr(comida, campo, valor)
+            diferencias.append(comida)
+        return diferencias
+
+
+class ResumenNutricionUtils:
+    '''
+    Mantenimiento de los resúmenes nutricionales diarios.
+    Las escrituras de comidas y detalles marcan los días afectados y, al
+    confirmar la transacción, solo esos días se recalculan con consultas
+    agregadas por rango de fecha (sin recorrer el historial).
+    '''
+
+    MAX_DIAS = 366
+    TAMANO_BLOQUE = 1000
+    CAMPOS = [
+        'calorias_totales', 'gramos_totales', 'comidas_por_tipo', 'gramos_por_categoria',
+        'gramos_con_indice', 'suma_indice_ponderada', 'carga_glucemica', 'updated_at',
+    ]
+
+    _local = threading.local()
+
+    @staticmethod
+    def inicio_dia(fecha):
+        '''Inicio del día en la zona horaria actual.'''
+        return timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
+
+    @staticmethod
+    def vacio(usuario_id, fecha):
+        '''Resumen sin comidas para un día.'''
+        return ResumenNutricionDiario(
+            usuario_id=usuario_id,
+            fecha=fecha,
+            calorias_totales=Decimal(0),
+            gramos_totales=Decimal(0),
+            comidas_por_tipo={tipo: 0 for tipo in Comida.TipoComidaChoices.values},
+            gramos_por_categoria={categoria: 0 for categoria in TipoAlimento.CategoriaChoices.values},
+            gramos_con_indice=Decimal(0),
+            suma_indice_ponderada=Decimal(0),
+            carga_glucemica=Decimal(0),
         )
-        filtrados = []
-        for alimento in alimentos:
-            categorias = set(NutricionUtils.buscar_alimento_por_categoria(alimento))
-            if categorias == set(categorias_deseadas):
-                filtrados.append(alimento)
-        return filtrados
+
+    @staticmethod
+    def _filtro_dias(fechas, campo):
+        '''Unión de rangos [inicio, fin) por día: usa el índice sobre la fecha y hora.'''
+        filtro = Q()
+        for fecha in fechas:
+            filtro |= Q(**{
+                f'{campo}__gte': ResumenNutricionUtils.inicio_dia(fecha),
+                f'{campo}__lt': ResumenNutricionUtils.inicio_dia(fecha + timedelta(days=1)),
+            })
+        return filtro
+
+    @staticmethod
+    def _calcular(comidas, detalles):
+        '''
+        Agregar comidas y sus detalles por usuario y día.
+
+        Returns:
+            dict: {(usuario_id, fecha): ResumenNutricionDiario} sin guardar
+        '''
+        resumenes = {}
+        filas = comidas.annotate(fecha=TruncDate('fecha_hora')).order_by().values(
+            'usuario_id', 'fecha', 'tipo_comida'
+        ).annotate(
+            conteo=Count('id'),
+            calorias=Sum('calorias_totales'),
+            gramos=Sum('gramos_totales'),
+            gramos_con_indice=Sum('gramos_con_indice'),
+            suma_indice=Sum('suma_indice_ponderada'),
+        )
+        for fila in filas:
+            clave = (fila['usuario_id'], fila['fecha'])
+            resumen = resumenes.get(clave)
+            if resumen is None:
+                resumen = resumenes[clave] = ResumenNutricionUtils.vacio(*clave)
+            resumen.comidas_por_tipo[fila['tipo_comida']] = fila['conteo']
+            resumen.calorias_totales += fila['calorias'] or 0
+            resumen.gramos_totales += fila['gramos'] or 0
+            resumen.gramos_con_indice += fila['gramos_con_indice'] or 0
+            resumen.suma_indice_ponderada += fila['suma_indice'] or 0
+
+        cargas = {}
+        for fila in ComidaUtils.agregar(
+            detalles.annotate(fecha=TruncDate('comida__fecha_hora')),
+            'comida__usuario_id', 'fecha', 'tipo_alimento__categoria'
+        ):
+            clave = (fila['comida__usuario_id'], fila['fecha'])
+            resumen = resumenes.get(clave)
+            if resumen is not None:
+                resumen.gramos_por_categoria[fila['tipo_alimento__categoria']] = round(fila['gramos_totales'], 2)
+                cargas[clave] = cargas.get(clave, 0.0) + fila['carga_glucemica']
+        for clave, carga in cargas.items():
+            resumenes[clave].carga_glucemica = Decimal(str(round(carga, 2)))
+        return resumenes
+
+    @staticmethod
+    def _guardar(resumenes):
+        ResumenNutricionDiario.objects.bulk_create(
+            resumenes,
+            update_conflicts=True,
+            unique_fields=['usuario', 'fecha'],
+            update_fields=ResumenNutricionUtils.CAMPOS,
+            batch_size=ResumenNutricionUtils.TAMANO_BLOQUE,
+        )
+
+    @staticmethod
+    def recalcular(dias):
+        '''
+        Recalcular desde las comidas los resúmenes de los días dados.
+
+        Args:
+            dias: Iterable de (usuario_id, fecha)
+        '''
+        por_usuario = {}
+        for usuario_id, fecha in dias:
+            por_usuario.setdefault(usuario_id, set()).add(fecha)
+
+        with transaction.atomic():
+            for usuario_id, fechas in por_usuario.items():
+                resumenes = ResumenNutricionUtils._calcular(
+                    Comida.objects.filter(
+                        ResumenNutricionUtils._filtro_dias(fechas, 'fecha_hora'), usuario_id=usuario_id
+                    ),
+                    DetalleComida.objects.filter(
+                        ResumenNutricionUtils._filtro_dias(fechas, 'comida__fecha_hora'), comida__usuario_id=usuario_id
+                    ),
+                )
+                ResumenNutricionDiario.objects.filter(usuario_id=usuario_id, fecha__in=fechas).exclude(
+                    fecha__in=[fecha for _, fecha in resumenes]
+                ).delete()
+                ResumenNutricionUtils._guardar(resumenes.values())
+
+    @staticmethod
+    def recalcular_comidas(comida_ids):
+        '''Recalcular los días de las comidas dadas (ej. tras corregir sus totales).'''
+        if not comida_ids:
+            return
+        ResumenNutricionUtils.recalcular({
+            (usuario_id, timezone.localdate(fecha_hora))
+            for usuario_id, fecha_hora in Comida.objects.filter(pk__in=comida_ids).values_list('usuario_id', 'fecha_hora')
+        })
+
+    @staticmethod
+    def _pendientes():
+        pendientes = getattr(ResumenNutricionUtils._local, 'pendientes', None)
+        if pendientes is None:
+            pendientes = ResumenNutricionUtils._local.pendientes = (set(), set())
+        return pendientes
+
+    @staticmethod
+    def marcar(usuario_id, fecha_hora):
+        '''Marcar el día de una comida para recalcularlo al confirmar la transacción.'''
+        ResumenNutricionUtils._pendientes()[0].add((usuario_id, timezone.localdate(fecha_hora)))
+        transaction.on_commit(ResumenNutricionUtils.procesar_pendientes)
+
+    @staticmethod
+    def marcar_comida(comida_id):
+        '''Marcar el día de una comida conocida solo por su id (escrituras de detalles).'''
+        ResumenNutricionUtils._pendientes()[1].add(comida_id)
+        transaction.on_commit(ResumenNutricionUtils.procesar_pendientes)
+
+    @staticmethod
+    def procesar_pendientes():
+        '''Recalcular una sola vez todos los días marcados en la transacción.'''
+        dias, comida_ids = ResumenNutricionUtils._pendientes()
+        if not dias and not comida_ids:
+            return
+        ResumenNutricionUtils._local.pendientes = None
+        dias.update(
+            (usuario_id, timezone.localdate(fecha_hora))
+            for usuario_id, fecha_hora in Comida.objects.filter(pk__in=comida_ids).values_list('usuario_id', 'fecha_hora')
+        )
+        ResumenNutricionUtils.recalcular(dias)
+
+    @staticmethod
+    def reconstruir(usuario_id):
+        '''
+        Reconstruir desde cero los resúmenes de un usuario.
+
+        Returns:
+            int: Número de días con resumen
+        '''
+        with transaction.atomic():
+            ResumenNutricionDiario.objects.filter(usuario_id=usuario_id).delete()
+            resumenes = ResumenNutricionUtils._calcular(
+                Comida.objects.filter(usuario_id=usuario_id),
+                DetalleComida.objects.filter(comida__usuario_id=usuario_id),
+            )
+            ResumenNutricionDiario.objects.bulk_create(
+                resumenes.values(), batch_size=ResumenNutricionUtils.TAMANO_BLOQUE
+            )
+        return len(resumenes)
+
+    @staticmethod
+    def rango(usuario_id, desde, hasta):
+        '''
+        Un resumen por día entre desde y hasta (inclusive), con ceros en los
+        días sin comidas. Una sola lectura por rango sobre (usuario, fecha).
+        '''
+        guardados = {
+            resumen.fecha: resumen
+            for resumen in ResumenNutricionDiario.objects.filter(
+                usuario_id=usuario_id, fecha__gte=desde, fecha__lte=hasta
+            )
+        }
+        return [
+            guardados.get(fecha) or ResumenNutricionUtils.vacio(usuario_id, fecha)
+            for fecha in (desde + timedelta(days=i) for i in range((hasta - desde).days + 1))
+        ]
+
+
+class CatalogoUtils:
+    '''
+    Snapshot versionado y pre-serializado del catálogo de TipoAlimento.
+    Cada escritura publica una nueva versión en el cache compartido; cada
+    proceso conserva el snapshot en memoria y lo compara con esa versión
+    como máximo una vez por INTERVALO_VERIFICACION. El snapshot de cada
+    versión se guarda también en el cache compartido para que solo un
+    proceso lo construya.
+    '''
+
+    CLAVE_VERSION = 'catalogo_alimentos_version'
+    INTERVALO_VERIFICACION = 1.0  # segundos
+    CACHE_TTL = 60 * 60 * 24
+    CAMPOS_COMPACTOS = ['id', 'nombre', 'categoria', 'indice_glucemico', 'calorias_por_100g', 'activo']
+
+    _snapshot = None
+    _verificado = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _version_actual():
+        version = cache.get(CatalogoUtils.CLAVE_VERSION)
+        if version is None:
+            cache.add(CatalogoUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+            version = cache.get(CatalogoUtils.CLAVE_VERSION)
+        return version
+
+    @staticmethod
+    def construir(version):
+        '''
+        Serializar el catálogo completo una sola vez para la versión dada.
+
+        Returns:
+            dict: version, elementos (representación del serializer) y compacto (JSON en bytes)
+        '''
+        from .serializers import TipoAlimentoSerializer
+
+        elementos = json.loads(json.dumps(
+            TipoAlimentoSerializer(TipoAlimento.objects.all(), many=True).data, cls=DjangoJSONEncoder
+        ))
+        compacto = json.dumps({
+            'version': version,
+            'campos': CatalogoUtils.CAMPOS_COMPACTOS,
+            'alimentos': [[elemento[campo] for campo in CatalogoUtils.CAMPOS_COMPACTOS] for elemento in elementos],
+        }, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return {'version': version, 'elementos': elementos, 'compacto': compacto}
+
+    @staticmethod
+    def get_snapshot():
+        '''Snapshot vigente: memoria del proceso, luego cache compartido, luego base de datos.'''
+        ahora = time.monotonic()
+        snapshot = CatalogoUtils._snapshot
+        if snapshot is not None and ahora - CatalogoUtils._verificado < CatalogoUtils.INTERVALO_VERIFICACION:
+            return snapshot
+
+        with CatalogoUtils._lock:
+            version = CatalogoUtils._version_actual()
+            snapshot = CatalogoUtils._snapshot
+            if snapshot is None or snapshot['version'] != version:
+                clave = f'catalogo_alimentos_{version}'
+                snapshot = cache.get(clave)
+                if snapshot is None:
+                    snapshot = CatalogoUtils.construir(version)
+                    cache.set(clave, snapshot, CatalogoUtils.CACHE_TTL)
+                CatalogoUtils._snapshot = snapshot
+            CatalogoUtils._verificado = ahora
+            return snapshot
+
+    @staticmethod
+    def etag(snapshot, variante=''):
+        '''ETag de una representación del snapshot (variante: parámetros que cambian la respuesta).'''
+        sufijo = hashlib.md5(variante.encode('utf-8')).hexdigest()[:8] if variante else 'completo'
+        return f'"{snapshot["version"]}-{sufijo}"'
+
+    @staticmethod
+    def invalidar():
+        '''Publicar una nueva versión al confirmar la transacción.'''
+        def publicar():
+            cache.set(CatalogoUtils.CLAVE_VERSION, uuid.uuid4().hex, None)
+            CatalogoUtils._snapshot = None
+        transaction.on_commit(publicar)
+
+
+class BusquedaAlimentosUtils:
+    '''
+    Búsqueda y autocompletado de alimentos activos, insensible a acentos.
+    Cada término es un prefijo de palabra del nombre o de la categoría.
+
+    Ranking en dos niveles: primero los nombres que empiezan con la consulta
+    completa (orden alfabético, recorrido del índice B-tree de
+    nombre_normalizado); después el resto de coincidencias, las del nombre
+    antes que las de la categoría y luego por relevancia. En SQLite el
+    segundo nivel usa el índice FTS5 tipos_alimentos_fts ordenado por bm25
+    (el nombre pesa más que la categoría); en PostgreSQL usa
+    nombre_normalizado con el índice de trigramas y word_similarity. En
+    ambos casos los filtros (activo, categoría) y el orden se aplican a
+    todas las coincidencias antes del límite.
+    '''
+
+    LIMITE_POR_DEFECTO = 10
+    LIMITE_MAXIMO = 50
+    PESOS_BM25 = (10.0, 1.0)  # nombre_normalizado, categoria
+
+    @staticmethod
+    def buscar(consulta, limite=LIMITE_POR_DEFECTO, categoria=None):
+        '''
+        Alimentos que coinciden con la consulta, mejor ranking primero.
+
+        Returns:
+            list: Instancias de TipoAlimento (como máximo `limite`)
+        '''
+        consulta = TipoAlimento.normalizar_nombre(consulta)
+        if not consulta:
+            return []
+        if connection.vendor != 'sqlite':
+            return list(BusquedaAlimentosUtils._buscar_orm(consulta, limite, categoria))
+
+        activos = TipoAlimento.objects.filter(activo=True)
+        if categoria:
+            activos = activos.filter(categoria=categoria)
+        ids = list(
+            activos.filter(nombre_normalizado__gte=consulta, nombre_normalizado__lt=consulta + '\uffff')
+            .order_by('nombre_normalizado').values_list('id', flat=True)[:limite]
+        )
+        if len(ids) < limite:
+            ids += BusquedaAlimentosUtils._buscar_fts(consulta, limite - len(ids), categoria, excluir=ids)
+        alimentos = TipoAlimento.objects.in_bulk(ids)
+        return [alimentos[pk] for pk in ids if pk in alimentos]
+
+    @staticmethod
+    def _buscar_fts(consulta, limite, categoria, excluir):
+        # Los términos normalizados solo contienen [0-9a-z]: seguros como cadenas FTS
+        terminos = consulta.split()
+        filtros = []
+        parametros_filtros = []
+        if categoria:
+            filtros.append('AND t.categoria = %s')
+            parametros_filtros.append(categoria)
+        if excluir:
+            filtros.append(f"AND t.id NOT IN ({', '.join(['%s'] * len(excluir))})")
+            parametros_filtros.extend(excluir)
+
+        # Filtros y ranking sobre todas las coincidencias: el LIMIT se aplica al final
+        sql = f'''
+            SELECT t.id FROM tipos_alimentos_fts
+            JOIN tipos_alimentos t ON t.id = tipos_alimentos_fts.rowid
+            WHERE tipos_alimentos_fts MATCH %s AND t.activo {' '.join(filtros)}
+            ORDER BY instr(' ' || t.nombre_normalizado, %s) = 0,
+                     bm25(tipos_alimentos_fts, %s, %s),
+                     length(t.nombre_normalizado), t.id
+            LIMIT %s
+        '''
+        parametros = [
+            ' '.join(f'"{termino}"*' for termino in terminos),
+            *parametros_filtros,
+            ' ' + terminos[0],
+            *BusquedaAlimentosUtils.PESOS_BM25,
+            limite,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            return [fila[0] for fila in cursor.fetchall()]
+
+    @staticmethod
+    def _buscar_orm(consulta, limite, categoria):
+        queryset = TipoAlimento.objects.filter(activo=True)
+        if categoria:
+            queryset = queryset.filter(categoria=categoria)
+        for termino in consulta.split():
+            queryset = queryset.filter(
+                Q(nombre_normalizado__startswith=termino)
+                | Q(nombre_normalizado__contains=f' {termino}')
+                | Q(categoria__startswith=termino)
+            )
+        primer_termino = consulta.split()[0]
+        queryset = queryset.annotate(
+            prioridad=Case(
+                When(nombre_normalizado__startswith=consulta, then=Value(0)),
+                When(
+                    Q(nombre_normalizado__startswith=primer_termino)
+                    | Q(nombre_normalizado__contains=f' {primer_termino}'),
+                    then=Value(1)
+                ),
+                default=Value(2),
+                output_field=IntegerField()
+            ),
+            longitud=Case(
+                When(prioridad=0, then=Value(0)),
+                default=Length('nombre_normalizado'),
+                output_field=IntegerField()
+            ),
+        )
+        orden = ['prioridad', 'longitud', 'nombre_normalizado', 'id']
+        if connection.vendor == 'postgresql':
+            # Similitud de pg_trgm entre la consulta y la palabra más parecida del nombre
+            queryset = queryset.annotate(relevancia=Func(
+                Value(consulta), 'nombre_normalizado', function='word_similarity', output_field=FloatField()
+            ))
+            orden.insert(1, '-relevancia')
+        return queryset.order_by(*orden)[:limite]
+
+
+class IndiceSustituciones:
+    '''
+    Vecinos más cercanos por categoría con menor índice glucémico.
+    Cada alimento activo con índice glucémico se describe con sus CAMPOS
+    estandarizados dentro de su categoría (un dato faltante toma la media de
+    la categoría) y ponderados por PESOS. Al construir el índice se
+    precalculan, por bloques de numpy, los K_MAXIMO alimentos más cercanos de
+    la misma categoría con un índice glucémico al menos DIFERENCIA_MINIMA
+    puntos menor; una consulta es la lectura de una fila.
+    '''
+
+    CAMPOS = (
+        'calorias_por_100g', 'indice_glucemico', 'carbohidratos_por_100g',
+        'proteinas_por_100g', 'grasas_por_100g', 'fibra_por_100g',
+    )
+    PESOS = np.array([2.0, 1.0, 1.0, 1.0, 1.0, 0.5])
+    K_MAXIMO = 20
+    DIFERENCIA_MINIMA = 5
+    TAMANO_BLOQUE = 512
+
+    def __init__(self, alimentos, version=None):
+        '''
+        Args:
+            alimentos: Dicts con id, nombre, categoria, activo y CAMPOS (números, cadenas o None)
+            version: Versión del catálogo de la que proviene el índice
+        '''
+        self.version = version
+        self.alimentos = {alimento['id']: alimento for alimento in alimentos}
+        por_categoria = {}
+        for alimento in self.alimentos.values():
+            if alimento['activo'] and alimento['indice_glucemico'] is not None:
+                por_categoria.setdefault(alimento['categoria'], []).append(alimento)
+
+        total = sum(len(grupo) for grupo in por_categoria.values())
+        # Fila por alimento: ids de sus vecinos (-1 = sin vecino) y distancias
+        self.filas = {}
+        self.vecinos = np.full((total, self.K_MAXIMO), -1, dtype=np.int64)
+        self.distancias = np.full((total, self.K_MAXIMO), np.inf, dtype=np.float32)
+        desplazamiento = 0
+        for grupo in por_categoria.values():
+            self._indexar(grupo, desplazamiento)
+            desplazamiento += len(grupo)
+
+    def _indexar(self, grupo, desplazamiento):
+        '''Precalcular los vecinos de todos los alimentos de una categoría.'''
+        datos = np.array([
+            [np.nan if alimento[campo] is None else float(alimento[campo]) for campo in self.CAMPOS]
+            for alimento in grupo
+        ])
+        # Ordenar por índice glucémico: los candidatos de cada alimento son un prefijo
+        orden = np.argsort(datos[:, self.CAMPOS.index('indice_glucemico')], kind='stable')
+        datos = datos[orden]
+        ids = np.array([grupo[i]['id'] for i in orden], dtype=np.int64)
+        indices = datos[:, self.CAMPOS.index('indice_glucemico')]
+        self.filas.update((int(alimento_id), desplazamiento + fila) for fila, alimento_id in enumerate(ids))
+
+        conocidos = ~np.isnan(datos)
+        cuenta = np.maximum(conocidos.sum(axis=0), 1)
+        media = np.where(conocidos, datos, 0).sum(axis=0) / cuenta
+        desviacion = np.sqrt(np.where(conocidos, (datos - media) ** 2, 0).sum(axis=0) / cuenta)
+        z = (np.where(conocidos, (datos - media) / np.where(desviacion > 0, desviacion, 1), 0) * self.PESOS).astype(np.float32)
+        normas = (z * z).sum(axis=1)
+        cortes = np.searchsorted(indices, indices - self.DIFERENCIA_MINIMA, side='right')
+
+        for inicio in range(0, len(grupo), self.TAMANO_BLOQUE):
+            fin = min(inicio + self.TAMANO_BLOQUE, len(grupo))
+            corte = int(cortes[fin - 1])
+            if corte == 0:
+                continue
+            distancias = normas[inicio:fin, None] + normas[None, :corte] - 2 * z[inicio:fin] @ z[:corte].T
+            for fila in np.flatnonzero(cortes[inicio:fin] < corte):
+                distancias[fila, cortes[inicio + fila]:] = np.inf
+            k = min(self.K_MAXIMO, corte)
+            if k < corte:
+                candidatos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+            else:
+                candidatos = np.broadcast_to(np.arange(corte), (fin - inicio, k))
+            valores = np.take_along_axis(distancias, candidatos, axis=1)
+            posiciones = np.argsort(valores, axis=1, kind='stable')
+            candidatos = np.take_along_axis(candidatos, posiciones, axis=1)
+            valores = np.take_along_axis(valores, posiciones, axis=1)
+            filas = slice(desplazamiento + inicio, desplazamiento + fin)
+            self.vecinos[filas, :k] = np.where(np.isfinite(valores), ids[candidatos], -1)
+            self.distancias[filas, :k] = np.sqrt(np.maximum(valores, 0))
+
+    def sugerir(self, alimento_id, k):
+        '''
+        Hasta k sustitutos del alimento, del más cercano al más lejano.
+
+        Returns:
+            list: Tuplas (alimento_id, distancia)
+        '''
+        fila = self.filas.get(alimento_id)
+        if fila is None:
+            return []
+        return [
+            (int(vecino), float(distancia))
+            for vecino, distancia in zip(self.vecinos[fila, :k], self.distancias[fila, :k])
+            if vecino >= 0
+        ]
+
+
+class SustitucionUtils:
+    '''
+    Sugerencias "cambia esto por aquello" de menor índice glucémico.
+    El índice se construye en memoria desde el snapshot del catálogo
+    (CatalogoUtils). Solo la primera consulta del proceso lo construye en la
+    solicitud; cuando cambia la versión del catálogo se reconstruye en un
+    hilo de fondo y mientras tanto se sigue sirviendo el índice anterior.
+    '''
+
+    K_POR_DEFECTO = 5
+    K_MAXIMO = IndiceSustituciones.K_MAXIMO
+    CAMPOS_RESPUESTA = ['id', 'nombre', 'categoria', 'indice_glucemico', 'calorias_por_100g', 'carbohidratos_por_100g']
+    INTERVALO_VERIFICACION = 1.0  # segundos
+
+    _indice = None
+    _verificado = 0.0
+    _reconstruyendo = False
+    _lock = threading.Lock()
+    _lock_construccion = threading.Lock()
+
+    @staticmethod
+    def get_indice():
+        '''Índice vigente; si el catálogo cambió, el anterior mientras se reconstruye en segundo plano.'''
+        indice = SustitucionUtils._indice
+        if indice is None:
+            with SustitucionUtils._lock_construccion:
+                if SustitucionUtils._indice is None:
+                    SustitucionUtils.construir()
+                return SustitucionUtils._indice
+
+        ahora = time.monotonic()
+        if ahora - SustitucionUtils._verificado >= SustitucionUtils.INTERVALO_VERIFICACION:
+            SustitucionUtils._verificado = ahora
+            if indice.version != CatalogoUtils._version_actual():
+                SustitucionUtils.reconstruir_en_segundo_plano()
+        return indice
+
+    @staticmethod
+    def construir():
+        '''Construir el índice para la versión actual del catálogo y publicarlo en el proceso.'''
+        snapshot = CatalogoUtils.get_snapshot()
+        indice = IndiceSustituciones(snapshot['elementos'], snapshot['version'])
+        SustitucionUtils._indice = indice
+        SustitucionUtils._verificado = time.monotonic()
+        return indice
+
+    @staticmethod
+    def reconstruir_en_segundo_plano():
+        '''Iniciar una reconstrucción en un hilo, salvo que ya haya una en curso.'''
+        with SustitucionUtils._lock:
+            if SustitucionUtils._reconstruyendo:
+                return
+            SustitucionUtils._reconstruyendo = True
+        threading.Thread(
+            target=SustitucionUtils._reconstruir, name='indice-sustituciones', daemon=True
+        ).start()
+
+    @staticmethod
+    def _reconstruir():
+        try:
+            with SustitucionUtils._lock_construccion:
+                SustitucionUtils.construir()
+        finally:
+            SustitucionUtils._reconstruyendo = False
+            # El hilo abrió su propia conexión a la base de datos
+            connection.close()
+
+    @staticmethod
+    def invalidar():
+        '''Al confirmar un cambio del catálogo, reconstruir el índice si este proceso ya lo tiene cargado.'''
+        def reconstruir():
+            if SustitucionUtils._indice is not None:
+                SustitucionUtils.reconstruir_en_segundo_plano()
+        transaction.on_commit(reconstruir)
+
+    @staticmethod
+    def aplica(usuario):
+        '''
+        Las sugerencias son para pacientes cuyo objetivo principal es el control de glucosa.
+        La encuesta pertenece a accounts.User y las solicitudes se autentican con
+        el modelo de usuario de Django (AUTH_USER_MODEL no está configurado):
+        ambos se enlazan por username, único en los dos modelos, nunca por id.
+        '''
+        return SurveyInicial.objects.filter(
+            usuario__username=usuario.get_username(),
+            objetivo_principal=SurveyInicial.ObjetivoPrincipalChoices.CONTROL_GLUCOSA
+        ).exists()
+
+    @staticmethod
+    def sugerir(alimento_id, k=K_POR_DEFECTO):
+        '''
+        Alimento y sus sustitutos de menor índice glucémico.
+
+        Returns:
+            dict | None: alimento y sustituciones, o None si el alimento no existe
+        '''
+        indice = SustitucionUtils.get_indice()
+        alimento = indice.alimentos.get(alimento_id)
+        if alimento is None:
+            return None
+
+        def resumen(elemento):
+            return {campo: elemento[campo] for campo in SustitucionUtils.CAMPOS_RESPUESTA}
+
+        sustituciones = []
+        for sustituto_id, distancia in indice.sugerir(alimento_id, k):
+            sustituto = indice.alimentos[sustituto_id]
+            sustituciones.append({
+                **resumen(sustituto),
+                'distancia': round(distancia, 3),
+                'reduccion_indice_glucemico': round(
+                    float(alimento['indice_glucemico']) - float(sustituto['indice_glucemico']), 2
+                ),
+            })
+        return {'alimento': resumen(alimento), 'sustituciones': sustituciones}
@@ -1,7 +1,34 @@
 # alimentos/views.py
-from rest_framework import viewsets, permissions
-from .models import TipoAlimento, Comida, DetalleComida
-from .serializers import TipoAlimentoSerializer, ComidaSerializer, DetalleComidaSerializer
+from datetime import timedelta
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from core.pagination import FechaHoraCursorPagination
+from core.utils import ExportacionUtils
+from .models import TipoAlimento, Comida, DetalleComida, ConversionUnidad
+from .serializers import (
+    TipoAlimentoSerializer,
+    ConversionUnidadSerializer,
+    ComidaSerializer,
+    DetalleComidaSerializer,
+    ResumenNutricionDiarioSerializer,
+)
+from .reconocimiento import ColaLlena, get_procesador
+from .utils import (
+    ComidaUtils,
+    CatalogoUtils,
+    BusquedaAlimentosUtils,
+    ReconocimientoUtils,
+    ResumenNutricionUtils,
+    SustitucionUtils,
+)
 
 
 class TipoAlimentoViewSet(viewsets.ModelViewSet):
@@ -9,21 +36,221 @@ class TipoAlimentoViewSet(viewsets.ModelViewSet):
     serializer_class = TipoAlimentoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def _respuesta_condicional(self, request, etag):
+        """304 sin tocar la base de datos si el cliente ya tiene esta versión"""
+        etags_cliente = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags_cliente or '*' in etags_cliente:
+            respuesta = HttpResponseNotModified()
+            respuesta['ETag'] = etag
+            return respuesta
+        return None
+
+    def list(self, request, *args, **kwargs):
+        """Listado servido desde el snapshot versionado del catálogo (ETag / If-None-Match)"""
+        snapshot = CatalogoUtils.get_snapshot()
+        etag = CatalogoUtils.etag(snapshot, request.META.get('QUERY_STRING', ''))
+        respuesta = self._respuesta_condicional(request, etag)
+        if respuesta is None:
+            pagina = self.paginate_queryset(snapshot['elementos'])
+            if pagina is not None:
+                respuesta = self.get_paginated_response(pagina)
+            else:
+                respuesta = Response(snapshot['elementos'])
+            respuesta['ETag'] = etag
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """
+        Autocompletado de alimentos: ?q= (prefijos de palabra, sin acentos),
+        ?limite= (1-50, por defecto 10) y ?categoria= opcional.
+        """
+        try:
+            limite = int(request.query_params.get('limite', BusquedaAlimentosUtils.LIMITE_POR_DEFECTO))
+        except ValueError:
+            limite = 0
+        if not 1 <= limite <= BusquedaAlimentosUtils.LIMITE_MAXIMO:
+            raise ValidationError({'limite': f'Debe ser un entero entre 1 y {BusquedaAlimentosUtils.LIMITE_MAXIMO}.'})
+        categoria = request.query_params.get('categoria')
+        if categoria and categoria not in TipoAlimento.CategoriaChoices.values:
+            raise ValidationError({'categoria': f"Valores permitidos: {', '.join(TipoAlimento.CategoriaChoices.values)}."})
+
+        alimentos = BusquedaAlimentosUtils.buscar(request.query_params.get('q', ''), limite, categoria)
+        return Response(self.get_serializer(alimentos, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def sustituciones(self, request, pk=None):
+        """
+        Alimentos de la misma categoría con calorías y macronutrientes similares
+        pero menor índice glucémico (?k=, 1-20, por defecto 5). Solo para
+        pacientes con objetivo principal control_glucosa.
+        """
+        if not SustitucionUtils.aplica(request.user):
+            raise PermissionDenied('Las sustituciones están disponibles para pacientes con objetivo de control de glucosa.')
+        try:
+            k = int(request.query_params.get('k', SustitucionUtils.K_POR_DEFECTO))
+        except ValueError:
+            k = 0
+        if not 1 <= k <= SustitucionUtils.K_MAXIMO:
+            raise ValidationError({'k': f'Debe ser un entero entre 1 y {SustitucionUtils.K_MAXIMO}.'})
+
+        resultado = SustitucionUtils.sugerir(int(pk) if str(pk).isdigit() else None, k)
+        if resultado is None:
+            raise NotFound('Alimento no encontrado.')
+        return Response(resultado)
+
+    @action(detail=False, methods=['get'])
+    def catalogo(self, request):
+        """
+        Catálogo completo en formato compacto para uso sin conexión:
+        {version, campos, alimentos: [[valores en el orden de campos], ...]}.
+        """
+        snapshot = CatalogoUtils.get_snapshot()
+        etag = CatalogoUtils.etag(snapshot)
+        respuesta = self._respuesta_condicional(request, etag)
+        if respuesta is None:
+            respuesta = HttpResponse(snapshot['compacto'], content_type='application/json')
+            respuesta['ETag'] = etag
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+
+
+class ConversionUnidadViewSet(viewsets.ModelViewSet):
+    """
+    Gramos por unidad de medida de cada alimento. Los cambios recalculan los
+    totales de las comidas que usan ese alimento en esa unidad.
+    """
+    queryset = ConversionUnidad.objects.select_related('tipo_alimento')
+    serializer_class = ConversionUnidadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tipo_alimento = self.request.query_params.get('tipo_alimento')
+        if tipo_alimento:
+            if not tipo_alimento.isdigit():
+                raise ValidationError({'tipo_alimento': 'Debe ser un id numérico.'})
+            queryset = queryset.filter(tipo_alimento_id=tipo_alimento)
+        return queryset
+
 
 class ComidaViewSet(viewsets.ModelViewSet):
     serializer_class = ComidaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FechaHoraCursorPagination
 
     def get_queryset(self):
-        return Comida.objects.filter(usuario=self.request.user)
+        queryset = Comida.objects.filter(usuario=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            # Totales desnormalizados y relaciones precargadas: consultas constantes por página
+            return ComidaUtils.con_relaciones(queryset)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def reconocer(self, request):
+        """
+        Reconoce alimentos en fotos (campo multipart `imagenes`, repetible) y
+        devuelve borradores de detalles para confirmar antes de crear la comida.
+        Las imágenes pasan por la cola de micro-lotes del reconocedor configurado.
+        """
+        imagenes = request.FILES.getlist('imagenes')
+        if not imagenes:
+            raise ValidationError({'imagenes': 'Se requiere al menos una imagen.'})
+        if len(imagenes) > ReconocimientoUtils.MAX_IMAGENES:
+            raise ValidationError({'imagenes': f'Máximo {ReconocimientoUtils.MAX_IMAGENES} imágenes por solicitud.'})
+
+        try:
+            futuros = [get_procesador().enviar(imagen.read()) for imagen in imagenes]
+            predicciones = [futuro.result(timeout=ReconocimientoUtils.TIEMPO_ESPERA) for futuro in futuros]
+        except (ColaLlena, TimeoutError):
+            return Response(
+                {'detail': 'El reconocimiento de imágenes está saturado, intente de nuevo.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({'detalles': ReconocimientoUtils.borradores_detalle(predicciones)})
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Historial completo de comidas en streaming (?formato=csv|ndjson)"""
+        formato = ExportacionUtils.formato_solicitado(request)
+        return ExportacionUtils.respuesta_streaming(
+            Comida.objects.filter(usuario=request.user).order_by('fecha_hora', 'id'),
+            ['id', 'fecha_hora', 'tipo_comida', 'calorias_totales', 'notas'],
+            formato,
+            f'comidas_{request.user.pk}'
+        )
+
 
 class DetalleComidaViewSet(viewsets.ModelViewSet):
     serializer_class = DetalleComidaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FechaHoraCursorPagination
+    campo_cursor = 'comida__fecha_hora'
 
     def get_queryset(self):
-        return DetalleComida.objects.filter(comida__usuario=self.request.user)
+        return DetalleComida.objects.filter(comida__usuario=self.request.user).select_related('comida', 'tipo_alimento')
+
+    # Cada escritura actualiza los totales de la comida (signals) en la misma transacción
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Detalles de todas las comidas en streaming (?formato=csv|ndjson)"""
+        formato = ExportacionUtils.formato_solicitado(request)
+        return ExportacionUtils.respuesta_streaming(
+            DetalleComida.objects.filter(comida__usuario=request.user).order_by('comida__fecha_hora', 'id'),
+            [
+                'id', 'comida_id', 'comida__fecha_hora', 'tipo_alimento_id',
+                'tipo_alimento__nombre', 'cantidad', 'unidad_medida'
+            ],
+            formato,
+            f'detalles_comida_{request.user.pk}'
+        )
+
+
+class ResumenNutricionViewSet(viewsets.GenericViewSet):
+    """
+    Resumen nutricional por día: calorías, comidas por tipo, gramos por
+    categoría e índice glucémico promedio. Parámetros from y to (YYYY-MM-DD,
+    inclusive; por defecto los últimos 7 días), un elemento por día.
+    """
+    serializer_class = ResumenNutricionDiarioSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def _fecha(self, parametro, defecto):
+        valor = self.request.query_params.get(parametro)
+        if not valor:
+            return defecto
+        try:
+            fecha = parse_date(valor)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            raise ValidationError({parametro: 'Se requiere una fecha YYYY-MM-DD válida.'})
+        return fecha
+
+    def list(self, request):
+        hasta = self._fecha('to', timezone.localdate())
+        desde = self._fecha('from', hasta - timedelta(days=6))
+        if desde > hasta:
+            raise ValidationError({'from': 'Debe ser anterior o igual a to.'})
+        if (hasta - desde).days >= ResumenNutricionUtils.MAX_DIAS:
+            raise ValidationError({'from': f'El rango máximo es de {ResumenNutricionUtils.MAX_DIAS} días.'})
+
+        resumenes = ResumenNutricionUtils.rango(request.user.pk, desde, hasta)
+        return Response(self.get_serializer(resumenes, many=True).data)